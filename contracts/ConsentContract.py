@@ -1,21 +1,44 @@
+import re
+
 from pyteal import *
 
-def approval_program():
+from codec import (ABI_METHODS, EXPIRY_OFFSET, MERKLE_LEAF_PREFIX, MERKLE_NODE_PREFIX, REQUESTER_OFFSET,
+                   REVOKED_BOX_PREFIX, ROOT_BOX_PREFIX, STATUS_CODES, event_selector, method_selector)
+
+def consent_event(operation, request_id, status, expiry):
+    """Log the ARC-28 event of an operation.
+
+    The ARC-4 tuple head is the 2-byte offset of request_id, the 32-byte
+    sender, the status code and the expiry (43 bytes); request_id follows with
+    its 2-byte length.
+    """
+    head = event_selector(operation) + (43).to_bytes(2, "big")
+    return Log(Concat(
+        Bytes("base16", "0x" + head.hex()),
+        Txn.sender(),
+        Bytes("base16", f"0x{STATUS_CODES[status]:02x}"),
+        Itob(expiry),
+        Extract(Itob(Len(request_id)), Int(6), Int(2)),
+        request_id,
+    ))
+
+def consent_handlers(dynamic_arg=lambda index: Txn.application_args[index]):
+    """Global-state operation handlers keyed by operation name.
+
+    dynamic_arg(index) returns the value of a variable-length argument, so the
+    same handlers serve raw string arguments and ABI-encoded ones. Fixed-width
+    arguments are identical in both: the requester is a 32-byte public key,
+    expiry and the permission bitmask are 8-byte big-endian integers.
+    """
     # Global state keys
     owner = Bytes("owner")
     document_hash = Bytes("document_hash")
     document_type = Bytes("document_type")
     request_id = Bytes("request_id")
     requester = Bytes("requester")
-    status = Bytes("status")  # "pending", "granted", "revoked"
+    status = Bytes("status")  # "pending", "granted", "revoked", "expired"
     expiry = Bytes("expiry")
-    permissions = Bytes("permissions")
-
-    # Operations
-    request_consent = Bytes("request_consent")
-    grant_consent = Bytes("grant_consent")
-    revoke_consent = Bytes("revoke_consent")
-    view_document = Bytes("view_document")
+    permissions = Bytes("permissions")  # codec.PERMISSION_BITS bitmask
 
     # Helper functions
     def is_owner():
@@ -33,15 +56,16 @@ def approval_program():
     # Request consent operation
     def handle_request_consent():
         return Seq([
-            Assert(Txn.application_args[1] != Bytes("")),  # document_hash
-            Assert(Txn.application_args[2] != Bytes("")),  # document_type
-            Assert(Txn.application_args[3] != Bytes("")),  # request_id
-            Assert(Txn.application_args[4] != Bytes("")),  # requester
-            App.globalPut(document_hash, Txn.application_args[1]),
-            App.globalPut(document_type, Txn.application_args[2]),
-            App.globalPut(request_id, Txn.application_args[3]),
+            Assert(dynamic_arg(1) != Bytes("")),  # document_hash
+            Assert(dynamic_arg(2) != Bytes("")),  # document_type
+            Assert(dynamic_arg(3) != Bytes("")),  # request_id
+            Assert(Len(Txn.application_args[4]) == Int(32)),  # requester public key
+            App.globalPut(document_hash, dynamic_arg(1)),
+            App.globalPut(document_type, dynamic_arg(2)),
+            App.globalPut(request_id, dynamic_arg(3)),
             App.globalPut(requester, Txn.application_args[4]),
             App.globalPut(status, Bytes("pending")),
+            consent_event("request_consent", dynamic_arg(3), "pending", Int(0)),
             Return(Int(1))
         ])
 
@@ -50,11 +74,12 @@ def approval_program():
         return Seq([
             Assert(is_owner()),
             Assert(App.globalGet(status) == Bytes("pending")),
-            Assert(Txn.application_args[1] != Bytes("")),  # expiry
-            Assert(Txn.application_args[2] != Bytes("")),  # permissions
+            Assert(Len(Txn.application_args[1]) == Int(8)),  # expiry
+            Assert(Len(Txn.application_args[2]) == Int(8)),  # permissions
             App.globalPut(status, Bytes("granted")),
             App.globalPut(expiry, Btoi(Txn.application_args[1])),
-            App.globalPut(permissions, Txn.application_args[2]),
+            App.globalPut(permissions, Btoi(Txn.application_args[2])),
+            consent_event("grant_consent", App.globalGet(request_id), "granted", Btoi(Txn.application_args[1])),
             Return(Int(1))
         ])
 
@@ -64,6 +89,7 @@ def approval_program():
             Assert(Or(is_owner(), is_requester())),
             Assert(is_granted()),
             App.globalPut(status, Bytes("revoked")),
+            consent_event("revoke_consent", App.globalGet(request_id), "revoked", App.globalGet(expiry)),
             Return(Int(1))
         ])
 
@@ -73,12 +99,231 @@ def approval_program():
             Assert(is_granted()),
             Assert(is_not_expired()),
             Assert(Or(is_owner(), is_requester())),
+            consent_event("view_document", App.globalGet(request_id), "granted", App.globalGet(expiry)),
             Return(Int(1))
         ])
 
+    # Sweep expired operation: anyone may mark a lapsed grant expired; other states are left alone
+    def handle_sweep_expired():
+        return Seq([
+            If(And(is_granted(), Not(is_not_expired()))).Then(Seq([
+                App.globalPut(status, Bytes("expired")),
+                consent_event("sweep_expired", App.globalGet(request_id), "expired", App.globalGet(expiry)),
+            ])),
+            Return(Int(1))
+        ])
+
+    return {
+        "request_consent": handle_request_consent(),
+        "grant_consent": handle_grant_consent(),
+        "revoke_consent": handle_revoke_consent(),
+        "view_document": handle_view_document(),
+        "sweep_expired": handle_sweep_expired(),
+        "is_owner": Return(is_owner()),
+        # The creator owns the app, so only it may update or delete it
+        "create": Seq([App.globalPut(owner, Txn.sender()), Return(Int(1))]),
+    }
+
+def approval_program():
+    handlers = consent_handlers()
+
+    # Operations
+    request_consent = Bytes("request_consent")
+    grant_consent = Bytes("grant_consent")
+    revoke_consent = Bytes("revoke_consent")
+    view_document = Bytes("view_document")
+    sweep_expired = Bytes("sweep_expired")
+
     # Main program
     program = Cond(
-        [Txn.application_id() == Int(0), Return(Int(1))],  # Creation
+        [Txn.application_id() == Int(0), handlers["create"]],
+        [Txn.on_completion() == OnComplete.DeleteApplication, handlers["is_owner"]],
+        [Txn.on_completion() == OnComplete.UpdateApplication, handlers["is_owner"]],
+        [Txn.on_completion() == OnComplete.CloseOut, Return(Int(1))],
+        [Txn.on_completion() == OnComplete.OptIn, Return(Int(1))],
+        [Txn.application_args[0] == request_consent, handlers["request_consent"]],
+        [Txn.application_args[0] == grant_consent, handlers["grant_consent"]],
+        [Txn.application_args[0] == revoke_consent, handlers["revoke_consent"]],
+        [Txn.application_args[0] == view_document, handlers["view_document"]],
+        [Txn.application_args[0] == sweep_expired, handlers["sweep_expired"]]
+    )
+
+    return program
+
+def abi_approval_teal(version=8):
+    """TEAL for the global-state contract behind an ARC-4 selector router.
+
+    Dispatch is a `switch` on OnCompletion followed by a single `match` over the
+    method selectors, so every method reaches its handler after the same seven
+    opcodes instead of walking the Cond chain. PyTeal has no multi-way branch,
+    so the handlers are compiled on their own and stitched behind the jump table.
+    """
+    # ABI byte[] and string arguments carry a 2-byte length prefix
+    handlers = consent_handlers(lambda index: Suffix(Txn.application_args[index], Int(2)))
+    operations = list(ABI_METHODS)
+
+    lines = [
+        f"#pragma version {version}",
+        "txn ApplicationID",
+        "bz abi_create",
+        "txn OnCompletion",
+        # NoOp, OptIn, CloseOut, ClearState, UpdateApplication, DeleteApplication
+        "switch abi_dispatch abi_allow abi_allow abi_reject abi_owner abi_owner",
+        "err",
+        "abi_dispatch:",
+        "pushbytess " + " ".join("0x" + method_selector(name).hex() for name in operations),
+        "txna ApplicationArgs 0",
+        "match " + " ".join(f"abi_{name}" for name in operations),
+        "err",
+    ]
+    for name in operations + ["is_owner", "create"]:
+        lines.append(f"abi_{'owner' if name == 'is_owner' else name}:")
+        body = compileTeal(handlers[name], mode=Mode.Application, version=version)
+        # Drop the pragma and keep each handler's labels unique
+        lines.extend(re.sub(r"\bmain_l(\d+)\b", rf"{name}_l\1", line) for line in body.splitlines()[1:])
+    lines += ["abi_allow:", "int 1", "return", "abi_reject:", "err"]
+    return "\n".join(lines)
+
+def box_approval_program():
+    """Approval program that keeps every consent in its own box keyed by request_id.
+
+    Box layout (see codec.py): status (1 byte) | expiry (uint64) | permissions
+    bitmask (uint64) | requester (32 bytes) | len + document_hash |
+    len + document_type. The fixed-width head lets grant_consent write status,
+    expiry and permissions in place instead of recreating the box.
+    sweep_expired expires each granted consent among its request ID args
+    whose expiry has passed, and skips the rest.
+    """
+    # Global state keys
+    owner = Bytes("owner")
+
+    # Box status codes
+    pending = Bytes("base16", f"0x{STATUS_CODES['pending']:02x}")
+    granted = Bytes("base16", f"0x{STATUS_CODES['granted']:02x}")
+    revoked = Bytes("base16", f"0x{STATUS_CODES['revoked']:02x}")
+    expired = Bytes("base16", f"0x{STATUS_CODES['expired']:02x}")
+
+    # Operations
+    request_consent = Bytes("request_consent")
+    grant_consent = Bytes("grant_consent")
+    revoke_consent = Bytes("revoke_consent")
+    view_document = Bytes("view_document")
+    sweep_expired = Bytes("sweep_expired")
+
+    # Every operation except request_consent names its consent in args[1]
+    consent = Txn.application_args[1]
+
+    # Helper functions
+    def is_owner():
+        return Txn.sender() == App.globalGet(owner)
+
+    def is_requester():
+        return Txn.sender() == App.box_extract(consent, Int(REQUESTER_OFFSET), Int(32))
+
+    def status():
+        return App.box_extract(consent, Int(0), Int(1))
+
+    def is_granted():
+        return status() == granted
+
+    def expiry():
+        return ExtractUint64(App.box_extract(consent, Int(EXPIRY_OFFSET), Int(8)), Int(0))
+
+    def is_not_expired():
+        return expiry() > Global.latest_timestamp()
+
+    def length_prefixed(value):
+        return Concat(Extract(Itob(Len(value)), Int(6), Int(2)), value)
+
+    # Request consent operation
+    def handle_request_consent():
+        existing = App.box_length(Txn.application_args[3])
+        return Seq([
+            Assert(Txn.application_args[1] != Bytes("")),  # document_hash
+            Assert(Txn.application_args[2] != Bytes("")),  # document_type
+            Assert(Txn.application_args[3] != Bytes("")),  # request_id
+            Assert(Len(Txn.application_args[4]) == Int(32)),  # requester public key
+            existing,
+            Assert(Not(existing.hasValue())),
+            App.box_put(
+                Txn.application_args[3],
+                Concat(
+                    pending,
+                    Itob(Int(0)),  # expiry
+                    Itob(Int(0)),  # permissions
+                    Txn.application_args[4],
+                    length_prefixed(Txn.application_args[1]),
+                    length_prefixed(Txn.application_args[2]),
+                ),
+            ),
+            consent_event("request_consent", Txn.application_args[3], "pending", Int(0)),
+            Return(Int(1))
+        ])
+
+    # Grant consent operation
+    def handle_grant_consent():
+        return Seq([
+            Assert(is_owner()),
+            # box_extract fails on a missing box
+            Assert(status() == pending),
+            Assert(Len(Txn.application_args[2]) == Int(8)),  # expiry
+            Assert(Len(Txn.application_args[3]) == Int(8)),  # permissions
+            App.box_replace(consent, Int(0), Concat(granted, Txn.application_args[2], Txn.application_args[3])),
+            consent_event("grant_consent", consent, "granted", Btoi(Txn.application_args[2])),
+            Return(Int(1))
+        ])
+
+    # Revoke consent operation
+    def handle_revoke_consent():
+        return Seq([
+            Assert(Or(is_owner(), is_requester())),
+            Assert(is_granted()),
+            App.box_replace(consent, Int(0), revoked),
+            consent_event("revoke_consent", consent, "revoked", expiry()),
+            Return(Int(1))
+        ])
+
+    # View document operation
+    def handle_view_document():
+        return Seq([
+            Assert(is_granted()),
+            Assert(is_not_expired()),
+            Assert(Or(is_owner(), is_requester())),
+            consent_event("view_document", consent, "granted", expiry()),
+            Return(Int(1))
+        ])
+
+    # Sweep expired operation: args[1:] are request IDs; missing, unexpired and non-granted ones are skipped
+    def handle_sweep_expired():
+        index = ScratchVar(TealType.uint64)
+        swept = Txn.application_args[index.load()]
+        length = App.box_length(swept)
+        swept_expiry = ExtractUint64(App.box_extract(swept, Int(EXPIRY_OFFSET), Int(8)), Int(0))
+        return Seq([
+            For(
+                index.store(Int(1)),
+                index.load() < Txn.application_args.length(),
+                index.store(index.load() + Int(1)),
+            ).Do(
+                Seq([
+                    length,
+                    If(length.hasValue()).Then(
+                        If(And(
+                            App.box_extract(swept, Int(0), Int(1)) == granted,
+                            swept_expiry <= Global.latest_timestamp(),
+                        )).Then(Seq([
+                            App.box_replace(swept, Int(0), expired),
+                            consent_event("sweep_expired", swept, "expired", swept_expiry),
+                        ]))
+                    ),
+                ])
+            ),
+            Return(Int(1))
+        ])
+
+    # Main program
+    program = Cond(
+        [Txn.application_id() == Int(0), Seq([App.globalPut(owner, Txn.sender()), Return(Int(1))])],  # Creation
         [Txn.on_completion() == OnComplete.DeleteApplication, Return(is_owner())],
         [Txn.on_completion() == OnComplete.UpdateApplication, Return(is_owner())],
         [Txn.on_completion() == OnComplete.CloseOut, Return(Int(1))],
@@ -86,7 +331,108 @@ def approval_program():
         [Txn.application_args[0] == request_consent, handle_request_consent()],
         [Txn.application_args[0] == grant_consent, handle_grant_consent()],
         [Txn.application_args[0] == revoke_consent, handle_revoke_consent()],
-        [Txn.application_args[0] == view_document, handle_view_document()]
+        [Txn.application_args[0] == view_document, handle_view_document()],
+        [Txn.application_args[0] == sweep_expired, handle_sweep_expired()]
+    )
+
+    return program
+
+def merkle_approval_program():
+    """Approval program that anchors Merkle roots of consent batches instead of storing each consent.
+
+    anchor_root keeps a batch's 32-byte root in a box named "r" + root. A leaf
+    is sha256(0x00 | requester | expiry | permissions | sha256(document_hash) |
+    request_id) (codec.encode_merkle_leaf) and an inner node sha256(0x01 |
+    left | right). view_document takes request_id, expiry, permissions,
+    document_hash, the proof path (bit i set when sibling i is the left one)
+    and the concatenated sibling hashes. It rebuilds the root with the sender
+    as requester and approves while that root is anchored, the expiry has not
+    passed and no "x" + request_id revocation box exists. Each proof level
+    costs a sha256, so deep proofs pool budget from budget calls in the group.
+    """
+    # Global state keys
+    owner = Bytes("owner")
+
+    # Operations
+    anchor_root = Bytes("anchor_root")
+    revoke_consent = Bytes("revoke_consent")
+    view_document = Bytes("view_document")
+    budget = Bytes("budget")
+
+    def is_owner():
+        return Txn.sender() == App.globalGet(owner)
+
+    def revoked_box(request_id):
+        return Concat(Bytes(REVOKED_BOX_PREFIX), request_id)
+
+    # Anchor root operation: args[1] is the root of a batch built by merkle.py
+    def handle_anchor_root():
+        root = Txn.application_args[1]
+        return Seq([
+            Assert(is_owner()),
+            Assert(Len(root) == Int(32)),
+            App.box_put(Concat(Bytes(ROOT_BOX_PREFIX), root), Itob(Global.latest_timestamp())),
+            Return(Int(1))
+        ])
+
+    # Revoke consent operation: args[1] is the request ID, whichever batch anchored it
+    def handle_revoke_consent():
+        request_id = Txn.application_args[1]
+        return Seq([
+            Assert(is_owner()),
+            App.box_put(revoked_box(request_id), Itob(Global.latest_timestamp())),
+            consent_event("revoke_consent", request_id, "revoked", Int(0)),
+            Return(Int(1))
+        ])
+
+    # View document operation: args[1:7] are request_id, expiry, permissions, document_hash, path and proof
+    def handle_view_document():
+        request_id = Txn.application_args[1]
+        expiry = Txn.application_args[2]
+        permissions = Txn.application_args[3]
+        document_hash = Txn.application_args[4]
+        path = Txn.application_args[5]
+        proof = Txn.application_args[6]
+        node = ScratchVar(TealType.bytes)
+        level = ScratchVar(TealType.uint64)
+        sibling = Extract(proof, level.load() * Int(32), Int(32))
+        node_prefix = Bytes("base16", "0x" + MERKLE_NODE_PREFIX.hex())
+        anchored = App.box_length(Concat(Bytes(ROOT_BOX_PREFIX), node.load()))
+        revoked = App.box_length(revoked_box(request_id))
+        return Seq([
+            Assert(Len(expiry) == Int(8)),
+            Assert(Len(permissions) == Int(8)),
+            Assert(Len(path) == Int(8)),
+            Assert(Len(proof) % Int(32) == Int(0)),
+            Assert(Btoi(expiry) > Global.latest_timestamp()),
+            node.store(Sha256(Concat(
+                Bytes("base16", "0x" + MERKLE_LEAF_PREFIX.hex()), Txn.sender(), expiry, permissions,
+                Sha256(document_hash), request_id,
+            ))),
+            For(level.store(Int(0)), level.load() < Len(proof) / Int(32), level.store(level.load() + Int(1))).Do(
+                node.store(Sha256(If(BitwiseAnd(ShiftRight(Btoi(path), level.load()), Int(1)))
+                                  .Then(Concat(node_prefix, sibling, node.load()))
+                                  .Else(Concat(node_prefix, node.load(), sibling))))
+            ),
+            anchored,
+            Assert(anchored.hasValue()),
+            revoked,
+            Assert(Not(revoked.hasValue())),
+            consent_event("view_document", request_id, "granted", Btoi(expiry)),
+            Return(Int(1))
+        ])
+
+    # Main program
+    program = Cond(
+        [Txn.application_id() == Int(0), Seq([App.globalPut(owner, Txn.sender()), Return(Int(1))])],  # Creation
+        [Txn.on_completion() == OnComplete.DeleteApplication, Return(is_owner())],
+        [Txn.on_completion() == OnComplete.UpdateApplication, Return(is_owner())],
+        [Txn.on_completion() == OnComplete.CloseOut, Return(Int(1))],
+        [Txn.on_completion() == OnComplete.OptIn, Return(Int(1))],
+        [Txn.application_args[0] == view_document, handle_view_document()],
+        [Txn.application_args[0] == budget, Return(Int(1))],  # Only adds its opcode budget to the group
+        [Txn.application_args[0] == anchor_root, handle_anchor_root()],
+        [Txn.application_args[0] == revoke_consent, handle_revoke_consent()]
     )
 
     return program
@@ -95,10 +441,13 @@ def clear_state_program():
     return Return(Int(1))
 
 if __name__ == "__main__":
-    with open("consent_approval.teal", "w") as f:
-        compiled = compileTeal(approval_program(), mode=Mode.Application, version=6)
-        f.write(compiled)
+    # Only programs whose PyTeal source, TEAL version or compiler changed are recompiled
+    from build_cache import write_teal
 
-    with open("consent_clear.teal", "w") as f:
-        compiled = compileTeal(clear_state_program(), mode=Mode.Application, version=6)
-        f.write(compiled) 
\ No newline at end of file
+    write_teal("approval", "consent_approval.teal")
+    # The selector router uses switch/match from AVM version 8
+    write_teal("abi_approval", "consent_abi_approval.teal")
+    # Boxes need AVM version 8
+    write_teal("box_approval", "consent_box_approval.teal")
+    write_teal("merkle_approval", "consent_merkle_approval.teal")
+    write_teal("clear", "consent_clear.teal")
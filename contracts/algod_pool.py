@@ -0,0 +1,265 @@
+import http.client
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+from urllib import parse
+
+import msgpack
+from algosdk import constants, encoding, error
+from algosdk.v2client import algod
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"
+
+# Responses worth retrying on another node: rate limiting and server-side failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# How algod rejects transactions it already holds, in its pool or in the ledger
+ALREADY_IN_LEDGER = "transaction already in ledger"
+
+def _first_tx_id(data):
+    first = next(iter(msgpack.Unpacker(io.BytesIO(data), raw=False, strict_map_key=False)))
+    return encoding.msgpack_decode(first).get_txid()
+
+class Endpoint:
+    """One algod node: its idle keep-alive connections, smoothed latency and health."""
+
+    def __init__(self, address, token="", pool_size=8, timeout=30):
+        url = parse.urlsplit(address)
+        self.address = address.rstrip("/")
+        self.token = token
+        self.scheme = url.scheme or "http"
+        self.host = url.hostname
+        self.port = url.port
+        self.base_path = url.path.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.latency = None
+        self.healthy = True
+        self.retry_at = 0.0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"Endpoint({self.address!r}, latency={self.latency}, healthy={self.healthy})"
+
+    def idle(self):
+        with self._lock:
+            return self._idle.pop() if self._idle else None
+
+    def connect(self, timeout):
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=timeout)
+
+    def release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def record_latency(self, seconds):
+        # Exponentially weighted, so one slow response does not reroute everything
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+
+    def mark_healthy(self):
+        self.healthy = True
+        self.retry_at = 0.0
+
+    def mark_unhealthy(self, cooldown):
+        self.healthy = False
+        self.retry_at = time.monotonic() + cooldown
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def available(self, now):
+        return self.healthy or now >= self.retry_at
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+class PooledAlgodClient(algod.AlgodClient):
+    """AlgodClient over pooled keep-alive connections to one or more nodes.
+
+    Each request goes to the healthy node with the lowest smoothed latency.
+    429 and 5xx responses and connection failures are retried on the next best
+    node after a jittered exponential backoff; a failing node sits out for
+    cooldown seconds (or the server's Retry-After) before it is tried again.
+    A pooled connection the node closed while it sat idle is retried once on
+    a fresh connection to the same node and does not count against it.
+
+    POST /transactions is retried too, so a submission that timed out after
+    the node took it may reach another node that already holds it. algod
+    rejects it there as already in the ledger; after an earlier failed
+    attempt that answer means the submission went through, and the first
+    transaction ID is returned as on success. Any other rejection of the
+    retry, such as the transactions having expired, is raised as usual.
+    Nodes are health-checked with GET /health every health_interval seconds on
+    a background thread, or only on demand when health_interval is 0. Every
+    algosdk AlgodClient method works unchanged.
+    """
+
+    def __init__(self, endpoints, token="", headers=None, pool_size=8, retries=4, backoff=0.1,
+                 max_backoff=5.0, cooldown=10.0, health_interval=30.0):
+        if isinstance(endpoints, str):
+            endpoints = [endpoints]
+        self.endpoints = [
+            Endpoint(*endpoint, pool_size=pool_size) if isinstance(endpoint, tuple)
+            else Endpoint(endpoint, token, pool_size=pool_size)
+            for endpoint in endpoints
+        ]
+        if not self.endpoints:
+            raise ValueError("at least one algod endpoint is required")
+        super().__init__(self.endpoints[0].token, self.endpoints[0].address, headers)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cooldown = cooldown
+        self._stopped = threading.Event()
+        self._health_thread = None
+        if health_interval:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_interval,), name="algod-health", daemon=True
+            )
+            self._health_thread.start()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Client for the comma-separated node URLs in ALGOD_ADDRESS, authenticated with ALGOD_TOKEN."""
+        addresses = os.environ.get("ALGOD_ADDRESS", DEFAULT_ALGOD_ADDRESS)
+        endpoints = [address.strip() for address in addresses.split(",") if address.strip()]
+        return cls(endpoints, os.environ.get("ALGOD_TOKEN", ""), **kwargs)
+
+    def _choose(self, tried):
+        now = time.monotonic()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.available(now)] or self.endpoints
+        untried = [endpoint for endpoint in candidates if endpoint not in tried] or candidates
+        # Nodes without a latency sample yet are tried first, so every node gets measured
+        return min(untried, key=lambda endpoint: -1.0 if endpoint.latency is None else endpoint.latency)
+
+    def _sleep_before_retry(self, attempt):
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def _send(self, endpoint, method, path, data, headers, timeout):
+        connection = endpoint.idle()
+        if connection is not None:
+            try:
+                return self._exchange(endpoint, connection, method, path, data, headers)
+            except ConnectionError as e:
+                # The node closed the keep-alive connection while it sat idle, which says nothing about its health
+                logger.debug(f"pooled connection to {endpoint.address} was closed: {e}")
+        return self._exchange(endpoint, endpoint.connect(timeout), method, path, data, headers)
+
+    def _exchange(self, endpoint, connection, method, path, data, headers):
+        started = time.perf_counter()
+        try:
+            connection.request(method, endpoint.base_path + path, body=data, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        except Exception:
+            connection.close()
+            raise
+        endpoint.record_latency(time.perf_counter() - started)
+        if response.will_close:
+            connection.close()
+        else:
+            endpoint.release(connection)
+        return response, body
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json",
+                      timeout=30):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        path = requrl
+        if requrl not in constants.unversioned_paths:
+            path = algod.api_version_path_prefix + path
+        if params:
+            path = path + "?" + parse.urlencode(params)
+
+        submitting = method == "POST" and requrl == "/transactions"
+        tried = []
+        for attempt in range(self.retries + 1):
+            endpoint = self._choose(tried)
+            tried.append(endpoint)
+            request_headers = dict(header)
+            if requrl not in constants.no_auth:
+                request_headers[constants.algod_auth_header] = endpoint.token
+            try:
+                response, body = self._send(endpoint, method, path, data, request_headers, timeout)
+            except (OSError, http.client.HTTPException) as e:
+                logger.warning(f"algod request to {endpoint.address} failed: {e}")
+                endpoint.mark_unhealthy(self.cooldown)
+                if attempt == self.retries:
+                    raise error.AlgodRequestError(f"{method} {requrl} failed on every node: {e}") from e
+                self._sleep_before_retry(attempt)
+                continue
+
+            if response.status in RETRY_STATUSES and attempt < self.retries:
+                retry_after = response.getheader("Retry-After")
+                cooldown = float(retry_after) if retry_after and retry_after.isdigit() else self.cooldown
+                logger.warning(f"algod {endpoint.address} answered {response.status}; retrying on another node.")
+                endpoint.mark_unhealthy(cooldown)
+                self._sleep_before_retry(attempt)
+                continue
+            if response.status >= 400:
+                message, data_field = body.decode("utf-8", errors="replace"), None
+                try:
+                    decoded = json.loads(message)
+                    message, data_field = decoded["message"], decoded.get("data")
+                except (ValueError, KeyError, TypeError):
+                    pass
+                if submitting and attempt and ALREADY_IN_LEDGER in message:
+                    logger.info(f"algod {endpoint.address} already holds the transactions an earlier attempt sent.")
+                    return {"txId": _first_tx_id(data)}
+                raise error.AlgodHTTPError(message, response.status, data_field)
+
+            endpoint.mark_healthy()
+            if response_format != "json":
+                return body
+            if not body:
+                return {}
+            try:
+                return json.loads(body)
+            except ValueError as e:
+                raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
+
+    def check_health(self):
+        """GET /health on every node, updating health and latency; returns the healthy endpoints."""
+        for endpoint in self.endpoints:
+            try:
+                response, _ = self._send(endpoint, "GET", "/health", None, {"User-Agent": "py-algorand-sdk"}, 5)
+            except (OSError, http.client.HTTPException) as e:
+                logger.warning(f"algod {endpoint.address} failed its health check: {e}")
+                endpoint.mark_unhealthy(self.cooldown)
+                continue
+            if response.status == 200:
+                endpoint.mark_healthy()
+            else:
+                endpoint.mark_unhealthy(self.cooldown)
+        return [endpoint for endpoint in self.endpoints if endpoint.healthy]
+
+    def _health_loop(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.warning(f"algod health check failed: {e}")
+
+    def close(self):
+        """Stop health checks and close every pooled connection."""
+        self._stopped.set()
+        for endpoint in self.endpoints:
+            endpoint.close()
@@ -0,0 +1,123 @@
+import hashlib
+
+from algosdk import encoding
+
+from avm import Program, parse_bytes, parse_int
+
+# Opcode bytes from the AVM specification, for the opcodes avm.py evaluates
+OPCODES = {
+    "err": 0x00, "sha256": 0x01, "sha512_256": 0x03,
+    "+": 0x08, "-": 0x09, "/": 0x0a, "*": 0x0b, "<": 0x0c, ">": 0x0d, "<=": 0x0e, ">=": 0x0f,
+    "&&": 0x10, "||": 0x11, "==": 0x12, "!=": 0x13, "!": 0x14, "len": 0x15, "itob": 0x16, "btoi": 0x17,
+    "%": 0x18, "|": 0x19, "&": 0x1a, "^": 0x1b, "~": 0x1c,
+    "intcblock": 0x20, "intc": 0x21, "intc_0": 0x22, "intc_1": 0x23, "intc_2": 0x24, "intc_3": 0x25,
+    "bytecblock": 0x26, "bytec": 0x27, "bytec_0": 0x28, "bytec_1": 0x29, "bytec_2": 0x2a, "bytec_3": 0x2b,
+    "txn": 0x31, "global": 0x32, "gtxn": 0x33, "load": 0x34, "store": 0x35, "txna": 0x36, "gtxna": 0x37,
+    "gtxns": 0x38, "loads": 0x3e, "stores": 0x3f,
+    "bnz": 0x40, "bz": 0x41, "b": 0x42, "return": 0x43, "assert": 0x44, "bury": 0x45, "popn": 0x46,
+    "dupn": 0x47, "pop": 0x48, "dup": 0x49, "dup2": 0x4a, "dig": 0x4b, "swap": 0x4c, "select": 0x4d,
+    "cover": 0x4e, "uncover": 0x4f, "concat": 0x50, "substring": 0x51, "substring3": 0x52,
+    "getbyte": 0x55, "setbyte": 0x56, "extract": 0x57, "extract3": 0x58, "extract_uint16": 0x59,
+    "extract_uint32": 0x5a, "extract_uint64": 0x5b, "replace2": 0x5c, "replace3": 0x5d,
+    "app_global_get": 0x64, "app_global_get_ex": 0x65, "app_global_put": 0x67, "app_global_del": 0x69,
+    "pushbytes": 0x80, "pushint": 0x81, "pushbytess": 0x82, "pushints": 0x83,
+    "callsub": 0x88, "retsub": 0x89, "proto": 0x8a, "frame_dig": 0x8b, "frame_bury": 0x8c,
+    "switch": 0x8d, "match": 0x8e, "shl": 0x90, "shr": 0x91, "exp": 0x94, "b==": 0xa8, "bzero": 0xaf,
+    "log": 0xb0, "box_create": 0xb9, "box_extract": 0xba, "box_replace": 0xbb, "box_del": 0xbc,
+    "box_len": 0xbd, "box_get": 0xbe, "box_put": 0xbf, "txnas": 0xc0,
+}
+
+TXN_FIELDS = {
+    "Sender": 0, "Fee": 1, "FirstValid": 2, "LastValid": 4, "Note": 5, "Lease": 6, "CloseRemainderTo": 9,
+    "TypeEnum": 16, "GroupIndex": 22, "ApplicationID": 24, "OnCompletion": 25, "ApplicationArgs": 26,
+    "NumAppArgs": 27, "Accounts": 28, "NumAccounts": 29, "RekeyTo": 32, "Applications": 50,
+    "NumApplications": 51,
+}
+
+GLOBAL_FIELDS = {
+    "MinTxnFee": 0, "MinBalance": 1, "MaxTxnLife": 2, "ZeroAddress": 3, "GroupSize": 4, "Round": 6,
+    "LatestTimestamp": 7, "CurrentApplicationID": 8, "CreatorAddress": 9, "CurrentApplicationAddress": 10,
+    "OpcodeBudget": 12,
+}
+
+# Immediate layout per opcode: u1 = one byte, s1 = signed byte, label = 2-byte branch offset
+IMMEDIATES = {
+    "intc": "u1", "bytec": "u1", "load": "u1", "store": "u1", "bury": "u1", "popn": "u1", "dupn": "u1",
+    "dig": "u1", "cover": "u1", "uncover": "u1", "replace2": "u1",
+    "extract": "u1 u1", "substring": "u1 u1", "proto": "u1 u1", "gtxns": "txn",
+    "frame_dig": "s1", "frame_bury": "s1", "txn": "txn", "txnas": "txn", "txna": "txn u1",
+    "gtxn": "u1 txn", "gtxna": "u1 txn u1", "global": "global",
+    "bnz": "label", "bz": "label", "b": "label", "callsub": "label",
+}
+
+def varuint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _encode(op, args, constant, offset, size, labels):
+    if isinstance(constant, int):
+        return bytes([OPCODES["pushint"]]) + varuint(constant)
+    if isinstance(constant, bytes):
+        return bytes([OPCODES["pushbytes"]]) + varuint(len(constant)) + constant
+    if op not in OPCODES:
+        raise ValueError(f"cannot assemble opcode {op}")
+    out = bytearray([OPCODES[op]])
+    if op in ("pushints", "intcblock"):
+        out += varuint(len(args)) + b"".join(varuint(parse_int(arg)) for arg in args)
+    elif op in ("pushbytess", "bytecblock"):
+        values = [parse_bytes([arg]) for arg in args]
+        out += varuint(len(values)) + b"".join(varuint(len(value)) + value for value in values)
+    elif op in ("switch", "match"):
+        out.append(len(args))
+        end = offset + size
+        for label in args:
+            out += ((labels(label) - end) & 0xffff).to_bytes(2, "big") if labels else bytes(2)
+    else:
+        for kind, arg in zip(IMMEDIATES.get(op, "").split(), args):
+            if kind == "u1":
+                out.append(int(arg))
+            elif kind == "s1":
+                out.append(int(arg) & 0xff)
+            elif kind == "txn":
+                out.append(TXN_FIELDS[arg])
+            elif kind == "global":
+                out.append(GLOBAL_FIELDS[arg])
+            elif kind == "label":
+                out += ((labels(arg) - (offset + size)) & 0xffff).to_bytes(2, "big") if labels else bytes(2)
+    return bytes(out)
+
+def assemble(teal):
+    """Assemble TEAL into bytecode.
+
+    Every constant is emitted as pushint/pushbytes rather than through the
+    constant blocks goal builds, so programs come out a few bytes larger than
+    algod's and hash differently; use it for sizes and local stand-ins, and
+    algod compile for anything deployed.
+    """
+    program = Program(teal)
+    # First pass sizes every instruction (branch immediates have a fixed width), second encodes offsets
+    sizes = [len(_encode(op, args, constant, 0, 0, None)) for op, args, _, constant in program.instructions]
+    header = varuint(program.version)
+    offsets = [len(header)]
+    for size in sizes:
+        offsets.append(offsets[-1] + size)
+
+    def label_offset(label):
+        return offsets[program.labels[label]]
+
+    body = b"".join(
+        _encode(op, args, constant, offsets[i], sizes[i], label_offset)
+        for i, (op, args, _, constant) in enumerate(program.instructions)
+    )
+    return header + body
+
+def program_hash(bytecode):
+    """Address of a program, as reported by algod compile."""
+    return encoding.encode_address(hashlib.new("sha512_256", b"Program" + bytecode).digest())
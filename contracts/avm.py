@@ -0,0 +1,673 @@
+import base64
+import hashlib
+
+from algosdk import encoding
+
+# Opcode budget of a single application call; budgets of a group are pooled
+APP_CALL_BUDGET = 700
+
+MAX_UINT64 = 2**64 - 1
+
+NAMED_INTS = {
+    "NoOp": 0, "OptIn": 1, "CloseOut": 2, "ClearState": 3, "UpdateApplication": 4, "DeleteApplication": 5,
+    "unknown": 0, "pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6,
+}
+
+# Opcodes that cost more than 1
+OPCODE_COSTS = {"sha256": 35, "sha512_256": 45}
+
+class AvmError(Exception):
+    """The program failed: err, a failed assert, a type error or an exhausted budget."""
+
+    def __init__(self, message, line=None):
+        super().__init__(f"{message} (line {line})" if line else message)
+        self.line = line
+
+def _tokenize(line):
+    tokens = []
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if char.isspace():
+            i += 1
+        elif line.startswith("//", i):
+            break
+        elif char == '"':
+            end = i + 1
+            while end < len(line) and line[end] != '"':
+                end += 2 if line[end] == "\\" else 1
+            tokens.append(line[i:end + 1])
+            i = end + 1
+        else:
+            end = i
+            while end < len(line) and not line[end].isspace():
+                end += 1
+            tokens.append(line[i:end])
+            i = end
+    return tokens
+
+def _string_literal(token):
+    body = token[1:-1]
+    out = bytearray()
+    i = 0
+    while i < len(body):
+        if body[i] == "\\":
+            escape = body[i + 1]
+            if escape == "x":
+                out.append(int(body[i + 2:i + 4], 16))
+                i += 4
+                continue
+            out.extend({"n": b"\n", "r": b"\r", "t": b"\t", "\\": b"\\", '"': b'"'}[escape])
+            i += 2
+        else:
+            out.extend(body[i].encode())
+            i += 1
+    return bytes(out)
+
+def parse_bytes(tokens):
+    """Decode the immediate of a byte constant in any of the assembler's notations."""
+    first = tokens[0]
+    if first.startswith('"'):
+        return _string_literal(first)
+    if first.startswith("0x"):
+        return bytes.fromhex(first[2:])
+    if first in ("base64", "b64"):
+        return base64.b64decode(tokens[1])
+    if first in ("base32", "b32"):
+        return base64.b32decode(tokens[1] + "=" * (-len(tokens[1]) % 8))
+    for prefix, decode in (("base64(", base64.b64decode), ("b64(", base64.b64decode)):
+        if first.startswith(prefix):
+            return decode(first[len(prefix):-1])
+    raise ValueError(f"Unsupported byte constant {' '.join(tokens)}")
+
+def parse_int(token):
+    if token in NAMED_INTS:
+        return NAMED_INTS[token]
+    return int(token, 0)
+
+def method_selector(signature):
+    return hashlib.new("sha512_256", signature.encode()).digest()[:4]
+
+class Program:
+    """TEAL source parsed into instructions with resolved labels."""
+
+    def __init__(self, teal):
+        self.source = teal
+        self.instructions = []
+        self.labels = {}
+        self.version = 1
+        for line_no, raw in enumerate(teal.splitlines(), start=1):
+            tokens = _tokenize(raw)
+            if not tokens:
+                continue
+            if tokens[0] == "#pragma":
+                if tokens[1] == "version":
+                    self.version = int(tokens[2])
+                continue
+            if tokens[0].endswith(":") and len(tokens) == 1:
+                self.labels[tokens[0][:-1]] = len(self.instructions)
+                continue
+            self.instructions.append((tokens[0], tokens[1:], line_no, self._constant(tokens[0], tokens[1:])))
+
+    @staticmethod
+    def _constant(op, args):
+        # Constants are decoded once here rather than on every execution
+        if op in ("int", "pushint"):
+            return parse_int(args[0])
+        if op in ("byte", "pushbytes"):
+            return parse_bytes(args)
+        if op == "addr":
+            return encoding.decode_address(args[0])
+        if op == "method":
+            return method_selector(_string_literal(args[0]).decode())
+        return None
+
+    def target(self, label, line):
+        if label not in self.labels:
+            raise AvmError(f"unknown label {label}", line)
+        return self.labels[label]
+
+class Ledger:
+    """Global state, boxes and chain clock shared by the apps under test."""
+
+    def __init__(self, timestamp=1_700_000_000, round=1):
+        self.timestamp = timestamp
+        self.round = round
+        self.apps = {}
+        self._next_app_id = 1000
+
+    def create_app(self, creator, approval, clear=None, global_state=None, app_id=None):
+        """Register an app without running its creation branch."""
+        if app_id is None:
+            app_id = self._next_app_id
+            self._next_app_id += 1
+        self.apps[app_id] = {
+            "creator": creator,
+            "approval": approval if isinstance(approval, Program) else Program(approval),
+            "clear": clear if clear is None or isinstance(clear, Program) else Program(clear),
+            "global": dict(global_state or {}),
+            "boxes": {},
+        }
+        return app_id
+
+    def global_state(self, app_id):
+        return self.apps[app_id]["global"]
+
+    def boxes(self, app_id):
+        return self.apps[app_id]["boxes"]
+
+    def snapshot(self):
+        # Stored values are immutable, so copying the containers is enough
+        return {app_id: (dict(app["global"]), dict(app["boxes"])) for app_id, app in self.apps.items()}
+
+    def restore(self, snapshot):
+        for app_id, (global_state, boxes) in snapshot.items():
+            self.apps[app_id]["global"] = global_state
+            self.apps[app_id]["boxes"] = boxes
+
+def _check_uint(value, line):
+    if not isinstance(value, int):
+        raise AvmError("expected uint64, got bytes", line)
+    return value
+
+def _check_bytes(value, line):
+    if not isinstance(value, (bytes, bytearray)):
+        raise AvmError("expected bytes, got uint64", line)
+    return bytes(value)
+
+def _uint(value, line):
+    if value < 0 or value > MAX_UINT64:
+        raise AvmError("uint64 overflow", line)
+    return value
+
+class Evaluation:
+    """Runs one application call of a program against a ledger."""
+
+    def __init__(self, ledger, app_id, txn, group=None, group_index=0, budget=APP_CALL_BUDGET, trace=False):
+        self.ledger = ledger
+        self.app_id = app_id
+        self.app = ledger.apps[app_id]
+        self.program = self.app["approval"]
+        self.txn = txn
+        self.group = group or [txn]
+        self.group_index = group_index
+        self.budget = budget
+        self.cost = 0
+        self.stack = []
+        self.scratch = [0] * 256
+        self.frames = []
+        self.logs = []
+        self.trace = [] if trace else None
+
+    # Transaction and global fields
+
+    def txn_field(self, group_index, field, index=None):
+        txn = self.group[group_index]
+        if field == "ApplicationArgs":
+            args = txn.get("application_args", [])
+            if index >= len(args):
+                raise AvmError(f"invalid ApplicationArgs index {index}")
+            return bytes(args[index])
+        if field == "Accounts":
+            accounts = [txn["sender"]] + list(txn.get("accounts", []))
+            return accounts[index]
+        if field == "Applications":
+            return ([self.app_id] + list(txn.get("foreign_apps", [])))[index]
+        values = {
+            "Sender": txn["sender"],
+            "ApplicationID": txn.get("application_id", self.app_id),
+            "OnCompletion": txn.get("on_completion", 0),
+            "NumAppArgs": len(txn.get("application_args", [])),
+            "NumAccounts": len(txn.get("accounts", [])),
+            "NumApplications": len(txn.get("foreign_apps", [])),
+            "TypeEnum": txn.get("type_enum", 6),
+            "Fee": txn.get("fee", 1000),
+            "FirstValid": txn.get("first_valid", self.ledger.round),
+            "LastValid": txn.get("last_valid", self.ledger.round + 1000),
+            "GroupIndex": group_index,
+            "RekeyTo": txn.get("rekey_to", bytes(32)),
+            "CloseRemainderTo": txn.get("close_remainder_to", bytes(32)),
+            "Note": txn.get("note", b""),
+            "Lease": txn.get("lease", bytes(32)),
+        }
+        if field not in values:
+            raise AvmError(f"unsupported txn field {field}")
+        return values[field]
+
+    def global_field(self, field):
+        values = {
+            "LatestTimestamp": self.ledger.timestamp,
+            "Round": self.ledger.round,
+            "CurrentApplicationID": self.app_id,
+            "CreatorAddress": self.app["creator"],
+            "GroupSize": len(self.group),
+            "ZeroAddress": bytes(32),
+            "MinTxnFee": 1000,
+            "MinBalance": 100_000,
+            "MaxTxnLife": 1000,
+            "OpcodeBudget": self.budget - self.cost,
+        }
+        if field == "CurrentApplicationAddress":
+            return encoding.checksum(b"appID" + self.app_id.to_bytes(8, "big"))
+        if field not in values:
+            raise AvmError(f"unsupported global field {field}")
+        return values[field]
+
+    # Boxes
+
+    def box_name(self, name, line):
+        name = _check_bytes(name, line)
+        if not 1 <= len(name) <= 64:
+            raise AvmError("box names must be 1 to 64 bytes", line)
+        refs = self.txn.get("boxes")
+        if refs is not None:
+            # Box references are pooled across the group
+            pooled = {bytes(ref) for member in self.group for ref in member.get("boxes") or []}
+            if name not in pooled:
+                raise AvmError(f"box {name!r} is not referenced", line)
+        return name
+
+    # Execution
+
+    def pop(self, count=1):
+        if len(self.stack) < count:
+            raise AvmError("stack underflow")
+        if count == 1:
+            return self.stack.pop()
+        values = self.stack[-count:]
+        del self.stack[-count:]
+        return values
+
+    def run(self):
+        """Execute the program; returns True when approved, raises AvmError when it fails."""
+        instructions = self.program.instructions
+        pc = 0
+        while pc < len(instructions):
+            op, args, line, constant = instructions[pc]
+            cost = OPCODE_COSTS.get(op, 1)
+            self.cost += cost
+            if self.cost > self.budget:
+                raise AvmError("dynamic cost budget exceeded", line)
+            if self.trace is not None:
+                self.trace.append((pc, line, op, cost))
+            if constant is not None:
+                self.stack.append(constant)
+                pc += 1
+                continue
+            try:
+                result = self.step(op, args, line, pc)
+            except AvmError:
+                raise
+            except (IndexError, KeyError, ValueError, TypeError) as e:
+                raise AvmError(f"{op} failed: {e}", line)
+            if isinstance(result, tuple):
+                return bool(_check_uint(result[1], line))
+            pc = pc + 1 if result is None else result
+        if len(self.stack) != 1:
+            raise AvmError(f"stack has {len(self.stack)} values at end of program")
+        return bool(_check_uint(self.stack[0], None))
+
+    # Filled in below the class from _OPCODE_GROUPS
+    HANDLERS = {}
+
+    def step(self, op, args, line, pc):
+        """Execute one instruction. Returns the next pc, None to fall through or ("return", value)."""
+        handler = self.HANDLERS.get(op)
+        if handler is None:
+            raise AvmError(f"unsupported opcode {op}", line)
+        return handler(self, op, args, line, pc)
+
+    def _constants(self, op, args, line, pc):
+        """Constant blocks and multi-value pushes; single constants are pre-decoded by Program."""
+        stack = self.stack
+        push = stack.append
+        if op == "pushints":
+            stack.extend(parse_int(arg) for arg in args)
+        elif op == "pushbytess":
+            stack.extend(parse_bytes([arg]) for arg in args)
+        elif op == "intcblock":
+            self.intc = [parse_int(arg) for arg in args]
+        elif op == "bytecblock":
+            self.bytec = [parse_bytes([arg]) for arg in args]
+        elif op.startswith("intc"):
+            push(self.intc[int(args[0]) if op == "intc" else int(op[5:])])
+        elif op.startswith("bytec"):
+            push(self.bytec[int(args[0]) if op == "bytec" else int(op[6:])])
+
+    def _fields(self, op, args, line, pc):
+        """txn, gtxn and global fields."""
+        push = self.stack.append
+        if op == "txn":
+            push(self.txn_field(self.group_index, args[0], int(args[1]) if len(args) > 1 else None))
+        elif op == "txna":
+            push(self.txn_field(self.group_index, args[0], int(args[1])))
+        elif op == "txnas":
+            push(self.txn_field(self.group_index, args[0], _check_uint(self.pop(), line)))
+        elif op == "gtxn":
+            push(self.txn_field(int(args[0]), args[1], int(args[2]) if len(args) > 2 else None))
+        elif op == "gtxna":
+            push(self.txn_field(int(args[0]), args[1], int(args[2])))
+        elif op == "gtxns":
+            push(self.txn_field(_check_uint(self.pop(), line), args[0]))
+        elif op == "global":
+            push(self.global_field(args[0]))
+
+    def _flow(self, op, args, line, pc):
+        """Branches, subroutines, err, assert and return."""
+        stack = self.stack
+        push = stack.append
+        program = self.program
+        if op == "err":
+            raise AvmError("err opcode executed", line)
+        elif op == "assert":
+            if not _check_uint(self.pop(), line):
+                raise AvmError("assert failed", line)
+        elif op == "return":
+            return ("return", self.pop())
+        elif op == "bnz":
+            if _check_uint(self.pop(), line):
+                return program.target(args[0], line)
+        elif op == "bz":
+            if not _check_uint(self.pop(), line):
+                return program.target(args[0], line)
+        elif op == "b":
+            return program.target(args[0], line)
+        elif op == "switch":
+            index = _check_uint(self.pop(), line)
+            if index < len(args):
+                return program.target(args[index], line)
+        elif op == "match":
+            target = self.pop()
+            candidates = self.pop(len(args)) if args else []
+            for label, candidate in zip(args, candidates):
+                if isinstance(candidate, int) == isinstance(target, int) and candidate == target:
+                    return program.target(label, line)
+        elif op == "callsub":
+            self.frames.append({"return": pc + 1, "height": None})
+            return program.target(args[0], line)
+        elif op == "proto":
+            frame = self.frames[-1]
+            frame["args"], frame["returns"] = int(args[0]), int(args[1])
+            frame["height"] = len(stack)
+        elif op == "retsub":
+            frame = self.frames.pop()
+            if frame["height"] is not None:
+                returns = stack[-frame["returns"]:] if frame["returns"] else []
+                del stack[frame["height"] - frame["args"]:]
+                stack.extend(returns)
+            return frame["return"]
+        elif op == "frame_dig":
+            frame = self.frames[-1]
+            push(stack[frame["height"] + int(args[0])])
+        elif op == "frame_bury":
+            frame = self.frames[-1]
+            stack[frame["height"] + int(args[0])] = self.pop()
+
+    def _stack_ops(self, op, args, line, pc):
+        """Stack manipulation."""
+        stack = self.stack
+        push = stack.append
+        if op == "pop":
+            self.pop()
+        elif op == "popn":
+            self.pop(int(args[0]))
+        elif op == "dup":
+            push(stack[-1])
+        elif op == "dup2":
+            stack.extend(stack[-2:])
+        elif op == "dupn":
+            stack.extend([stack[-1]] * int(args[0]))
+        elif op == "swap":
+            stack[-1], stack[-2] = stack[-2], stack[-1]
+        elif op == "dig":
+            push(stack[-1 - int(args[0])])
+        elif op == "bury":
+            stack[-1 - int(args[0])] = self.pop()
+        elif op == "cover":
+            value = self.pop()
+            stack.insert(len(stack) - int(args[0]), value)
+        elif op == "uncover":
+            push(stack.pop(-1 - int(args[0])))
+        elif op == "select":
+            a, b, c = self.pop(3)
+            push(b if _check_uint(c, line) else a)
+
+    def _scratch(self, op, args, line, pc):
+        """Scratch space loads and stores."""
+        push = self.stack.append
+        if op == "store":
+            self.scratch[int(args[0])] = self.pop()
+        elif op == "load":
+            push(self.scratch[int(args[0])])
+        elif op == "stores":
+            index, value = self.pop(2)
+            self.scratch[_check_uint(index, line)] = value
+        elif op == "loads":
+            push(self.scratch[_check_uint(self.pop(), line)])
+
+    def _arithmetic(self, op, args, line, pc):
+        """uint64 arithmetic, comparisons and logic."""
+        push = self.stack.append
+        if op in ("+", "-", "*", "/", "%", "<", ">", "<=", ">=", "&&", "||", "&", "|", "^", "shl", "shr", "exp"):
+            a, b = (_check_uint(value, line) for value in self.pop(2))
+            if op in ("/", "%") and b == 0:
+                raise AvmError("division by zero", line)
+            result = {
+                "+": lambda: a + b, "-": lambda: a - b, "*": lambda: a * b, "/": lambda: a // b,
+                "%": lambda: a % b, "<": lambda: int(a < b), ">": lambda: int(a > b),
+                "<=": lambda: int(a <= b), ">=": lambda: int(a >= b), "&&": lambda: int(bool(a and b)),
+                "||": lambda: int(bool(a or b)), "&": lambda: a & b, "|": lambda: a | b, "^": lambda: a ^ b,
+                "shl": lambda: (a << b) & MAX_UINT64, "shr": lambda: a >> b, "exp": lambda: a ** b,
+            }[op]()
+            push(_uint(result, line))
+        elif op in ("==", "!="):
+            a, b = self.pop(2)
+            if isinstance(a, (bytes, bytearray)) != isinstance(b, (bytes, bytearray)):
+                raise AvmError(f"cannot compare {type(a).__name__} to {type(b).__name__}", line)
+            push(int((a == b) == (op == "==")))
+        elif op == "!":
+            push(int(not _check_uint(self.pop(), line)))
+        elif op == "~":
+            push(MAX_UINT64 ^ _check_uint(self.pop(), line))
+
+    def _bytes(self, op, args, line, pc):
+        """Byte-array operations and hashes."""
+        push = self.stack.append
+        if op == "len":
+            push(len(_check_bytes(self.pop(), line)))
+        elif op == "itob":
+            push(_check_uint(self.pop(), line).to_bytes(8, "big"))
+        elif op == "btoi":
+            value = _check_bytes(self.pop(), line)
+            if len(value) > 8:
+                raise AvmError("btoi arg too long", line)
+            push(int.from_bytes(value, "big"))
+        elif op == "bzero":
+            push(bytes(_check_uint(self.pop(), line)))
+        elif op == "concat":
+            a, b = (_check_bytes(value, line) for value in self.pop(2))
+            if len(a) + len(b) > 4096:
+                raise AvmError("concat produced a too big byte-array", line)
+            push(a + b)
+        elif op in ("substring", "substring3", "extract", "extract3"):
+            if op == "substring":
+                value, start, end = _check_bytes(self.pop(), line), int(args[0]), int(args[1])
+            elif op == "substring3":
+                value, start, end = self.pop(3)
+                value = _check_bytes(value, line)
+            else:
+                if op == "extract":
+                    value, start, length = _check_bytes(self.pop(), line), int(args[0]), int(args[1])
+                else:
+                    value, start, length = self.pop(3)
+                    value = _check_bytes(value, line)
+                # extract with a zero immediate length runs to the end
+                end = len(value) if op == "extract" and length == 0 else start + length
+            if start > end or end > len(value):
+                raise AvmError(f"{op} range beyond length of string", line)
+            push(value[start:end])
+        elif op in ("extract_uint16", "extract_uint32", "extract_uint64"):
+            value, start = self.pop(2)
+            width = int(op[len("extract_uint"):]) // 8
+            value = _check_bytes(value, line)
+            if start + width > len(value):
+                raise AvmError(f"{op} range beyond length of string", line)
+            push(int.from_bytes(value[start:start + width], "big"))
+        elif op == "getbyte":
+            value, index = self.pop(2)
+            push(_check_bytes(value, line)[index])
+        elif op == "setbyte":
+            value, index, byte = self.pop(3)
+            value = bytearray(_check_bytes(value, line))
+            value[index] = byte
+            push(bytes(value))
+        elif op in ("replace2", "replace3"):
+            if op == "replace2":
+                value, replacement = self.pop(2)
+                start = int(args[0])
+            else:
+                value, start, replacement = self.pop(3)
+            value, replacement = _check_bytes(value, line), _check_bytes(replacement, line)
+            if start + len(replacement) > len(value):
+                raise AvmError(f"{op} range beyond length of string", line)
+            push(value[:start] + replacement + value[start + len(replacement):])
+        elif op == "b==":
+            a, b = (_check_bytes(value, line) for value in self.pop(2))
+            push(int(int.from_bytes(a, "big") == int.from_bytes(b, "big")))
+        elif op in ("sha256", "sha512_256"):
+            push(hashlib.new(op, _check_bytes(self.pop(), line)).digest())
+
+    def _state(self, op, args, line, pc):
+        """Global state and logs."""
+        push = self.stack.append
+        if op == "app_global_get":
+            push(self.app["global"].get(_check_bytes(self.pop(), line), 0))
+        elif op == "app_global_get_ex":
+            app, key = self.pop(2)
+            state = self.ledger.apps.get(self.app_id if app == 0 else app, {}).get("global", {})
+            key = _check_bytes(key, line)
+            push(state.get(key, 0))
+            push(int(key in state))
+        elif op == "app_global_put":
+            key, value = self.pop(2)
+            key = _check_bytes(key, line)
+            if len(key) > 64:
+                raise AvmError("key too long", line)
+            self.app["global"][key] = bytes(value) if isinstance(value, (bytes, bytearray)) else value
+        elif op == "app_global_del":
+            self.app["global"].pop(_check_bytes(self.pop(), line), None)
+        elif op == "log":
+            self.logs.append(_check_bytes(self.pop(), line))
+
+    def _boxes(self, op, args, line, pc):
+        """Box storage."""
+        push = self.stack.append
+        if op == "box_create":
+            name, size = self.pop(2)
+            name = self.box_name(name, line)
+            boxes = self.app["boxes"]
+            if name in boxes:
+                # An existing box of the same size is left alone, any other size is an error
+                if len(boxes[name]) != size:
+                    raise AvmError("box_create with a different size than the existing box", line)
+                push(0)
+            else:
+                boxes[name] = bytes(_check_uint(size, line))
+                push(1)
+        elif op == "box_put":
+            name, value = self.pop(2)
+            name, value = self.box_name(name, line), _check_bytes(value, line)
+            boxes = self.app["boxes"]
+            if name in boxes and len(boxes[name]) != len(value):
+                raise AvmError("box_put wrong size", line)
+            if len(value) > 32768:
+                raise AvmError("box size too large", line)
+            boxes[name] = value
+        elif op == "box_get":
+            name = self.box_name(self.pop(), line)
+            value = self.app["boxes"].get(name)
+            push(value if value is not None else b"")
+            push(int(value is not None))
+        elif op == "box_len":
+            name = self.box_name(self.pop(), line)
+            value = self.app["boxes"].get(name)
+            push(len(value) if value is not None else 0)
+            push(int(value is not None))
+        elif op == "box_del":
+            name = self.box_name(self.pop(), line)
+            push(int(self.app["boxes"].pop(name, None) is not None))
+        elif op in ("box_extract", "box_replace"):
+            if op == "box_extract":
+                name, start, length = self.pop(3)
+            else:
+                name, start, replacement = self.pop(3)
+                length = len(_check_bytes(replacement, line))
+            name = self.box_name(name, line)
+            value = self.app["boxes"].get(name)
+            if value is None:
+                raise AvmError(f"no such box {name!r}", line)
+            if start + length > len(value):
+                raise AvmError(f"{op} range beyond box size", line)
+            if op == "box_extract":
+                push(value[start:start + length])
+            else:
+                self.app["boxes"][name] = value[:start] + replacement + value[start + length:]
+
+# Opcode -> Evaluation method implementing it
+_OPCODE_GROUPS = {
+    "_constants": (
+        "pushints", "pushbytess", "intcblock", "bytecblock", "intc", "intc_0", "intc_1", "intc_2", "intc_3",
+        "bytec", "bytec_0", "bytec_1", "bytec_2", "bytec_3",
+    ),
+    "_fields": (
+        "txn", "txna", "txnas", "gtxn", "gtxna", "gtxns", "global",
+    ),
+    "_flow": (
+        "err", "assert", "return", "bnz", "bz", "b", "switch", "match", "callsub", "proto", "retsub",
+        "frame_dig", "frame_bury",
+    ),
+    "_stack_ops": (
+        "pop", "popn", "dup", "dup2", "dupn", "swap", "dig", "bury", "cover", "uncover", "select",
+    ),
+    "_scratch": (
+        "store", "load", "stores", "loads",
+    ),
+    "_arithmetic": (
+        "+", "-", "*", "/", "%", "<", ">", "<=", ">=", "&&", "||", "&", "|", "^", "shl", "shr", "exp", "==",
+        "!=", "!", "~",
+    ),
+    "_bytes": (
+        "len", "itob", "btoi", "bzero", "concat", "substring", "substring3", "extract", "extract3",
+        "extract_uint16", "extract_uint32", "extract_uint64", "getbyte", "setbyte", "replace2", "replace3",
+        "b==", "sha256", "sha512_256",
+    ),
+    "_state": (
+        "app_global_get", "app_global_get_ex", "app_global_put", "app_global_del", "log",
+    ),
+    "_boxes": (
+        "box_create", "box_put", "box_get", "box_len", "box_del", "box_extract", "box_replace",
+    ),
+}
+Evaluation.HANDLERS = {op: getattr(Evaluation, name) for name, ops in _OPCODE_GROUPS.items() for op in ops}
+
+def run_group(ledger, calls, trace=False):
+    """Evaluate app calls as one atomic group with a pooled opcode budget.
+
+    calls is a list of (app_id, txn) pairs. Returns the Evaluation of every
+    call; state changes are only kept when every call approves.
+    """
+    group = [txn for _, txn in calls]
+    snapshot = ledger.snapshot()
+    remaining = APP_CALL_BUDGET * len(calls)
+    evaluations = []
+    try:
+        for index, (app_id, txn) in enumerate(calls):
+            evaluation = Evaluation(ledger, app_id, txn, group, index, budget=remaining, trace=trace)
+            if not evaluation.run():
+                raise AvmError(f"transaction {index} rejected by the approval program")
+            remaining -= evaluation.cost
+            evaluations.append(evaluation)
+    except AvmError:
+        ledger.restore(snapshot)
+        raise
+    return evaluations
@@ -0,0 +1,79 @@
+from collections import namedtuple
+import base64
+import logging
+
+from algosdk.transaction import assign_group_id
+
+from tracker import ConfirmationTracker
+
+logger = logging.getLogger(__name__)
+
+# Protocol limit on the number of transactions in one atomic group
+MAX_GROUP_SIZE = 16
+
+# One consent operation: its name for reporting, the unsigned app call and the sender's key
+ConsentOperation = namedtuple("ConsentOperation", ["name", "txn", "private_key"])
+
+def chunk_operations(operations, group_size=MAX_GROUP_SIZE):
+    """Split operations into consecutive chunks of at most group_size."""
+    if not 1 <= group_size <= MAX_GROUP_SIZE:
+        raise ValueError(f"group_size must be between 1 and {MAX_GROUP_SIZE}")
+    return [operations[i:i + group_size] for i in range(0, len(operations), group_size)]
+
+def sign_group(operations):
+    """Assign a group ID to the operations' transactions and sign each with its sender's key."""
+    txns = assign_group_id([op.txn for op in operations])
+    return [txn.sign(op.private_key) for txn, op in zip(txns, operations)]
+
+def send_batch(client, operations, group_size=MAX_GROUP_SIZE, tracker=None):
+    """Submit operations as atomic groups and return one result dict per operation.
+
+    Every group is sent with a single send_transactions call before any of them
+    is waited on, so the whole batch usually confirms within a round or two.
+    A group succeeds or fails as a whole, so a failure is reported on every
+    operation of that group. Confirmations come from one ConfirmationTracker,
+    either the one passed in or a temporary one for this batch.
+    """
+    results = []
+    submitted = []
+    for group in chunk_operations(list(operations), group_size):
+        signed = sign_group(group)
+        group_results = [{
+            "operation": op.name,
+            "tx_id": stxn.get_txid(),
+            "group_id": base64.b64encode(stxn.transaction.group).decode(),
+            "confirmed_round": None,
+            "error": None,
+        } for op, stxn in zip(group, signed)]
+        results.extend(group_results)
+        try:
+            client.send_transactions(signed)
+            submitted.append((group_results, signed[-1].transaction.last_valid_round))
+        except Exception as e:
+            logger.error(f"Group of {len(group)} operations rejected: {e}")
+            for result in group_results:
+                result["error"] = str(e)
+    logger.info(f"Submitted {len(submitted)} groups for {len(results)} operations.")
+
+    if not submitted:
+        return results
+    owns_tracker = tracker is None
+    if owns_tracker:
+        tracker = ConfirmationTracker(client, fetch_info=False)
+    try:
+        # Transactions of a group confirm in the same round, so one watch covers the group
+        watches = [(group_results, tracker.watch(group_results[-1]["tx_id"], last_valid))
+                   for group_results, last_valid in submitted]
+        for group_results, future in watches:
+            try:
+                txinfo = future.result()
+                for result in group_results:
+                    result["confirmed_round"] = txinfo.get("confirmed-round")
+            except Exception as e:
+                logger.error(f"Group {group_results[0]['tx_id']} did not confirm: {e}")
+                for result in group_results:
+                    result["error"] = str(e)
+    finally:
+        if owns_tracker:
+            tracker.stop()
+    return results
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+
+from algosdk import account, logic
+from algosdk.transaction import ApplicationCreateTxn, OnComplete, PaymentTxn, StateSchema
+
+import deploy
+from batch import ConsentOperation, send_batch
+from build_cache import build_program
+from params_cache import get_suggested_params, params_cache_for
+from submitter import PipelinedSubmitter, percentile
+from tracker import ConfirmationTracker
+
+logger = logging.getLogger(__name__)
+
+# The consent lifecycle each simulated user runs, in order
+LIFECYCLE = ["request_consent", "grant_consent", "view_document", "revoke_consent"]
+STAGES = ["build", "sign", "submit", "confirm"]
+
+DAY = 24 * 60 * 60
+
+# Box minimum balance reserved per consent: a 32-byte request ID and a generous record
+CONSENT_BOX_BALANCE = deploy.box_min_balance(32, 128)
+
+# Funding per simulated user: the account minimum balance plus fees
+USER_FUNDING = 100_000 + 100_000
+
+def _summary(samples):
+    if not samples:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples),
+        "p50": percentile(samples, 0.50),
+        "p95": percentile(samples, 0.95),
+        "p99": percentile(samples, 0.99),
+        "max": max(samples),
+    }
+
+class Recorder:
+    """Per-operation stage timings, confirmation latencies and failures of a benchmark run."""
+
+    def __init__(self):
+        self.stages = {stage: [] for stage in STAGES}
+        self.latencies = {name: [] for name in LIFECYCLE}
+        self.failures = {name: {} for name in LIFECYCLE}
+        self.lifecycles = 0
+        self.aborted = 0
+
+    def record(self, name, timings, latency):
+        for stage, seconds in timings.items():
+            self.stages[stage].append(seconds)
+        self.latencies[name].append(latency)
+
+    def fail(self, name, stage, error):
+        self.failures[name][stage] = self.failures[name].get(stage, 0) + 1
+        logger.warning(f"{name} failed at {stage}: {error}")
+
+    def report(self, elapsed, config):
+        confirmed = sum(len(latencies) for latencies in self.latencies.values())
+        failed = sum(sum(stages.values()) for stages in self.failures.values())
+        latencies = [latency for per_operation in self.latencies.values() for latency in per_operation]
+        return {
+            "config": config,
+            "elapsed_seconds": elapsed,
+            "transactions_confirmed": confirmed,
+            "transactions_failed": failed,
+            "failure_rate": failed / (confirmed + failed) if confirmed + failed else 0.0,
+            "tps": confirmed / elapsed if elapsed else 0.0,
+            "lifecycles_completed": self.lifecycles,
+            "lifecycles_aborted": self.aborted,
+            "lifecycles_per_second": self.lifecycles / elapsed if elapsed else 0.0,
+            "confirmation_latency_seconds": _summary(latencies),
+            "stage_seconds": {stage: _summary(samples) for stage, samples in self.stages.items()},
+            "operations": {
+                name: {"latency_seconds": _summary(self.latencies[name]), "failures": self.failures[name]}
+                for name in LIFECYCLE
+            },
+        }
+
+def create_app(client, creator, users, lifecycles):
+    """Create the box-storage app as creator and fund its boxes and every user; returns (app_id, users)."""
+    address, private_key = creator
+    approval = build_program("box_approval", client)["bytecode"]
+    clear = build_program("clear", client)["bytecode"]
+    params = get_suggested_params(client)
+    txn = ApplicationCreateTxn(address, params, OnComplete.NoOpOC, approval, clear,
+                               StateSchema(num_uints=0, num_byte_slices=1), StateSchema(num_uints=0, num_byte_slices=0))
+    tx_id = client.send_transaction(txn.sign(private_key))
+    app_id = client.pending_transaction_info(tx_id).get("application-index")
+    if app_id is None:
+        app_id = deploy.wait_for_confirmation(tx_id)["application-index"]
+
+    accounts = [account.generate_account()[::-1] for _ in range(users)]
+    funding = [(logic.get_application_address(app_id), 100_000 + CONSENT_BOX_BALANCE * users * lifecycles)]
+    funding += [(user_address, USER_FUNDING) for user_address, _ in accounts]
+    operations = [
+        ConsentOperation("fund", PaymentTxn(address, params, receiver, amount), private_key)
+        for receiver, amount in funding
+    ]
+    errors = [result["error"] for result in send_batch(client, operations) if result["error"]]
+    if errors:
+        raise RuntimeError(f"funding failed: {errors[0]}")
+    return app_id, accounts
+
+async def run_user(client, submitter, recorder, app_id, creator, user, lifecycles, run_id):
+    """Drive lifecycles of request, grant, view and revoke for one simulated user, each step after the last confirms."""
+    builders = {
+        "request_consent": (creator, lambda params, request_id: deploy.request_consent_txn(
+            creator[0], params, app_id, request_id, b"Aadhaar Card", request_id, user[0])),
+        "grant_consent": (creator, lambda params, request_id: deploy.grant_consent_txn(
+            creator[0], params, app_id, request_id, int(time.time()) + DAY, ["view"])),
+        "view_document": (user, lambda params, request_id: deploy.view_document_txn(
+            user[0], params, app_id, request_id)),
+        "revoke_consent": (user, lambda params, request_id: deploy.revoke_consent_txn(
+            user[0], params, app_id, request_id)),
+    }
+    for lifecycle in range(lifecycles):
+        request_id = f"{run_id}-{user[0][:8]}-{lifecycle}".encode()
+        for name in LIFECYCLE:
+            (_, private_key), build = builders[name]
+            started = time.perf_counter()
+            txn = build(get_suggested_params(client), request_id)
+            built = time.perf_counter()
+            signed = txn.sign(private_key)
+            signed_at = time.perf_counter()
+            try:
+                confirmation = await submitter.submit(signed)
+            except Exception as e:
+                recorder.fail(name, "submit", e)
+                break
+            submitted = time.perf_counter()
+            try:
+                await confirmation
+            except Exception as e:
+                recorder.fail(name, "confirm", e)
+                break
+            confirmed = time.perf_counter()
+            recorder.record(name, {
+                "build": built - started,
+                "sign": signed_at - built,
+                "submit": submitted - signed_at,
+                "confirm": confirmed - submitted,
+            }, confirmed - signed_at)
+        else:
+            recorder.lifecycles += 1
+            continue
+        recorder.aborted += 1
+
+async def run(client, creator, users=16, lifecycles=10, window=None):
+    """Run the benchmark and return its report.
+
+    users simulated users each run `lifecycles` consent lifecycles concurrently
+    against a fresh box-storage app created and funded by creator. Confirmation
+    latency runs from submission to confirmation; stage times split each step
+    into building, signing, submitting and waiting for the confirmation.
+    """
+    window = window or users
+    app_id, accounts = create_app(client, creator, users, lifecycles)
+    recorder = Recorder()
+    run_id = secrets.token_hex(4)
+    # On a dev-mode node every submission is its own round, so a window's worth of
+    # rounds can pass between sending a transaction and watching it
+    tracker = ConfirmationTracker(client, recent_rounds=2 * window + 4)
+    started = time.perf_counter()
+    try:
+        async with PipelinedSubmitter(client, window=window, tracker=tracker) as submitter:
+            await asyncio.gather(*(
+                run_user(client, submitter, recorder, app_id, creator, user, lifecycles, run_id) for user in accounts
+            ))
+    finally:
+        tracker.stop()
+    elapsed = time.perf_counter() - started
+    return recorder.report(elapsed, {"users": users, "lifecycles": lifecycles, "app_id": app_id, "window": window})
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent consent lifecycles end to end.")
+    parser.add_argument("--users", type=int, default=16, help="concurrent simulated users")
+    parser.add_argument("--lifecycles", type=int, default=10, help="lifecycles per user")
+    parser.add_argument("--window", type=int, help="transactions in flight (default: one per user)")
+    parser.add_argument("--localnet", action="store_true", help="run against an in-process localnet.py node")
+    parser.add_argument("--block-time", type=float, default=0.0, help="localnet seconds per block")
+    parser.add_argument("--latency", type=float, default=0.0, help="localnet seconds added to every response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="localnet share of requests failed with 503")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    # deploy.py configures INFO logging on import; per-transaction logs would drown the report
+    logging.getLogger().setLevel(logging.WARNING)
+
+    localnet = None
+    if args.localnet:
+        from algod_pool import PooledAlgodClient
+        from localnet import Localnet
+
+        localnet = Localnet(block_time=args.block_time, latency=args.latency, failure_rate=args.failure_rate).start()
+        client = PooledAlgodClient(localnet.address, health_interval=0)
+        # Rounds follow the localnet block time, or every submission in dev mode, rather than testnet's pace
+        params_cache_for(client).block_time = args.block_time or 0.001
+        creator = account.generate_account()[::-1]
+    else:
+        client = deploy.get_client()
+        creator = deploy.get_account_from_mnemonic(os.environ["CREATOR_MNEMONIC"])
+    try:
+        report = asyncio.run(run(client, creator, args.users, args.lifecycles, window=args.window))
+    finally:
+        if localnet is not None:
+            localnet.stop()
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import json
+import logging
+import pathlib
+
+logger = logging.getLogger(__name__)
+
+# PyTeal source of the programs, and the codec module holding their storage layout
+CONTRACT_SOURCES = [pathlib.Path(__file__).with_name(name) for name in ("ConsentContract.py", "codec.py")]
+DEFAULT_CACHE_DIR = pathlib.Path(__file__).with_name(".build_cache")
+
+# Program name -> (ConsentContract builder, TEAL version)
+PROGRAMS = {
+    "approval": ("approval_program", 6),
+    "clear": ("clear_state_program", 6),
+    "box_approval": ("box_approval_program", 8),
+    "abi_approval": ("abi_approval_teal", 8),
+    "merkle_approval": ("merkle_approval_program", 8),
+}
+
+# Contract variant -> its approval program; every variant shares the clear program
+VARIANT_PROGRAMS = {
+    "global": "approval",
+    "box": "box_approval",
+    "abi": "abi_approval",
+    "merkle": "merkle_approval",
+}
+
+def compiler_version():
+    """Version of the PyTeal compiler the TEAL is generated with."""
+    # Imported here: it is slow to load, and consent_cli reads VARIANT_PROGRAMS on every start
+    import importlib.metadata
+
+    return importlib.metadata.version("pyteal")
+
+def source_key(name, version):
+    """Cache key for a program: hash of the PyTeal source, program, TEAL version and compiler version."""
+    digest = hashlib.sha256()
+    for source in CONTRACT_SOURCES:
+        digest.update(source.read_bytes())
+    digest.update(f"\0{name}\0{version}\0pyteal-{compiler_version()}".encode())
+    return digest.hexdigest()
+
+def compile_teal_cached(name, cache_dir=DEFAULT_CACHE_DIR):
+    """TEAL for a ConsentContract program, only running compileTeal when its key is not cached."""
+    builder, version = PROGRAMS[name]
+    cache_dir = pathlib.Path(cache_dir)
+    path = cache_dir / f"{name}-{source_key(name, version)}.teal"
+    if path.exists():
+        logger.info(f"Using cached TEAL for {name}.")
+        return path.read_text()
+
+    logger.info(f"Compiling {name} to TEAL version {version}...")
+    # PyTeal is only imported when something actually needs compiling
+    import ConsentContract
+    from pyteal import Mode, compileTeal
+    program = getattr(ConsentContract, builder)()
+    teal = program if isinstance(program, str) else compileTeal(program, mode=Mode.Application, version=version)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path.write_text(teal)
+    return teal
+
+def _bytecode_path(cache_dir, teal):
+    return pathlib.Path(cache_dir) / f"bytecode-{hashlib.sha256(teal.encode()).hexdigest()}.json"
+
+def assemble_cached(client, teal, cache_dir=DEFAULT_CACHE_DIR):
+    """Assembled bytecode and program hash for TEAL text, only calling algod compile on a miss."""
+    cache_dir = pathlib.Path(cache_dir)
+    path = _bytecode_path(cache_dir, teal)
+    if path.exists():
+        entry = json.loads(path.read_text())
+    else:
+        logger.info("Assembling TEAL with algod...")
+        compile_response = client.compile(teal)
+        entry = {"result": compile_response["result"], "hash": compile_response["hash"]}
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(entry))
+    return base64.b64decode(entry["result"]), entry["hash"]
+
+def cached_programs(cache_dir=DEFAULT_CACHE_DIR):
+    """Bytecode -> TEAL for every program assembled through assemble_cached whose TEAL is still cached."""
+    programs = {}
+    for teal_path in pathlib.Path(cache_dir).glob("*.teal"):
+        teal = teal_path.read_text()
+        path = _bytecode_path(cache_dir, teal)
+        if path.exists():
+            programs[base64.b64decode(json.loads(path.read_text())["result"])] = teal
+    return programs
+
+def build_program(name, client=None, cache_dir=DEFAULT_CACHE_DIR):
+    """TEAL text plus, when a client is given, the assembled bytecode and its program hash."""
+    teal = compile_teal_cached(name, cache_dir)
+    build = {"name": name, "teal": teal, "bytecode": None, "hash": None}
+    if client is not None:
+        build["bytecode"], build["hash"] = assemble_cached(client, teal, cache_dir)
+    return build
+
+def write_teal(name, filename, cache_dir=DEFAULT_CACHE_DIR):
+    """Write a program's TEAL to filename, leaving the file untouched when it is already current."""
+    teal = compile_teal_cached(name, cache_dir)
+    path = pathlib.Path(filename)
+    if path.exists() and path.read_text() == teal:
+        return False
+    path.write_text(teal)
+    return True
@@ -0,0 +1,120 @@
+import hashlib
+import struct
+
+from algosdk import abi, encoding
+
+# Permission flags, as in the ConsentRequest model, packed into one uint64
+PERMISSION_BITS = {"view": 1, "edit": 2, "download": 4, "screenshot": 8}
+
+# Status codes stored in consent boxes and carried by events
+STATUSES = {1: "pending", 2: "granted", 3: "revoked", 4: "expired"}
+STATUS_CODES = {name: code for code, name in STATUSES.items()}
+
+# ARC-4 method signatures served by the ABI router
+ABI_METHODS = {
+    "request_consent": "request_consent(byte[],string,string,address)void",
+    "grant_consent": "grant_consent(uint64,uint64)void",
+    "revoke_consent": "revoke_consent()void",
+    "view_document": "view_document()void",
+    "sweep_expired": "sweep_expired()void",
+}
+
+# ARC-28 events logged by every variant: request_id, actor (the sender), status code, expiry
+EVENTS = {
+    "request_consent": "ConsentRequested(byte[],address,uint8,uint64)",
+    "grant_consent": "ConsentGranted(byte[],address,uint8,uint64)",
+    "revoke_consent": "ConsentRevoked(byte[],address,uint8,uint64)",
+    "view_document": "DocumentViewed(byte[],address,uint8,uint64)",
+    "sweep_expired": "ConsentExpired(byte[],address,uint8,uint64)",
+}
+
+# Consent box: fixed-width header, then len + document_hash and len + document_type
+STATUS_OFFSET = 0
+EXPIRY_OFFSET = 1
+PERMISSIONS_OFFSET = 9
+REQUESTER_OFFSET = 17
+HEADER_SIZE = 49
+_HEADER = struct.Struct(">BQQ32s")
+
+# Merkle-anchored consents: domain-separated leaf and inner node preimages, and the box name prefixes
+MERKLE_LEAF_PREFIX = b"\x00"
+MERKLE_NODE_PREFIX = b"\x01"
+ROOT_BOX_PREFIX = b"r"
+REVOKED_BOX_PREFIX = b"x"
+
+def event_selector(operation):
+    """4-byte ARC-28 selector of an operation's event."""
+    return hashlib.new("sha512_256", EVENTS[operation].encode()).digest()[:4]
+
+def method_selector(operation):
+    """4-byte ARC-4 selector of an operation served by the ABI router."""
+    return abi.Method.from_signature(ABI_METHODS[operation]).get_selector()
+
+# ARC-4 selector -> operation, for decoding ABI-router calls
+ABI_SELECTORS = {method_selector(operation): operation for operation in ABI_METHODS}
+
+def encode_permissions(permissions):
+    """Permission bitmask from a dict of flags, an iterable of flag names or a mask."""
+    if isinstance(permissions, int):
+        return permissions
+    if isinstance(permissions, dict):
+        permissions = [name for name, allowed in permissions.items() if allowed]
+    mask = 0
+    for name in permissions:
+        if name not in PERMISSION_BITS:
+            raise ValueError(f"unknown permission {name!r}")
+        mask |= PERMISSION_BITS[name]
+    return mask
+
+def decode_permissions(mask):
+    return {name: bool(mask & bit) for name, bit in PERMISSION_BITS.items()}
+
+def encode_uint64(value):
+    return value.to_bytes(8, "big")
+
+def decode_uint64(data):
+    return int.from_bytes(data, "big")
+
+def encode_requester(requester):
+    """The raw 32-byte public key the contracts store, from an address, its text bytes or the key itself."""
+    if isinstance(requester, bytes) and len(requester) == 32:
+        return requester
+    if isinstance(requester, bytes):
+        requester = requester.decode()
+    return encoding.decode_address(requester)
+
+def _length_prefixed(value):
+    return len(value).to_bytes(2, "big") + value
+
+def encode_box(status, expiry, permissions, requester, document_hash, document_type):
+    """A consent box value; see box_approval_program for the layout."""
+    header = _HEADER.pack(STATUS_CODES[status], expiry, encode_permissions(permissions), encode_requester(requester))
+    return header + _length_prefixed(document_hash) + _length_prefixed(document_type)
+
+def decode_box(value):
+    """A consent box value as a dict of status, expiry, permissions, requester, document_hash and document_type."""
+    status, expiry, permissions, requester = _HEADER.unpack_from(value)
+    hash_length = int.from_bytes(value[HEADER_SIZE:HEADER_SIZE + 2], "big")
+    type_offset = HEADER_SIZE + 2 + hash_length
+    type_length = int.from_bytes(value[type_offset:type_offset + 2], "big")
+    return {
+        "status": STATUSES[status],
+        "expiry": expiry,
+        "permissions": permissions,
+        "requester": requester,
+        "document_hash": value[HEADER_SIZE + 2:type_offset],
+        "document_type": value[type_offset + 2:type_offset + 2 + type_length],
+    }
+
+def encode_merkle_leaf(request_id, requester, expiry, permissions, document_hash):
+    """Preimage of a Merkle-anchored consent's leaf; see merkle_approval_program for the layout."""
+    return (MERKLE_LEAF_PREFIX + encode_requester(requester) + encode_uint64(expiry)
+            + encode_uint64(encode_permissions(permissions)) + hashlib.sha256(document_hash).digest() + request_id)
+
+def request_args(document_hash, document_type, request_id, requester):
+    """request_consent arguments after the operation, shared by the raw-argument variants."""
+    return [document_hash, document_type, request_id, encode_requester(requester)]
+
+def grant_args(expiry, permissions):
+    """grant_consent expiry and permissions as two 8-byte big-endian integers."""
+    return [encode_uint64(expiry), encode_uint64(encode_permissions(permissions))]
@@ -0,0 +1,119 @@
+import base64
+
+import pytest
+from algosdk import account
+from algosdk.error import AlgodHTTPError
+from algosdk.transaction import ApplicationCreateTxn, OnComplete, StateSchema
+
+from algod_pool import PooledAlgodClient
+from build_cache import build_program
+from harness import ConsentHarness, new_address
+from localnet import Localnet
+
+class LedgerAlgod:
+    """Answers the algod reads state.py makes from a harness ledger."""
+
+    def __init__(self, harness):
+        self.harness = harness
+
+    def status(self):
+        return {"last-round": self.harness.ledger.round}
+
+    def application_info(self, app_id):
+        entries = [
+            {"key": base64.b64encode(key).decode(),
+             "value": {"type": 2, "uint": value} if isinstance(value, int)
+             else {"type": 1, "bytes": base64.b64encode(value).decode()}}
+            for key, value in self.harness.ledger.global_state(app_id).items()
+        ]
+        return {"params": {"global-state": entries}}
+
+    def application_box_by_name(self, app_id, name):
+        if name not in self.harness.ledger.boxes(app_id):
+            raise AlgodHTTPError("box not found", 404)
+        return {"name": base64.b64encode(name).decode(),
+                "value": base64.b64encode(self.harness.ledger.boxes(app_id)[name]).decode()}
+
+class RecordingIndexer:
+    """Records approved harness calls as indexer application transactions, served in pages."""
+
+    def __init__(self, harness):
+        self.harness = harness
+        self.transactions = []
+
+    def call(self, operation, sender, request_id, *args):
+        before = dict(self.harness.global_state)
+        result = self.harness.call(operation, sender, request_id, *args)
+        assert result.approved, result.error
+        delta = [
+            {"key": base64.b64encode(key).decode(),
+             "value": {"action": 2, "uint": value} if isinstance(value, int)
+             else {"action": 1, "bytes": base64.b64encode(value).decode()}}
+            for key, value in self.harness.global_state.items() if before.get(key) != value
+        ]
+        app_args = self.harness.app_args(operation, request_id, *args)
+        self.transactions.append({
+            "sender": sender, "confirmed-round": self.harness.ledger.round, "intra-round-offset": 0,
+            "application-transaction": {
+                "application-id": self.harness.app_id, "global-state-delta": delta,
+                "application-args": [base64.b64encode(arg).decode() for arg in app_args],
+            },
+        })
+        self.harness.advance(5)
+
+    def search_transactions(self, application_id, min_round=None, limit=None, next_page=None, **kwargs):
+        matching = [txn for txn in self.transactions if min_round is None or txn["confirmed-round"] >= min_round]
+        start = int(next_page or 0)
+        page = matching[start:start + limit]
+        return {"transactions": page, "next-token": str(start + limit) if page else None}
+
+@pytest.fixture(params=["approval", "abi_approval", "box_approval"])
+def harness(request):
+    return ConsentHarness(request.param)
+
+@pytest.fixture
+def requester():
+    return new_address()
+
+@pytest.fixture
+def stranger():
+    return new_address()
+
+@pytest.fixture
+def ledger_algod(harness):
+    """algod reads served from the harness ledger; a block is one harness.advance()."""
+    return LedgerAlgod(harness)
+
+@pytest.fixture
+def localnet(request):
+    """A localnet.py node, in dev mode unless indirect parametrization passes other Localnet arguments."""
+    with Localnet(**getattr(request, "param", {})) as node:
+        yield node
+
+@pytest.fixture
+def client(localnet):
+    client = PooledAlgodClient(localnet.address, health_interval=0)
+    yield client
+    client.close()
+
+@pytest.fixture
+def creator():
+    """(address, private key) of a fresh account that creates and owns apps."""
+    return account.generate_account()[::-1]
+
+@pytest.fixture
+def create_app(client):
+    """Create an app running one of the build_cache programs and return its app ID."""
+    def create(program, sender, private_key):
+        approval = build_program(program, client)["bytecode"]
+        clear = build_program("clear", client)["bytecode"]
+        txn = ApplicationCreateTxn(sender, client.suggested_params(), OnComplete.NoOpOC, approval, clear,
+                                   StateSchema(num_uints=8, num_byte_slices=8), StateSchema(num_uints=0, num_byte_slices=0))
+        return client.pending_transaction_info(client.send_transaction(txn.sign(private_key)))["application-index"]
+
+    return create
+
+@pytest.fixture
+def indexer(harness):
+    """An indexer serving the application calls made through it, as recorded from the harness."""
+    return RecordingIndexer(harness)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Consent contract command line: build, deploy, request, grant, revoke, view, status.
+
+Only the standard library and build_cache's table of contract variants are
+imported up front. algosdk, PyTeal and the deploy helpers are imported by the
+subcommands that need them, and no algod client is built until a subcommand
+talks to the network.
+"""
+
+import time
+
+_started = time.perf_counter()
+
+import argparse
+import importlib
+import json
+import os
+import sys
+
+# TEAL files written by `build`, as in ConsentContract.py
+TEAL_FILES = {
+    "approval": "consent_approval.teal",
+    "abi_approval": "consent_abi_approval.teal",
+    "box_approval": "consent_box_approval.teal",
+    "merkle_approval": "consent_merkle_approval.teal",
+    "clear": "consent_clear.teal",
+}
+
+DAY = 24 * 60 * 60
+
+timings = {}
+
+def lazy_import(name):
+    """Import a module on first use, recording how long the import took."""
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    timings[f"import {name}"] = time.perf_counter() - started
+    return module
+
+def account(role):
+    """(address, private_key) of the creator or recipient, from CREATOR_MNEMONIC / RECIPIENT_MNEMONIC."""
+    deploy = lazy_import("deploy")
+    deploy.get_client()  # loads .env
+    variable = f"{role.upper()}_MNEMONIC"
+    words = os.environ.get(variable)
+    if not words:
+        raise SystemExit(f"{variable} is not set")
+    return deploy.get_account_from_mnemonic(words)
+
+def consent_txn(args, sender, operation, *operation_args):
+    """Build the app call for operation in the layout the deployed variant expects."""
+    deploy = lazy_import("deploy")
+    params = lazy_import("params_cache").get_suggested_params(deploy.get_client())
+    if args.variant == "box":
+        builders = {
+            "request_consent": deploy.request_consent_txn,
+            "grant_consent": deploy.grant_consent_txn,
+            "revoke_consent": deploy.revoke_consent_txn,
+            "view_document": deploy.view_document_txn,
+        }
+        return builders[operation](sender, params, args.app_id, *operation_args)
+    if args.variant == "abi":
+        return deploy.abi_call_txn(sender, params, args.app_id, operation, *operation_args)
+    transaction = lazy_import("algosdk.transaction")
+    note = lazy_import("params_cache").unique_note() if operation == "view_document" else None
+    return transaction.ApplicationCallTxn(
+        sender, params, args.app_id, transaction.OnComplete.NoOpOC,
+        app_args=[operation.encode()] + list(operation_args), note=note,
+    )
+
+def send(txn, private_key):
+    deploy = lazy_import("deploy")
+    tx_id = deploy.get_client().send_transaction(txn.sign(private_key))
+    info = deploy.wait_for_confirmation(tx_id)
+    print(json.dumps({"tx_id": tx_id, "confirmed_round": info.get("confirmed-round")}))
+
+def build(args):
+    unknown = sorted(set(args.programs) - set(TEAL_FILES))
+    if unknown:
+        raise SystemExit(f"unknown programs: {', '.join(unknown)}")
+    write_teal = lazy_import("build_cache").write_teal
+    for name in args.programs or list(TEAL_FILES):
+        updated = write_teal(name, TEAL_FILES[name])
+        print(f"{TEAL_FILES[name]}: {'updated' if updated else 'up to date'}")
+
+def deploy_app(args):
+    deploy = lazy_import("deploy")
+    address, private_key = account("creator")
+    if args.tenant:
+        registry = lazy_import("registry")
+        apps = registry.AppRegistry(args.registry or registry.DEFAULT_REGISTRY)
+        print(json.dumps(registry.deploy(deploy.get_client(), apps, args.tenant, address, private_key,
+                                         args.variant, args.dry_run)))
+        return
+    if args.variant == "merkle":
+        app_id = deploy.deploy_box_contract(address, private_key, approval_file=TEAL_FILES["merkle_approval"])
+    else:
+        create = {
+            "global": deploy.deploy_contract,
+            "box": deploy.deploy_box_contract,
+            "abi": deploy.deploy_abi_contract,
+        }[args.variant]
+        app_id = create(address, private_key)
+    print(json.dumps({"app_id": app_id}))
+
+def request(args):
+    address, private_key = account(args.role)
+    codec = lazy_import("codec")
+    request_id = args.request_id.encode()
+    if args.document:
+        document_hash = lazy_import("document_hash").hash_file(args.document)
+    else:
+        document_hash = args.document_hash.encode()
+    if args.variant == "box":
+        operation_args = (document_hash, args.document_type.encode(), request_id, args.requester)
+    elif args.variant == "abi":
+        operation_args = (document_hash, args.document_type, args.request_id, args.requester)
+    else:
+        operation_args = codec.request_args(document_hash, args.document_type.encode(), request_id,
+                                            args.requester)
+    send(consent_txn(args, address, "request_consent", *operation_args), private_key)
+
+def grant(args):
+    address, private_key = account(args.role)
+    codec = lazy_import("codec")
+    expiry = int(time.time()) + args.days * DAY
+    permissions = args.permissions.split(",") if args.permissions else []
+    if args.variant == "box":
+        operation_args = (args.request_id.encode(), expiry, permissions)
+    elif args.variant == "abi":
+        operation_args = (expiry, codec.encode_permissions(permissions))
+    else:
+        operation_args = codec.grant_args(expiry, permissions)
+    send(consent_txn(args, address, "grant_consent", *operation_args), private_key)
+
+def single_request_call(operation):
+    def run(args):
+        address, private_key = account(args.role)
+        operation_args = (args.request_id.encode(),) if args.variant == "box" else ()
+        send(consent_txn(args, address, operation, *operation_args), private_key)
+    return run
+
+def status(args):
+    deploy = lazy_import("deploy")
+    state = lazy_import("state")
+    reader = state.ConsentStateReader(deploy.get_client(), args.app_id, box_storage=args.variant == "box")
+    record = reader.consent(args.request_id)
+    if record is None:
+        print(json.dumps(None))
+        return
+    output = {
+        field: value.decode(errors="replace") if isinstance(value, bytes) else value
+        for field, value in record._asdict().items()
+    }
+    encoding = lazy_import("algosdk.encoding")
+    for field in ("owner", "requester"):
+        value = getattr(record, field)
+        if value is not None and len(value) == 32:
+            output[field] = encoding.encode_address(value)
+    if record.permissions is not None:
+        output["permissions"] = lazy_import("codec").decode_permissions(record.permissions)
+    if args.sender:
+        output["allowed"] = state.is_allowed(record, args.sender)
+    print(json.dumps(output))
+
+def parser():
+    root = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    root.add_argument("--timings", action="store_true",
+                      help="report import, parsing and command times on stderr, from when this module is imported")
+    variants = list(lazy_import("build_cache").VARIANT_PROGRAMS)
+    # Merkle consents are granted off-chain in batches (merkle.py), so its app is only deployed from here
+    consent_variants = [variant for variant in variants if variant != "merkle"]
+    commands = root.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="write the TEAL programs, recompiling only what changed")
+    build_parser.add_argument("programs", nargs="*", metavar="program",
+                              help=f"any of {', '.join(TEAL_FILES)} (default: all)")
+    build_parser.set_defaults(run=build)
+
+    deploy_parser = commands.add_parser("deploy", help="create the app as CREATOR_MNEMONIC")
+    deploy_parser.add_argument("--variant", choices=variants, default="global")
+    deploy_parser.add_argument("--tenant", action="append",
+                               help="create or update this tenant's app through the app registry, only when its "
+                                    "programs changed (repeatable)")
+    deploy_parser.add_argument("--registry", help="app registry file (default: app_registry.json)")
+    deploy_parser.add_argument("--dry-run", action="store_true", help="with --tenant, only report what would change")
+    deploy_parser.set_defaults(run=deploy_app)
+
+    def consent_command(name, run, help_text, role="creator"):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("app_id", type=int)
+        command.add_argument("request_id")
+        command.add_argument("--variant", choices=consent_variants, default="global")
+        command.add_argument("--as", dest="role", choices=["creator", "recipient"], default=role,
+                             help="account that signs the call")
+        command.set_defaults(run=run)
+        return command
+
+    request_parser = consent_command("request", request, "request consent for a document")
+    request_parser.add_argument("--requester", required=True, help="address allowed to view once granted")
+    document = request_parser.add_mutually_exclusive_group(required=True)
+    document.add_argument("--document-hash")
+    document.add_argument("--document", help="file whose sha256 digest is sent as the document hash")
+    request_parser.add_argument("--document-type", required=True)
+
+    grant_parser = consent_command("grant", grant, "grant a pending consent")
+    grant_parser.add_argument("--days", type=int, default=30, help="days until the consent expires")
+    grant_parser.add_argument("--permissions", default="view",
+                              help="comma-separated flags out of view, edit, download and screenshot")
+
+    consent_command("revoke", single_request_call("revoke_consent"), "revoke a granted consent", "recipient")
+    consent_command("view", single_request_call("view_document"), "record a document view on-chain", "recipient")
+
+    status_parser = commands.add_parser("status", help="read a consent from app state without a transaction")
+    status_parser.add_argument("app_id", type=int)
+    status_parser.add_argument("request_id", nargs="?", help="required for the box variant")
+    status_parser.add_argument("--variant", choices=consent_variants, default="global")
+    status_parser.add_argument("--sender", help="also report whether this address may view the document now")
+    status_parser.set_defaults(run=status)
+    return root
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    ready = time.perf_counter()
+    parse_imports = sum(timings.values())
+    try:
+        args.run(args)
+    finally:
+        if args.timings:
+            finished = time.perf_counter()
+            # Measured from this module's import; interpreter startup before it is not included
+            report = {
+                "cli import and parsing": ready - _started - parse_imports,
+                **timings,
+                "command": finished - ready - (sum(timings.values()) - parse_imports),
+                "total since cli import": finished - _started,
+                "process_cpu": time.process_time(),
+            }
+            for name, seconds in report.items():
+                print(f"{name:<32} {seconds * 1000:>9.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,37 @@
+import argparse
+import getpass
+import logging
+import os
+
 from algosdk import account, mnemonic
 
 def create_account():
     private_key = account.generate_account()[0]
     address = account.address_from_private_key(private_key)
     mnemonic_str = mnemonic.from_private_key(private_key)
-    
+
     print(f"Address: {address}")
     print(f"Mnemonic: {mnemonic_str}")
     return address, mnemonic_str
 
+def create_accounts(count, keystore_path, workers=None):
+    """Generate count accounts into an encrypted keystore, resuming one that already exists."""
+    from keystore import generate_keystore
+
+    password = os.environ.get("KEYSTORE_PASSWORD") or getpass.getpass("Keystore password: ")
+    stats = generate_keystore(keystore_path, count, password, workers=workers)
+    print(f"{stats['total']} accounts in {stats['path']} "
+          f"({stats['generated']} generated at {stats['keys_per_second']:.0f} keys/s)")
+    return stats
+
 if __name__ == "__main__":
-    create_account() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create Algorand accounts.")
+    parser.add_argument("--count", type=int, help="bulk mode: number of accounts the keystore should hold")
+    parser.add_argument("--keystore", default="accounts.keystore.jsonl", help="encrypted keystore file for bulk mode")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+    if args.count is None:
+        create_account()
+    else:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+        create_accounts(args.count, args.keystore, args.workers)
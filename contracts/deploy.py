@@ -1,14 +1,17 @@
 import os
-from dotenv import load_dotenv
-from algosdk import account, mnemonic
-from algosdk.v2client import algod
-from algosdk.transaction import ApplicationCreateTxn, ApplicationCallTxn, OnComplete, StateSchema
-import base64
-import json
+from algosdk import abi, account, logic, mnemonic
+from algosdk.transaction import ApplicationCreateTxn, ApplicationCallTxn, OnComplete, PaymentTxn, StateSchema
 import time
 import pathlib
 import logging
 
+from algod_pool import PooledAlgodClient
+from batch import ConsentOperation, send_batch
+from build_cache import assemble_cached
+from codec import (ABI_METHODS, REVOKED_BOX_PREFIX, ROOT_BOX_PREFIX, encode_permissions, encode_uint64,
+                   grant_args, request_args)
+from params_cache import get_suggested_params, unique_note
+
 # Set up logging with a more detailed format
 logging.basicConfig(
     level=logging.INFO,
@@ -16,14 +19,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-load_dotenv()
-logger.info("Loaded environment variables.")
+# Protocol limit on the box references one transaction may carry
+MAX_BOX_REFERENCES = 8
+
+# Opcode budget of one application call, pooled across the calls of a group
+APP_CALL_BUDGET = 700
+
+# Opcode cost of a Merkle view_document call (plus one sha256 round per proof level) and of a budget call
+MERKLE_VIEW_COST = 178
+MERKLE_LEVEL_COST = 66
+BUDGET_CALL_COST = 30
+
+_client = None
+
+def get_client():
+    """The shared algod client, created on first use so importing this module stays cheap.
+
+    Connects to Algorand testnet, or to the comma-separated nodes in ALGOD_ADDRESS.
+    """
+    global _client
+    if _client is None:
+        from dotenv import load_dotenv
 
-# Connect to Algorand testnet
-algod_address = os.environ.get("ALGOD_ADDRESS", "https://testnet-api.algonode.cloud")
-algod_token = os.environ.get("ALGOD_TOKEN", "")
-client = algod.AlgodClient(algod_token, algod_address)
+        load_dotenv()
+        _client = PooledAlgodClient.from_env()
+    return _client
 
 def load_teal(filename):
     """Load a TEAL program from a file."""
@@ -32,79 +52,294 @@ def load_teal(filename):
     with path.open('r') as f:
         return f.read()
 
+def compile_program(source):
+    """Assemble TEAL source into program bytes with the connected node, reusing cached bytecode."""
+    program, _ = assemble_cached(get_client(), source)
+    return program
+
 def get_account_from_mnemonic(mnemonic_str):
-    """Get account address and private key from a mnemonic string."""
+    """Get account address and private key from a mnemonic string.
+
+    Nothing is cached here, so the key lives only as long as the caller keeps
+    it; hold a signer.Keystore (or SigningPool) to sign many transactions.
+    """
     private_key = mnemonic.to_private_key(mnemonic_str)
     address = account.address_from_private_key(private_key)
     return address, private_key
 
 def deploy_contract(creator_address, creator_private_key):
-    """Deploy the smart contract to the Algorand network."""
+    """Deploy the global-state variant of the contract to the Algorand network."""
     logger.info("Starting contract deployment...")
+    app_id = create_application(
+        creator_address, creator_private_key,
+        load_teal("consent_approval.teal"),
+        StateSchema(num_uints=8, num_byte_slices=8)
+    )
+    logger.info(f"Contract deployed with App ID: {app_id}")
+    return app_id
 
-    # Read the approval and clear programs
-    approval_program_source = load_teal("consent_approval.teal")
-    clear_program_source = load_teal("consent_clear.teal")
+def wait_for_confirmation(transaction_id):
+    """Wait for a transaction to be confirmed."""
+    client = get_client()
+    logger.info(f"Waiting for confirmation of tx {transaction_id}...")
+    last_round = client.status().get('last-round')
+    while True:
+        txinfo = client.pending_transaction_info(transaction_id)
+        if txinfo.get('confirmed-round'):
+            logger.info(f"Transaction {transaction_id} confirmed in round {txinfo.get('confirmed-round')}.")
+            return txinfo
+        last_round += 1
+        client.status_after_block(last_round)
 
-    approval_program_compiled = base64.b64decode(approval_program_source)
-    clear_program_compiled = base64.b64decode(clear_program_source)
-    logger.info("TEAL programs loaded and decoded.")
+def box_min_balance(name_length, value_length):
+    """Minimum balance in microAlgos the app account needs for one box."""
+    return 2500 + 400 * (name_length + value_length)
 
-    # Get suggested parameters
-    logger.info("Getting suggested transaction parameters...")
-    params = client.suggested_params()
-    logger.info("Transaction parameters obtained.")
+def create_application(creator_address, creator_private_key, approval_program_source, global_schema):
+    """Compile the given approval program with the clear program and create the app."""
+    client = get_client()
+    approval_program_compiled = compile_program(approval_program_source)
+    clear_program_compiled = compile_program(load_teal("consent_clear.teal"))
+    logger.info("TEAL programs compiled.")
 
-    # Create unsigned transaction
-    logger.info("Creating ApplicationCreateTxn...")
+    params = get_suggested_params(client)
     txn = ApplicationCreateTxn(
         sender=creator_address,
         sp=params,
         on_complete=OnComplete.NoOpOC,
         approval_program=approval_program_compiled,
         clear_program=clear_program_compiled,
-        global_schema=StateSchema(num_uints=8, num_byte_slices=8),
+        global_schema=global_schema,
         local_schema=StateSchema(num_uints=0, num_byte_slices=0)
     )
+    tx_id = client.send_transaction(txn.sign(creator_private_key))
+    logger.info(f"Submitted transaction with ID: {tx_id}")
+    return wait_for_confirmation(tx_id)['application-index']
 
-    # Sign transaction
-    logger.info("Signing transaction...")
-    signed_txn = txn.sign(creator_private_key)
-    logger.info("Transaction signed.")
+def deploy_box_contract(creator_address, creator_private_key, funding=1_000_000,
+                        approval_file="consent_box_approval.teal"):
+    """Deploy the box-storage variant of the contract, or another box-backed approval_file, and fund its boxes."""
+    client = get_client()
+    logger.info("Starting box-storage contract deployment...")
+    # Only the owner lives in global state, consents live in boxes
+    app_id = create_application(
+        creator_address, creator_private_key,
+        load_teal(approval_file),
+        StateSchema(num_uints=0, num_byte_slices=1)
+    )
+    logger.info(f"Box-storage contract deployed with App ID: {app_id}")
+    params = get_suggested_params(client)
 
-    # Submit transaction
-    logger.info("Submitting transaction to the network...")
-    tx_id = client.send_transaction(signed_txn)
-    logger.info(f"Submitted transaction with ID: {tx_id}")
+    # Box storage is paid for by the application account
+    fund_txn = PaymentTxn(
+        sender=creator_address,
+        sp=params,
+        receiver=logic.get_application_address(app_id),
+        amt=funding
+    )
+    fund_tx_id = client.send_transaction(fund_txn.sign(creator_private_key))
+    wait_for_confirmation(fund_tx_id)
+    logger.info(f"Funded application account with {funding} microAlgos.")
+    return app_id
 
-    # Wait for confirmation
-    logger.info("Waiting for transaction confirmation...")
-    try:
-        transaction_response = client.pending_transaction_info(tx_id)
-        app_id = transaction_response['application-index']
-        logger.info(f"Transaction confirmed. Contract deployed with App ID: {app_id}")
-        return app_id
-    except Exception as e:
-        logger.error(f"Failed to confirm transaction: {e}")
-        raise
+def box_call_txn(sender, params, app_id, request_id, app_args, note=None):
+    """Build a box-storage app call with the box reference for request_id filled in."""
+    return ApplicationCallTxn(
+        sender=sender,
+        sp=params,
+        index=app_id,
+        on_complete=OnComplete.NoOpOC,
+        app_args=app_args,
+        boxes=[(app_id, request_id)],
+        note=note
+    )
 
-def wait_for_confirmation(transaction_id):
-    """Wait for a transaction to be confirmed."""
-    logger.info(f"Waiting for confirmation of tx {transaction_id}...")
-    last_round = client.status().get('last-round')
-    while True:
-        txinfo = client.pending_transaction_info(transaction_id)
-        if txinfo.get('confirmed-round'):
-            logger.info(f"Transaction {transaction_id} confirmed in round {txinfo.get('confirmed-round')}.")
-            return txinfo
-        last_round += 1
-        client.status_after_block(last_round)
+def request_consent_txn(sender, params, app_id, document_hash, document_type, request_id, requester_address):
+    """Build a box-storage request_consent call."""
+    return box_call_txn(sender, params, app_id, request_id,
+                        [b"request_consent"] + request_args(document_hash, document_type, request_id, requester_address))
+
+def grant_consent_txn(sender, params, app_id, request_id, expiry, permissions):
+    """Build a box-storage grant_consent call; permissions is anything codec.encode_permissions takes."""
+    return box_call_txn(sender, params, app_id, request_id,
+                        [b"grant_consent", request_id] + grant_args(expiry, permissions))
+
+def revoke_consent_txn(sender, params, app_id, request_id):
+    """Build a box-storage revoke_consent call."""
+    return box_call_txn(sender, params, app_id, request_id, [b"revoke_consent", request_id])
+
+def view_document_txn(sender, params, app_id, request_id):
+    """Build a box-storage view_document call; a party may view again within the same params window."""
+    return box_call_txn(sender, params, app_id, request_id, [b"view_document", request_id], note=unique_note())
+
+def sweep_expired_txn(sender, params, app_id, request_ids):
+    """Build a box-storage sweep_expired call over up to MAX_BOX_REFERENCES consents."""
+    if not 0 < len(request_ids) <= MAX_BOX_REFERENCES:
+        raise ValueError(f"a sweep covers 1 to {MAX_BOX_REFERENCES} consents, got {len(request_ids)}")
+    return ApplicationCallTxn(
+        sender=sender,
+        sp=params,
+        index=app_id,
+        on_complete=OnComplete.NoOpOC,
+        app_args=[b"sweep_expired", *request_ids],
+        boxes=[(app_id, request_id) for request_id in request_ids]
+    )
+
+def anchor_root_txn(sender, params, app_id, root):
+    """Build a Merkle-anchoring anchor_root call for the root of a merkle.ConsentBatch."""
+    return ApplicationCallTxn(
+        sender=sender,
+        sp=params,
+        index=app_id,
+        on_complete=OnComplete.NoOpOC,
+        app_args=[b"anchor_root", root],
+        boxes=[(app_id, ROOT_BOX_PREFIX + root)]
+    )
+
+def merkle_revoke_consent_txn(sender, params, app_id, request_id):
+    """Build a Merkle-anchoring revoke_consent call; it revokes request_id in whichever batch holds it."""
+    return ApplicationCallTxn(
+        sender=sender,
+        sp=params,
+        index=app_id,
+        on_complete=OnComplete.NoOpOC,
+        app_args=[b"revoke_consent", request_id],
+        boxes=[(app_id, REVOKED_BOX_PREFIX + request_id)]
+    )
+
+def merkle_budget_calls(depth):
+    """Budget calls a Merkle view_document call with a proof of depth levels needs in its group."""
+    cost = MERKLE_VIEW_COST + MERKLE_LEVEL_COST * depth
+    return max(0, -(-(cost - APP_CALL_BUDGET) // (APP_CALL_BUDGET - BUDGET_CALL_COST)))
+
+def merkle_view_document_txns(sender, params, app_id, batch, request_id):
+    """Build the view_document call for a consent of an anchored merkle.ConsentBatch and the budget calls after it.
+
+    Send them as one atomic group (sign_group in batch.py) so the calls pool their opcode budget.
+    """
+    consent = batch.consent(request_id)
+    proof = batch.proof(request_id)
+    view = ApplicationCallTxn(
+        sender=sender,
+        sp=params,
+        index=app_id,
+        on_complete=OnComplete.NoOpOC,
+        app_args=[b"view_document", request_id, encode_uint64(consent.expiry), encode_uint64(consent.permissions),
+                  consent.document_hash, encode_uint64(proof.path), b"".join(proof.siblings)],
+        boxes=[(app_id, ROOT_BOX_PREFIX + batch.root), (app_id, REVOKED_BOX_PREFIX + request_id)],
+        note=unique_note()
+    )
+    budget = [
+        ApplicationCallTxn(sender=sender, sp=params, index=app_id, on_complete=OnComplete.NoOpOC,
+                           app_args=[b"budget", encode_uint64(index)])
+        for index in range(merkle_budget_calls(len(proof.siblings)))
+    ]
+    return [view] + budget
+
+def test_box_contract(app_id, creator_address, creator_private_key, recipient_address, recipient_private_key):
+    """Run the consent lifecycle against the box-storage contract."""
+    client = get_client()
+    logger.info(f"--- Starting box-storage tests for App ID: {app_id} ---")
+    params = get_suggested_params(client)
+    request_id = f"request_{int(time.time())}".encode()
+    expiry = int(time.time()) + 30*24*60*60  # 30 days expiry
+
+    steps = [
+        ("request_consent", creator_private_key, request_consent_txn(
+            creator_address, params, app_id, b"document_hash_123", b"Aadhaar Card", request_id, recipient_address)),
+        ("grant_consent", creator_private_key, grant_consent_txn(
+            creator_address, params, app_id, request_id, expiry, {"view": True, "download": False})),
+        ("view_document", recipient_private_key, view_document_txn(recipient_address, params, app_id, request_id)),
+        ("revoke_consent", recipient_private_key, revoke_consent_txn(recipient_address, params, app_id, request_id)),
+    ]
+    for name, private_key, txn in steps:
+        logger.info(f"Testing '{name}' for {request_id.decode()}...")
+        tx_id = client.send_transaction(txn.sign(private_key))
+        wait_for_confirmation(tx_id)
+        logger.info(f"'{name}' test completed. Tx ID: {tx_id}")
+    logger.info("--- All box-storage tests completed successfully! ---")
+
+def test_box_contract_batched(app_id, creator_address, creator_private_key, recipient_address, count=8):
+    """Request and grant count consents through atomic groups instead of one round per call."""
+    client = get_client()
+    logger.info(f"--- Requesting and granting {count} consents in batches for App ID: {app_id} ---")
+    params = get_suggested_params(client)
+    expiry = int(time.time()) + 30*24*60*60  # 30 days expiry
+    operations = []
+    for i in range(count):
+        request_id = f"bulk_{int(time.time())}_{i}".encode()
+        operations.append(ConsentOperation("request_consent", request_consent_txn(
+            creator_address, params, app_id, b"document_hash_123", b"Aadhaar Card", request_id, recipient_address
+        ), creator_private_key))
+        operations.append(ConsentOperation("grant_consent", grant_consent_txn(
+            creator_address, params, app_id, request_id, expiry, {"view": True, "download": False}
+        ), creator_private_key))
+    results = send_batch(client, operations)
+    failed = [result for result in results if result["error"]]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(results)} batched operations failed: {failed[0]['error']}")
+    logger.info(f"--- {len(results)} batched operations confirmed ---")
+
+def deploy_abi_contract(creator_address, creator_private_key):
+    """Deploy the global-state contract behind the ARC-4 selector router."""
+    logger.info("Starting ABI-router contract deployment...")
+    app_id = create_application(
+        creator_address, creator_private_key,
+        load_teal("consent_abi_approval.teal"),
+        StateSchema(num_uints=8, num_byte_slices=8)
+    )
+    logger.info(f"ABI-router contract deployed with App ID: {app_id}")
+    return app_id
+
+def abi_app_args(operation, *args):
+    """Encode an operation and its arguments as ARC-4 application args."""
+    method = abi.Method.from_signature(ABI_METHODS[operation])
+    if len(args) != len(method.args):
+        raise ValueError(f"{operation} takes {len(method.args)} arguments, got {len(args)}")
+    return [method.get_selector()] + [arg.type.encode(value) for arg, value in zip(method.args, args)]
+
+def abi_call_txn(sender, params, app_id, operation, *args):
+    """Build an ABI-router app call for operation with ARC-4 encoded arguments."""
+    return ApplicationCallTxn(
+        sender=sender,
+        sp=params,
+        index=app_id,
+        on_complete=OnComplete.NoOpOC,
+        app_args=abi_app_args(operation, *args),
+        # view_document has no arguments, so repeated views would otherwise be identical
+        note=unique_note() if operation == "view_document" else None
+    )
+
+def test_abi_contract(app_id, creator_address, creator_private_key, recipient_address, recipient_private_key):
+    """Run the consent lifecycle against the ABI-router contract."""
+    client = get_client()
+    logger.info(f"--- Starting ABI-router tests for App ID: {app_id} ---")
+    params = get_suggested_params(client)
+    expiry = int(time.time()) + 30*24*60*60  # 30 days expiry
+
+    steps = [
+        ("request_consent", creator_private_key, abi_call_txn(
+            creator_address, params, app_id, "request_consent",
+            b"document_hash_123", "Aadhaar Card", "request_1", recipient_address)),
+        ("grant_consent", creator_private_key, abi_call_txn(
+            creator_address, params, app_id, "grant_consent",
+            expiry, encode_permissions({"view": True, "download": False}))),
+        ("view_document", recipient_private_key, abi_call_txn(recipient_address, params, app_id, "view_document")),
+        ("revoke_consent", recipient_private_key, abi_call_txn(recipient_address, params, app_id, "revoke_consent")),
+    ]
+    for name, private_key, txn in steps:
+        logger.info(f"Testing '{name}'...")
+        tx_id = client.send_transaction(txn.sign(private_key))
+        wait_for_confirmation(tx_id)
+        logger.info(f"'{name}' test completed. Tx ID: {tx_id}")
+    logger.info("--- All ABI-router tests completed successfully! ---")
 
 def test_contract(app_id, creator_address, creator_private_key, recipient_address, recipient_private_key):
     """Run a series of tests against the deployed smart contract."""
+    client = get_client()
     logger.info(f"--- Starting tests for App ID: {app_id} ---")
     # Get suggested parameters
-    params = client.suggested_params()
+    params = get_suggested_params(client)
 
     # Test request_consent
     logger.info("Testing 'request_consent'...")
@@ -113,13 +348,8 @@ def test_contract(app_id, creator_address, creator_private_key, recipient_addres
         sp=params,
         index=app_id,
         on_complete=OnComplete.NoOpOC,
-        app_args=[
-            b"request_consent",
-            b"document_hash_123",
-            b"Aadhaar Card",
-            b"request_1",
-            recipient_address.encode()
-        ]
+        app_args=[b"request_consent"] + request_args(b"document_hash_123", b"Aadhaar Card", b"request_1",
+                                                     recipient_address)
     )
     signed_request = request_txn.sign(creator_private_key)
     request_tx_id = client.send_transaction(signed_request)
@@ -128,18 +358,18 @@ def test_contract(app_id, creator_address, creator_private_key, recipient_addres
 
     # Test grant_consent
     logger.info("Testing 'grant_consent'...")
+    # Only the owner, the app's creator, may grant
     grant_txn = ApplicationCallTxn(
-        sender=recipient_address,
+        sender=creator_address,
         sp=params,
         index=app_id,
         on_complete=OnComplete.NoOpOC,
-        app_args=[
-            b"grant_consent",
-            str(int(time.time()) + 30*24*60*60).encode(),  # 30 days expiry
-            json.dumps({"view": True, "download": False}).encode()
-        ]
+        app_args=[b"grant_consent"] + grant_args(
+            int(time.time()) + 30*24*60*60,  # 30 days expiry
+            {"view": True, "download": False}
+        )
     )
-    signed_grant = grant_txn.sign(recipient_private_key)
+    signed_grant = grant_txn.sign(creator_private_key)
     grant_tx_id = client.send_transaction(signed_grant)
     wait_for_confirmation(grant_tx_id)
     logger.info(f"'grant_consent' test completed. Tx ID: {grant_tx_id}")
@@ -151,7 +381,8 @@ def test_contract(app_id, creator_address, creator_private_key, recipient_addres
         sp=params,
         index=app_id,
         on_complete=OnComplete.NoOpOC,
-        app_args=[b"view_document"]
+        app_args=[b"view_document"],
+        note=unique_note()
     )
     signed_view = view_txn.sign(creator_private_key)
     view_tx_id = client.send_transaction(signed_view)
@@ -161,13 +392,13 @@ def test_contract(app_id, creator_address, creator_private_key, recipient_addres
     # Test revoke_consent
     logger.info("Testing 'revoke_consent'...")
     revoke_txn = ApplicationCallTxn(
-        sender=recipient_address,
+        sender=creator_address,
         sp=params,
         index=app_id,
         on_complete=OnComplete.NoOpOC,
         app_args=[b"revoke_consent"]
     )
-    signed_revoke = revoke_txn.sign(recipient_private_key)
+    signed_revoke = revoke_txn.sign(creator_private_key)
     revoke_tx_id = client.send_transaction(signed_revoke)
     wait_for_confirmation(revoke_tx_id)
     logger.info(f"'revoke_consent' test completed. Tx ID: {revoke_tx_id}")
@@ -176,6 +407,8 @@ def test_contract(app_id, creator_address, creator_private_key, recipient_addres
 def main():
     """Main function to deploy and test the contract."""
     logger.info("--- Starting Deployment and Test Script ---")
+    get_client()
+    logger.info("Loaded environment variables.")
     try:
         # Create accounts from mnemonics
         creator_mnemonic = os.environ.get("CREATOR_MNEMONIC")
@@ -193,6 +426,15 @@ def main():
         logger.info(f"Recipient address: {recipient_address}")
 
         # Deploy contract
+        if os.environ.get("BOX_STORAGE"):
+            app_id = deploy_box_contract(creator_address, creator_private_key)
+            test_box_contract(app_id, creator_address, creator_private_key, recipient_address, recipient_private_key)
+            test_box_contract_batched(app_id, creator_address, creator_private_key, recipient_address)
+            return
+        if os.environ.get("ABI_ROUTER"):
+            app_id = deploy_abi_contract(creator_address, creator_private_key)
+            test_abi_contract(app_id, creator_address, creator_private_key, recipient_address, recipient_private_key)
+            return
         app_id = deploy_contract(creator_address, creator_private_key)
 
         # Test contract functionality
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import mmap
+import os
+import pathlib
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Bytes handed to sha256 per update; large enough that hashlib releases the GIL for every one
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Cache rows written per SQLite transaction
+COMMIT_EVERY = 1000
+
+DEFAULT_CACHE = pathlib.Path(__file__).with_name("document_hashes.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest BLOB NOT NULL
+);
+"""
+
+def _stat_key(stat):
+    return stat.st_size, stat.st_mtime_ns
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """sha256 of a file's contents, the 32-byte document_hash request_consent is given for it.
+
+    The file is memory-mapped and hashed a chunk at a time, so memory use does
+    not grow with the file and pages already hashed can be dropped by the OS.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # An empty file cannot be mapped
+            return digest.digest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), chunk_size):
+                    digest.update(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+    return digest.digest()
+
+def _cache_path(path):
+    return str(pathlib.Path(path).resolve())
+
+def _hash_unchanged(path, chunk_size):
+    # The size and mtime around the read; a file written meanwhile is hashed but not cached
+    before = _stat_key(os.stat(path))
+    digest = hash_file(path, chunk_size)
+    return digest, before if _stat_key(os.stat(path)) == before else None
+
+class DigestCache:
+    """Document digests in a SQLite file, keyed by absolute path and valid while size and mtime match."""
+
+    def __init__(self, path=DEFAULT_CACHE):
+        self.db = sqlite3.connect(str(path))
+        self.db.executescript(SCHEMA)
+        self._pending = 0
+
+    def get(self, path, stat):
+        row = self.db.execute("SELECT size, mtime_ns, digest FROM digests WHERE path = ?", (path,)).fetchone()
+        if row is None or tuple(row[:2]) != _stat_key(stat):
+            return None
+        return bytes(row[2])
+
+    def put(self, path, key, digest):
+        self.db.execute("INSERT OR REPLACE INTO digests (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                        (path, *key, digest))
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.db.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def iter_hashes(paths, workers=None, cache=None, chunk_size=CHUNK_SIZE):
+    """Yield (path, digest) for every path, in input order, hashing cache misses across worker threads.
+
+    hashlib releases the GIL while it hashes each chunk, so threads read and
+    hash files in parallel and throughput follows the disks rather than the
+    interpreter. At most a few tasks per worker are queued at a time, so paths
+    can be a generator over millions of files. The cache is only used from
+    the calling thread.
+    """
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    window = collections.deque()
+    hashed = cached = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def drain(limit):
+            nonlocal hashed
+            while len(window) > limit:
+                path, key, result = window.popleft()
+                if key is None:
+                    digest, key = result.result()
+                    if cache is not None and key is not None:
+                        cache.put(_cache_path(path), key, digest)
+                    hashed += 1
+                else:
+                    digest = result
+                yield path, digest
+
+        for path in paths:
+            digest = None
+            if cache is not None:
+                stat = os.stat(path)
+                digest = cache.get(_cache_path(path), stat)
+            if digest is None:
+                window.append((path, None, pool.submit(_hash_unchanged, path, chunk_size)))
+            else:
+                cached += 1
+                window.append((path, _stat_key(stat), digest))
+            yield from drain(workers * 4)
+        yield from drain(0)
+    if cache is not None:
+        cache.commit()
+    logger.info(f"Hashed {hashed} documents, {cached} from the cache.")
+
+def hash_files(paths, workers=None, cache=None, chunk_size=CHUNK_SIZE):
+    """Path -> 32-byte digest for an upload batch."""
+    return dict(iter_hashes(paths, workers, cache, chunk_size))
+
+def walk(root):
+    """Every regular file under root, in sorted order."""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            yield os.path.join(directory, name)
+
+def hash_directory(root, workers=None, cache=None, chunk_size=CHUNK_SIZE):
+    """Path -> 32-byte digest for every file under root."""
+    return hash_files(walk(root), workers, cache, chunk_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the document_hash of files, or of every file in directories.")
+    parser.add_argument("paths", nargs="+", help="files or directories")
+    parser.add_argument("--workers", type=int, help="hashing threads (default: four per CPU, at most 32)")
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE), help="SQLite digest cache")
+    parser.add_argument("--no-cache", action="store_true", help="hash every file even when it is cached")
+    args = parser.parse_args()
+
+    def files():
+        for path in args.paths:
+            yield from walk(path) if os.path.isdir(path) else [path]
+
+    cache = None if args.no_cache else DigestCache(args.cache)
+    try:
+        for path, digest in iter_hashes(files(), args.workers, cache):
+            print(f"{digest.hex()}  {path}")
+    finally:
+        if cache is not None:
+            cache.close()
+
+if __name__ == "__main__":
+    main()
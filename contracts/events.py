@@ -0,0 +1,90 @@
+from collections import namedtuple
+import base64
+
+from algosdk import encoding
+
+from codec import EVENTS, STATUS_CODES, event_selector
+
+# One decoded ConsentContract event. tx_id is None for events read from blocks,
+# which do not carry transaction IDs
+ConsentEvent = namedtuple(
+    "ConsentEvent",
+    ["name", "operation", "request_id", "actor", "status", "expiry", "app_id", "round", "tx_id", "log_index"],
+)
+
+SELECTORS = {event_selector(operation): operation for operation in EVENTS}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+# Selector, request_id offset, actor, status and expiry
+HEAD_SIZE = 4 + 43
+
+def decode_log(log):
+    """Decode one log entry into (operation, request_id, actor, status, expiry), or None for other logs."""
+    if isinstance(log, str):
+        log = base64.b64decode(log)
+    operation = SELECTORS.get(log[:4])
+    if operation is None or len(log) < HEAD_SIZE + 2:
+        return None
+    offset = 4 + int.from_bytes(log[4:6], "big")
+    length = int.from_bytes(log[offset:offset + 2], "big")
+    return (
+        operation,
+        log[offset + 2:offset + 2 + length],
+        encoding.encode_address(log[6:38]),
+        STATUS_NAMES.get(log[38], log[38]),
+        int.from_bytes(log[39:47], "big"),
+    )
+
+def _events(logs, app_id, round_, tx_id):
+    for index, log in enumerate(logs or []):
+        decoded = decode_log(log)
+        if decoded is not None:
+            operation = decoded[0]
+            yield ConsentEvent(EVENTS[operation].split("(")[0], *decoded, app_id, round_, tx_id, index)
+
+def events_from_transaction(info, tx_id=None):
+    """Yield the events of a confirmed transaction, including its inner transactions.
+
+    info is a pending_transaction_info response or an indexer transaction.
+    """
+    if "application-transaction" in info:
+        app_id = info["application-transaction"].get("application-id") or info.get("created-application-index")
+        round_ = info.get("confirmed-round")
+        tx_id = tx_id or info.get("id")
+        inner = info.get("inner-txns")
+    else:
+        app_id = info.get("txn", {}).get("txn", {}).get("apid") or info.get("application-index")
+        round_ = info.get("confirmed-round")
+        inner = info.get("inner-txns")
+    yield from _events(info.get("logs"), app_id, round_, tx_id)
+    for inner_info in inner or []:
+        yield from events_from_transaction(inner_info, tx_id)
+
+def _block_events(signed_txns, app_ids, round_):
+    for signed in signed_txns or []:
+        txn = signed.get("txn", {})
+        app_id = txn.get("apid") or signed.get("apid")
+        apply_data = signed.get("dt", {})
+        if app_ids is None or app_id in app_ids:
+            yield from _events(apply_data.get("lg"), app_id, round_, None)
+        # Calls made by other applications, including untracked ones, are inner transactions of theirs
+        yield from _block_events(apply_data.get("itx"), app_ids, round_)
+
+def events_from_block(block, app_ids=None):
+    """Yield the events of every application call in an algod block_info response, in block order.
+
+    Inner transactions (the itx of each transaction's apply data) follow the
+    call that made them, so events of app_ids called from another application
+    are included.
+    """
+    block = block.get("block", block)
+    yield from _block_events(block.get("txns"), app_ids, block.get("rnd"))
+
+def stream_events(client, app_ids, start_round=None):
+    """Follow the chain from start_round, yielding every event of app_ids as each block arrives."""
+    app_ids = set(app_ids)
+    round_ = start_round or client.status()["last-round"]
+    while True:
+        client.status_after_block(round_ - 1)
+        yield from events_from_block(client.block_info(round_), app_ids)
+        round_ += 1
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+from collections import namedtuple
+import argparse
+import functools
+import json
+import time
+
+from algosdk import abi, account, encoding
+
+from avm import APP_CALL_BUDGET, AvmError, Evaluation, Ledger
+from build_cache import compile_teal_cached
+from codec import ABI_METHODS, STATUSES, encode_permissions, grant_args
+
+CallResult = namedtuple("CallResult", ["approved", "cost", "logs", "error", "evaluation"])
+
+def new_address():
+    """A fresh account address, for scripting senders."""
+    return account.generate_account()[1]
+
+@functools.lru_cache(maxsize=None)
+def public_key(address):
+    return address if isinstance(address, bytes) else encoding.decode_address(address)
+
+class ConsentHarness:
+    """Runs a ConsentContract program in the in-process AVM with scripted senders, clock and state.
+
+    program is a build_cache program name: "approval" (the Cond router),
+    "abi_approval", "box_approval" or "merkle_approval". The global-state
+    programs start with their owner scripted into global state; the box and
+    Merkle programs run their creation branch instead.
+    """
+
+    def __init__(self, program="approval", creator=None, timestamp=1_700_000_000, global_state=None):
+        self.program = program
+        self.creator = creator or new_address()
+        self.ledger = Ledger(timestamp=timestamp)
+        created = program in ("box_approval", "merkle_approval")
+        if global_state is None:
+            global_state = {} if created else {b"owner": public_key(self.creator)}
+        self.app_id = self.ledger.create_app(
+            public_key(self.creator), compile_teal_cached(program), global_state=global_state
+        )
+        if created:
+            assert self.create().approved
+
+    @property
+    def global_state(self):
+        return self.ledger.global_state(self.app_id)
+
+    @property
+    def boxes(self):
+        return self.ledger.boxes(self.app_id)
+
+    def advance(self, seconds, rounds=1):
+        """Move the chain clock forward."""
+        self.ledger.timestamp += seconds
+        self.ledger.round += rounds
+
+    def call_raw(self, sender, app_args, on_completion=0, boxes=None, application_id=None, budget=APP_CALL_BUDGET,
+                 trace=False):
+        """Evaluate one app call; state changes are rolled back unless it is approved.
+
+        budget is the opcode budget available to the call, e.g. pooled from the other calls of its group.
+        """
+        txn = {
+            "sender": public_key(sender),
+            "application_args": list(app_args),
+            "on_completion": int(on_completion),
+            "boxes": boxes,
+        }
+        if application_id is not None:
+            txn["application_id"] = application_id
+        snapshot = self.ledger.snapshot()
+        evaluation = Evaluation(self.ledger, self.app_id, txn, budget=budget, trace=trace)
+        try:
+            approved = evaluation.run()
+            error = None if approved else "rejected"
+        except AvmError as e:
+            approved, error = False, str(e)
+        if not approved:
+            self.ledger.restore(snapshot)
+        return CallResult(approved, evaluation.cost, evaluation.logs, error, evaluation)
+
+    def call_txn(self, txn, budget=APP_CALL_BUDGET, trace=False):
+        """Evaluate an algosdk ApplicationCallTxn, with exactly the box references it carries."""
+        return self.call_raw(
+            txn.sender, txn.app_args or [], on_completion=txn.on_complete,
+            boxes=[box.name for box in txn.boxes or []], budget=budget, trace=trace
+        )
+
+    def create(self):
+        """Run the creation branch as the creator."""
+        return self.call_raw(self.creator, [], application_id=0)
+
+    def app_args(self, operation, request_id, *args):
+        """Encode an operation the way this program expects its arguments."""
+        if self.program == "abi_approval":
+            method = abi.Method.from_signature(ABI_METHODS[operation])
+            values = [value.decode() if isinstance(arg.type, abi.StringType) and isinstance(value, bytes)
+                      else value for arg, value in zip(method.args, args)]
+            return [method.get_selector()] + [arg.type.encode(value) for arg, value in zip(method.args, values)]
+        if self.program == "box_approval" and operation != "request_consent":
+            return [operation.encode(), request_id] + list(args)
+        return [operation.encode()] + list(args)
+
+    def call(self, operation, sender, request_id, *args, trace=False):
+        boxes = [request_id] if self.program == "box_approval" else None
+        return self.call_raw(sender, self.app_args(operation, request_id, *args), boxes=boxes, trace=trace)
+
+    def request(self, sender, request_id, requester, document_hash=b"document_hash_123", document_type=b"Aadhaar Card",
+                trace=False):
+        return self.call("request_consent", sender, request_id,
+                         document_hash, document_type, request_id, public_key(requester), trace=trace)
+
+    def grant(self, sender, request_id, expiry, permissions=("view",), trace=False):
+        if self.program == "abi_approval":
+            return self.call("grant_consent", sender, request_id, expiry, encode_permissions(permissions), trace=trace)
+        return self.call("grant_consent", sender, request_id, *grant_args(expiry, permissions), trace=trace)
+
+    def revoke(self, sender, request_id, trace=False):
+        return self.call("revoke_consent", sender, request_id, trace=trace)
+
+    def view(self, sender, request_id, trace=False):
+        return self.call("view_document", sender, request_id, trace=trace)
+
+    def sweep(self, sender, *request_ids, trace=False):
+        """Mark lapsed consents expired; the box program takes every request ID in one call."""
+        if self.program == "box_approval":
+            return self.call_raw(sender, [b"sweep_expired", *request_ids], boxes=list(request_ids), trace=trace)
+        return self.call("sweep_expired", sender, None, trace=trace)
+
+    def status(self, request_id):
+        """Status of a consent as "pending", "granted", "revoked" or "expired", or None when there is none."""
+        if self.program == "box_approval":
+            record = self.boxes.get(request_id)
+            return STATUSES.get(record[0]) if record else None
+        status = self.global_state.get(b"status")
+        return status.decode() if status else None
+
+def benchmark(program="approval", iterations=1000):
+    """Per-operation wall time and opcode cost of the consent lifecycle."""
+    harness = ConsentHarness(program)
+    requester = new_address()
+    expiry = harness.ledger.timestamp + 30*24*60*60
+    steps = [
+        ("request_consent", lambda rid: harness.request(harness.creator, rid, requester)),
+        ("grant_consent", lambda rid: harness.grant(harness.creator, rid, expiry)),
+        ("view_document", lambda rid: harness.view(requester, rid)),
+        ("revoke_consent", lambda rid: harness.revoke(requester, rid)),
+    ]
+    totals = {name: 0.0 for name, _ in steps}
+    costs = {}
+    for i in range(iterations):
+        request_id = f"request_{i}".encode()
+        for name, step in steps:
+            started = time.perf_counter()
+            result = step(request_id)
+            totals[name] += time.perf_counter() - started
+            if not result.approved:
+                raise AvmError(f"{name} failed during the benchmark: {result.error}")
+            costs[name] = result.cost
+    return {
+        name: {"mean_us": totals[name] / iterations * 1e6, "opcode_cost": costs[name]}
+        for name, _ in steps
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ConsentContract in the in-process AVM.")
+    parser.add_argument("--bench", action="store_true", help="benchmark the consent lifecycle")
+    parser.add_argument("--program", default="all", help="approval, abi_approval, box_approval or all")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+    if not args.bench:
+        parser.error("nothing to do; pass --bench, or run the tests with scripts/test.py")
+
+    programs = ["approval", "abi_approval", "box_approval"] if args.program == "all" else [args.program]
+    results = {program: benchmark(program, args.iterations) for program in programs}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for program, operations in results.items():
+        print(program)
+        for name, stats in operations.items():
+            print(f"  {name:<16} {stats['mean_us']:>8.1f} us  {stats['opcode_cost']:>4} opcodes")
+
+if __name__ == "__main__":
+    main()
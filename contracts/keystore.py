@@ -0,0 +1,140 @@
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import time
+
+from algosdk import encoding
+from nacl import pwhash, secret, utils
+from nacl.exceptions import CryptoError
+from nacl.signing import SigningKey
+
+logger = logging.getLogger(__name__)
+
+KEYSTORE_VERSION = 1
+
+# Accounts generated per worker task; each task's records are written as one chunk
+CHUNK_SIZE = 1000
+
+# Encrypted with the derived key to reject a wrong password before anything is written
+PASSWORD_CHECK = b"consent-keystore"
+
+class KeystoreError(Exception):
+    pass
+
+def derive_key(password, salt, opslimit, memlimit):
+    return pwhash.argon2id.kdf(secret.SecretBox.KEY_SIZE, password.encode(), salt,
+                               opslimit=opslimit, memlimit=memlimit)
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+def _generate_chunk(task):
+    # Runs in a worker process: generate accounts and encrypt their keys with the derived key
+    key, start, count = task
+    box = secret.SecretBox(key)
+    lines = []
+    for index in range(start, start + count):
+        signing_key = SigningKey.generate()
+        public_key = bytes(signing_key.verify_key)
+        record = {
+            "index": index,
+            "address": encoding.encode_address(public_key),
+            "key": _b64(box.encrypt(bytes(signing_key) + public_key)),
+        }
+        lines.append(json.dumps(record) + "\n")
+    return "".join(lines)
+
+def _new_header(password, opslimit, memlimit):
+    salt = utils.random(pwhash.argon2id.SALTBYTES)
+    key = derive_key(password, salt, opslimit, memlimit)
+    header = {
+        "keystore": KEYSTORE_VERSION,
+        "kdf": "argon2id",
+        "salt": _b64(salt),
+        "opslimit": opslimit,
+        "memlimit": memlimit,
+        "check": _b64(secret.SecretBox(key).encrypt(PASSWORD_CHECK)),
+    }
+    return header, key
+
+def _unlock(header, password):
+    if header.get("keystore") != KEYSTORE_VERSION:
+        raise KeystoreError(f"unsupported keystore version {header.get('keystore')}")
+    key = derive_key(password, base64.b64decode(header["salt"]), header["opslimit"], header["memlimit"])
+    try:
+        secret.SecretBox(key).decrypt(base64.b64decode(header["check"]))
+    except CryptoError:
+        raise KeystoreError("wrong keystore password") from None
+    return key
+
+def _resume(path):
+    """Header and number of complete records in an existing keystore, dropping a torn final line."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            logger.warning(f"Discarding a partially written record at the end of {path}.")
+            f.truncate(complete)
+    lines = data[:complete].splitlines()
+    if not lines:
+        return None, 0
+    return json.loads(lines[0]), len(lines) - 1
+
+def generate_keystore(path, count, password, workers=None, chunk_size=CHUNK_SIZE,
+                      opslimit=pwhash.argon2id.OPSLIMIT_MODERATE, memlimit=pwhash.argon2id.MEMLIMIT_MODERATE):
+    """Generate accounts across a process pool until the keystore at path holds count of them.
+
+    Records are appended in index order as each chunk finishes, so an
+    interrupted run loses at most the chunks in flight and running it again
+    resumes from the last complete record. Addresses are stored in the clear so
+    they can be listed and funded without the password; private keys are
+    encrypted with a SecretBox keyed by argon2id over the password.
+    """
+    path = pathlib.Path(path)
+    header, existing = _resume(path) if path.exists() else (None, 0)
+    if header is None:
+        header, key = _new_header(password, opslimit, memlimit)
+        path.write_text(json.dumps(header) + "\n")
+    else:
+        key = _unlock(header, password)
+
+    remaining = max(count - existing, 0)
+    tasks = [(key, start, min(chunk_size, count - start)) for start in range(existing, count, chunk_size)]
+    started = time.perf_counter()
+    written = 0
+    if tasks:
+        logger.info(f"Generating {remaining} accounts ({existing} already in {path})...")
+        with multiprocessing.Pool(workers) as pool, open(path, "a") as f:
+            for lines in pool.imap(_generate_chunk, tasks):
+                f.write(lines)
+                f.flush()
+                written += lines.count("\n")
+                elapsed = time.perf_counter() - started
+                logger.info(f"{existing + written}/{count} accounts, {written / elapsed:.0f} keys/s")
+            os.fsync(f.fileno())
+    elapsed = time.perf_counter() - started
+    return {
+        "path": str(path),
+        "existing": existing,
+        "generated": written,
+        "total": existing + written,
+        "elapsed": elapsed,
+        "keys_per_second": written / elapsed if elapsed else 0.0,
+    }
+
+def read_keystore(path, password):
+    """Yield (address, private_key) for every account in a keystore, in index order.
+
+    private_key is in the base64 form algosdk signs with.
+    """
+    with open(path) as f:
+        header = json.loads(f.readline())
+        box = secret.SecretBox(_unlock(header, password))
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            record = json.loads(line)
+            yield record["address"], _b64(box.decrypt(base64.b64decode(record["key"])))
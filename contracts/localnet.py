@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse
+import argparse
+import base64
+import hashlib
+import io
+import json
+import logging
+import pathlib
+import random
+import re
+import socket
+import threading
+import time
+
+import msgpack
+from algosdk import encoding
+from algosdk.transaction import OnComplete
+
+from assembler import assemble, program_hash
+from build_cache import DEFAULT_CACHE_DIR, cached_programs
+from avm import APP_CALL_BUDGET, NAMED_INTS, AvmError, Evaluation, Ledger, Program
+
+logger = logging.getLogger(__name__)
+
+GENESIS_ID = "localnet-v1"
+GENESIS_HASH = base64.b64encode(hashlib.sha256(GENESIS_ID.encode()).digest()).decode()
+CONSENSUS_VERSION = "future"
+MIN_FEE = 1000
+
+# How long status_after_block waits for the next round; algod waits a minute, but
+# this stays under the SDK's 30-second request timeout so idle dev-mode waits do not fail
+WAIT_FOR_BLOCK_TIMEOUT = 20.0
+
+# In dev mode a block only comes with a submission, so a quiet node answers sooner
+DEV_MODE_WAIT_TIMEOUT = 1.0
+
+# Transaction fields holding addresses, shown as addresses rather than base64 in JSON responses
+ADDRESS_FIELDS = {"snd", "rcv", "close", "rekey", "asnd", "arcv", "aclose"}
+
+class LocalnetError(Exception):
+    """A request the stand-in rejects, answered with its HTTP status and an algod-style message."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def _jsonable(value, key=None):
+    if isinstance(value, dict):
+        return {k: _jsonable(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, bytes):
+        if key in ADDRESS_FIELDS and len(value) == 32:
+            return encoding.encode_address(value)
+        return base64.b64encode(value).decode()
+    return value
+
+def _state_entries(state):
+    return [
+        {"key": base64.b64encode(key).decode(),
+         "value": {"type": 2, "uint": value, "bytes": ""} if isinstance(value, int)
+         else {"type": 1, "uint": 0, "bytes": base64.b64encode(value).decode()}}
+        for key, value in state.items()
+    ]
+
+def _state_delta(before, after):
+    delta = []
+    for key in before.keys() | after.keys():
+        value = after.get(key)
+        if value == before.get(key):
+            continue
+        if value is None:
+            entry = {"action": 3}
+        elif isinstance(value, int):
+            entry = {"action": 2, "uint": value}
+        else:
+            entry = {"action": 1, "bytes": base64.b64encode(value).decode()}
+        delta.append({"key": base64.b64encode(key).decode(), "value": entry})
+    return delta
+
+class Localnet:
+    """An in-process stand-in for the algod endpoints the deploy scripts use.
+
+    Application calls run the ConsentContract TEAL in avm.py. Programs are
+    assembled by /v2/teal/compile with assembler.py, and the bytecode is mapped
+    back to its TEAL when an app is created. Bytecode algod assembled earlier is
+    found through the build cache, so deploy.py can reuse its cached programs.
+    A submission is evaluated as one atomic group with a pooled opcode budget. Its effects apply at once and it is confirmed in the
+    next block. With block_time 0 every submission seals a block straight away,
+    like algod's dev mode; otherwise a block is sealed every block_time
+    seconds. latency delays every response, and failure_rate answers that
+    share of requests with a 503 before they are processed. Signatures, fees
+    and balances are not checked.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, block_time=0.0, latency=0.0, failure_rate=0.0, seed=None,
+                 clock=time.time, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.block_time = block_time
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.clock = clock
+        self.time_offset = 0
+        self.random = random.Random(seed)
+        self.ledger = Ledger(timestamp=int(clock()), round=1)
+        self.last_round = 0
+        self.blocks = {}
+        self.programs = {}
+        # App ID -> (approval bytecode, clear bytecode), as application_info reports them
+        self.app_programs = {}
+        self.transactions = {}
+        self.pending = []
+        self._lock = threading.Lock()
+        self._new_block = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._block_thread = None
+        self.requests = 0
+        self.failures = 0
+        with self._lock:
+            self._seal()
+        self.server = ThreadingHTTPServer((host, port), _handler(self))
+        self.server.daemon_threads = True
+        self._server_thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Serve on a background thread, sealing blocks every block_time seconds when it is set."""
+        self._server_thread = threading.Thread(target=self.server.serve_forever, name="localnet", daemon=True)
+        self._server_thread.start()
+        if self.block_time:
+            self._block_thread = threading.Thread(target=self._produce_blocks, name="localnet-blocks", daemon=True)
+            self._block_thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._lock:
+            self._new_block.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def advance(self, seconds):
+        """Move the chain clock forward, for example past a consent's expiry."""
+        with self._lock:
+            self.time_offset += seconds
+
+    def _produce_blocks(self):
+        while not self._stopped.wait(self.block_time):
+            with self._lock:
+                self._seal()
+
+    def _seal(self):
+        # Called with the lock held; confirms every pending transaction in a new block
+        round_ = self.last_round + 1
+        timestamp = max(self.ledger.timestamp, int(self.clock()) + self.time_offset)
+        for tx_id in self.pending:
+            self.transactions[tx_id]["confirmed-round"] = round_
+        self.blocks[round_] = {
+            "block": {
+                "rnd": round_, "ts": timestamp, "gen": GENESIS_ID, "gh": GENESIS_HASH,
+                "txns": [self.transactions[tx_id]["block-txn"] for tx_id in self.pending],
+            },
+            "txids": list(self.pending),
+        }
+        self.pending = []
+        self.last_round = round_
+        self.ledger.round = round_ + 1
+        self.ledger.timestamp = timestamp
+        self._new_block.notify_all()
+
+    # Endpoints
+
+    def suggested_params(self):
+        with self._lock:
+            return {
+                "consensus-version": CONSENSUS_VERSION, "fee": 0, "genesis-hash": GENESIS_HASH,
+                "genesis-id": GENESIS_ID, "last-round": self.last_round, "min-fee": MIN_FEE,
+            }
+
+    def status(self):
+        with self._lock:
+            return {
+                "last-round": self.last_round, "last-version": CONSENSUS_VERSION, "catchup-time": 0,
+                "time-since-last-round": 0, "stopped-at-unsupported-round": False,
+            }
+
+    def status_after_block(self, round_):
+        deadline = time.monotonic() + (WAIT_FOR_BLOCK_TIMEOUT if self.block_time else DEV_MODE_WAIT_TIMEOUT)
+        with self._lock:
+            while self.last_round <= round_ and not self._stopped.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._new_block.wait(remaining)
+        return self.status()
+
+    def compile(self, teal):
+        try:
+            bytecode = assemble(teal)
+        except (AvmError, ValueError, KeyError) as e:
+            raise LocalnetError(f"compile failed: {e}")
+        with self._lock:
+            self.programs[bytecode] = teal
+        return {"hash": program_hash(bytecode), "result": base64.b64encode(bytecode).decode()}
+
+    def send_raw_transactions(self, body):
+        try:
+            signed = [encoding.msgpack_decode(entry) for entry in
+                      msgpack.Unpacker(io.BytesIO(body), raw=False, strict_map_key=False)]
+        except Exception as e:
+            raise LocalnetError(f"malformed transactions: {e}")
+        if not signed:
+            raise LocalnetError("no transactions")
+        with self._lock:
+            tx_ids = [stxn.get_txid() for stxn in signed]
+            for tx_id in tx_ids:
+                if tx_id in self.transactions:
+                    raise LocalnetError(f"transaction already in ledger: {tx_id}")
+            results = self._evaluate_group(signed)
+            for tx_id, stxn, result in zip(tx_ids, signed, results):
+                self.transactions[tx_id] = dict(result, txn=_jsonable(stxn.dictify()))
+                self.pending.append(tx_id)
+            if not self.block_time:
+                self._seal()
+        return {"txId": tx_ids[0]}
+
+    def _avm_txn(self, txn):
+        fields = {
+            "sender": encoding.decode_address(txn.sender),
+            "type_enum": NAMED_INTS.get(txn.type, 0),
+            "fee": txn.fee,
+            "first_valid": txn.first_valid_round,
+            "last_valid": txn.last_valid_round,
+            "note": txn.note or b"",
+            "lease": txn.lease or bytes(32),
+            "rekey_to": encoding.decode_address(txn.rekey_to) if txn.rekey_to else bytes(32),
+        }
+        if txn.type == "appl":
+            fields.update({
+                "application_id": txn.index,
+                "application_args": list(txn.app_args or []),
+                "on_completion": int(txn.on_complete),
+                "accounts": [encoding.decode_address(address) for address in txn.accounts or []],
+                "foreign_apps": list(txn.foreign_apps or []),
+                "boxes": [box.name for box in txn.boxes or []],
+            })
+        return fields
+
+    def _load_build_cache(self):
+        for bytecode, teal in cached_programs(self.cache_dir).items():
+            self.programs.setdefault(bytecode, teal)
+
+    def _teal(self, bytecode):
+        if bytecode not in self.programs:
+            self._load_build_cache()
+        if bytecode not in self.programs:
+            raise LocalnetError("program was not compiled by this node or found in the build cache")
+        return self.programs[bytecode]
+
+    def _evaluate_group(self, signed):
+        # Called with the lock held; every state change is undone unless the whole group is approved
+        txns = [stxn.transaction for stxn in signed]
+        for txn in txns:
+            if not txn.first_valid_round <= self.ledger.round <= txn.last_valid_round:
+                raise LocalnetError(f"txn dead: round {self.ledger.round} outside "
+                                    f"{txn.first_valid_round}-{txn.last_valid_round}")
+        group = [self._avm_txn(txn) for txn in txns]
+        snapshot = self.ledger.snapshot()
+        # Apps created, updated or deleted by the group are put back from this copy
+        apps = {app_id: dict(app) for app_id, app in self.ledger.apps.items()}
+        remaining = APP_CALL_BUDGET * sum(1 for txn in txns if txn.type == "appl")
+        results = []
+        try:
+            for index, txn in enumerate(txns):
+                result = {"pool-error": "", "logs": [], "block-txn": {"txn": {"type": txn.type, "snd": txn.sender}}}
+                if txn.type == "appl":
+                    remaining -= self._evaluate_call(txn, group, index, remaining, result)
+                results.append(result)
+        except AvmError as e:
+            self.ledger.apps = apps
+            self.ledger.restore(snapshot)
+            raise LocalnetError(f"transaction {index} rejected by logic: {e}")
+        except LocalnetError:
+            self.ledger.apps = apps
+            self.ledger.restore(snapshot)
+            raise
+        return results
+
+    def _evaluate_call(self, txn, group, index, budget, result):
+        app_id = txn.index
+        if app_id == 0:
+            app_id = self.ledger.create_app(
+                encoding.decode_address(txn.sender), self._teal(txn.approval_program),
+                self._teal(txn.clear_program) if txn.clear_program else None,
+            )
+            result["application-index"] = app_id
+            self.app_programs[app_id] = (txn.approval_program, txn.clear_program or b"")
+        elif app_id not in self.ledger.apps:
+            raise LocalnetError(f"application {app_id} does not exist")
+        before = dict(self.ledger.global_state(app_id))
+        if txn.on_complete == OnComplete.ClearStateOC:
+            cost, logs = 0, []
+        else:
+            evaluation = Evaluation(self.ledger, app_id, group[index], group, index, budget=budget)
+            if not evaluation.run():
+                raise AvmError("rejected by the approval program")
+            cost, logs = evaluation.cost, evaluation.logs
+        if txn.on_complete == OnComplete.UpdateApplicationOC:
+            app = self.ledger.apps[app_id]
+            app["approval"] = Program(self._teal(txn.approval_program))
+            if txn.clear_program:
+                app["clear"] = Program(self._teal(txn.clear_program))
+            self.app_programs[app_id] = (txn.approval_program, txn.clear_program or self.app_programs[app_id][1])
+        delta = _state_delta(before, self.ledger.global_state(app_id))
+        if txn.on_complete == OnComplete.DeleteApplicationOC:
+            del self.ledger.apps[app_id]
+            self.app_programs.pop(app_id, None)
+        result["logs"] = [base64.b64encode(log).decode() for log in logs]
+        if delta:
+            result["global-state-delta"] = delta
+        result["block-txn"] = {
+            "txn": {"type": "appl", "snd": txn.sender, "apid": app_id},
+            "dt": {"lg": result["logs"]},
+        }
+        return cost
+
+    def pending_transaction_info(self, tx_id):
+        with self._lock:
+            if tx_id not in self.transactions:
+                raise LocalnetError("txn does not exist", 404)
+            return {key: value for key, value in self.transactions[tx_id].items() if key != "block-txn"}
+
+    def block(self, round_):
+        with self._lock:
+            if round_ not in self.blocks:
+                raise LocalnetError(f"block {round_} not found", 404)
+            return {"block": self.blocks[round_]["block"]}
+
+    def block_txids(self, round_):
+        with self._lock:
+            if round_ not in self.blocks:
+                raise LocalnetError(f"block {round_} not found", 404)
+            return {"blockTxids": self.blocks[round_]["txids"]}
+
+    def application_info(self, app_id):
+        with self._lock:
+            if app_id not in self.ledger.apps:
+                raise LocalnetError("application does not exist", 404)
+            app = self.ledger.apps[app_id]
+            approval, clear = self.app_programs.get(app_id, (b"", b""))
+            return {
+                "id": app_id,
+                "params": {
+                    "creator": encoding.encode_address(app["creator"]),
+                    "approval-program": base64.b64encode(approval).decode(),
+                    "clear-state-program": base64.b64encode(clear).decode(),
+                    "global-state": _state_entries(app["global"]),
+                },
+            }
+
+    def application_box(self, app_id, name):
+        with self._lock:
+            if app_id not in self.ledger.apps or name not in self.ledger.boxes(app_id):
+                raise LocalnetError("box not found", 404)
+            value = self.ledger.boxes(app_id)[name]
+            return {"name": base64.b64encode(name).decode(), "value": base64.b64encode(value).decode(),
+                    "round": self.last_round}
+
+def _box_name(query):
+    # algosdk sends box names as "b64:<base64>"; "str:" names are accepted too
+    encoded = query.get("name", [""])[0]
+    kind, _, value = encoded.partition(":")
+    if kind == "b64":
+        return base64.b64decode(value)
+    if kind == "str":
+        return value.encode()
+    raise LocalnetError("box name must be b64: or str: encoded")
+
+def _handler(localnet):
+    routes = [
+        ("GET", r"/health", lambda match, query, body: {}),
+        ("GET", r"/v2/transactions/params", lambda match, query, body: localnet.suggested_params()),
+        ("GET", r"/v2/status", lambda match, query, body: localnet.status()),
+        ("GET", r"/v2/status/wait-for-block-after/(\d+)",
+         lambda match, query, body: localnet.status_after_block(int(match[1]))),
+        ("POST", r"/v2/teal/compile", lambda match, query, body: localnet.compile(body.decode())),
+        ("POST", r"/v2/transactions", lambda match, query, body: localnet.send_raw_transactions(body)),
+        ("GET", r"/v2/transactions/pending/(\w+)",
+         lambda match, query, body: localnet.pending_transaction_info(match[1])),
+        ("GET", r"/v2/blocks/(\d+)", lambda match, query, body: localnet.block(int(match[1]))),
+        ("GET", r"/v2/blocks/(\d+)/txids", lambda match, query, body: localnet.block_txids(int(match[1]))),
+        ("GET", r"/v2/applications/(\d+)", lambda match, query, body: localnet.application_info(int(match[1]))),
+        ("GET", r"/v2/applications/(\d+)/box",
+         lambda match, query, body: localnet.application_box(int(match[1]), _box_name(query))),
+    ]
+    routes = [(method, re.compile(pattern + "$"), handle) for method, pattern, handle in routes]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # Headers and body are written separately; without this Nagle holds the body back
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - " + format, self.address_string(), *args)
+
+        def respond(self, status, payload, response_format="json"):
+            if response_format == "msgpack":
+                body, content_type = msgpack.packb(payload, use_bin_type=True), "application/msgpack"
+            else:
+                body, content_type = json.dumps(payload).encode(), "application/json"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def dispatch(self, method):
+            url = parse.urlsplit(self.path)
+            query = parse.parse_qs(url.query)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            localnet.requests += 1
+            if localnet.latency:
+                time.sleep(localnet.latency)
+            if localnet.failure_rate and localnet.random.random() < localnet.failure_rate:
+                localnet.failures += 1
+                self.respond(503, {"message": "injected failure"})
+                return
+            for route_method, pattern, handle in routes:
+                match = pattern.match(url.path)
+                if route_method == method and match:
+                    try:
+                        payload = handle(match, query, body)
+                    except LocalnetError as e:
+                        self.respond(e.status, {"message": str(e)})
+                        return
+                    self.respond(200, payload, query.get("format", ["json"])[0])
+                    return
+            self.respond(404, {"message": f"no route for {method} {url.path}"})
+
+        def do_GET(self):
+            self.dispatch("GET")
+
+        def do_POST(self):
+            self.dispatch("POST")
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local algod stand-in that runs the consent contracts.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4001)
+    parser.add_argument("--block-time", type=float, default=0.0, help="seconds per block; 0 seals one per submission")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--seed", type=int, help="seed for failure injection")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    localnet = Localnet(args.host, args.port, args.block_time, args.latency, args.failure_rate, args.seed)
+    logger.info(f"Serving algod stand-in on {localnet.address}; set ALGOD_ADDRESS={localnet.address}")
+    localnet.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        localnet.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+import argparse
+import base64
+import logging
+import os
+import sqlite3
+import time
+
+from algosdk import encoding
+
+from codec import ABI_SELECTORS, STATUSES, decode_uint64
+from events import decode_log
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS consents (
+    app_id INTEGER NOT NULL,
+    request_id BLOB NOT NULL,
+    owner TEXT,
+    requester TEXT,
+    status TEXT NOT NULL,
+    document_hash BLOB,
+    document_type TEXT,
+    expiry INTEGER,
+    permissions INTEGER,
+    updated_round INTEGER NOT NULL,
+    PRIMARY KEY (app_id, request_id)
+);
+CREATE INDEX IF NOT EXISTS consents_owner ON consents (owner, status);
+CREATE INDEX IF NOT EXISTS consents_requester ON consents (requester, status);
+CREATE INDEX IF NOT EXISTS consents_status_expiry ON consents (status, expiry);
+CREATE TABLE IF NOT EXISTS apps (
+    app_id INTEGER PRIMARY KEY,
+    owner TEXT,
+    current_request_id BLOB
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    app_id INTEGER PRIMARY KEY,
+    round INTEGER NOT NULL,
+    intra_round_offset INTEGER NOT NULL
+);
+"""
+
+# Indexer page size; each page is folded and checkpointed in one SQLite transaction
+PAGE_SIZE = 1000
+
+def connect(path):
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    db.executescript(SCHEMA)
+    return db
+
+def _address(value):
+    return None if value is None else encoding.encode_address(value)
+
+def _operation(app_args):
+    if not app_args:
+        return None
+    return ABI_SELECTORS.get(app_args[0]) or app_args[0].decode(errors="replace")
+
+def _global_delta(app_txn):
+    delta = {}
+    for entry in app_txn.get("global-state-delta") or []:
+        value = entry["value"]
+        key = base64.b64decode(entry["key"])
+        if value["action"] == 1:
+            delta[key] = base64.b64decode(value.get("bytes", ""))
+        elif value["action"] == 2:
+            delta[key] = value.get("uint", 0)
+        else:
+            delta[key] = None
+    return delta
+
+def _upsert(db, app_id, request_id, round_, **fields):
+    columns = ["app_id", "request_id", "updated_round"] + list(fields)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in ["updated_round"] + list(fields))
+    db.execute(
+        f"INSERT INTO consents ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT (app_id, request_id) DO UPDATE SET {updates}",
+        [app_id, request_id, round_] + list(fields.values()),
+    )
+
+def _fold_global(db, app_id, app, delta, round_):
+    # The global-state contract holds one consent; a new request replaces it on-chain but keeps its row here
+    if b"request_id" in delta:
+        app["current_request_id"] = delta[b"request_id"]
+    request_id = app["current_request_id"]
+    fields = {
+        "requester": _address(delta[b"requester"]) if b"requester" in delta else None,
+        "status": delta[b"status"].decode() if delta.get(b"status") is not None else None,
+        "document_hash": delta.get(b"document_hash"),
+        "document_type": delta[b"document_type"].decode(errors="replace") if b"document_type" in delta else None,
+        "expiry": delta.get(b"expiry"),
+        "permissions": delta.get(b"permissions"),
+    }
+    fields = {column: value for column, value in fields.items() if value is not None}
+    if request_id is None or not fields:
+        return
+    existing = db.execute("SELECT status FROM consents WHERE app_id = ? AND request_id = ?",
+                          (app_id, request_id)).fetchone()
+    if existing is None and "status" not in fields:
+        return
+    _upsert(db, app_id, request_id, round_, owner=app["owner"], **fields)
+
+def _fold_box(db, app_id, app, operation, app_args, logs, round_):
+    # Box deltas are not reported by the indexer, so box consents are rebuilt from the call arguments
+    if operation == "request_consent" and len(app_args) >= 5:
+        _upsert(db, app_id, app_args[3], round_, owner=app["owner"], requester=_address(app_args[4]),
+                status=STATUSES[1], document_hash=app_args[1],
+                document_type=app_args[2].decode(errors="replace"), expiry=None, permissions=None)
+    elif operation == "grant_consent" and len(app_args) >= 4:
+        _upsert(db, app_id, app_args[1], round_, status=STATUSES[2],
+                expiry=decode_uint64(app_args[2]), permissions=decode_uint64(app_args[3]))
+    elif operation == "revoke_consent" and len(app_args) >= 2:
+        _upsert(db, app_id, app_args[1], round_, status=STATUSES[3])
+    elif operation == "sweep_expired":
+        # A sweep skips consents that have not lapsed, so only its ConsentExpired events count
+        for log in logs:
+            event = decode_log(log)
+            if event is not None and event[0] == "sweep_expired":
+                _upsert(db, app_id, event[1], round_, status=STATUSES[4])
+
+def fold_transaction(db, app_id, txn):
+    """Apply one confirmed application call from the indexer to the materialized view."""
+    app_txn = txn.get("application-transaction") or {}
+    row = db.execute("SELECT owner, current_request_id FROM apps WHERE app_id = ?", (app_id,)).fetchone()
+    app = dict(row) if row else {"owner": None, "current_request_id": None}
+    delta = _global_delta(app_txn)
+    if app_txn.get("application-id") == 0 or txn.get("created-application-index") == app_id:
+        app["owner"] = txn["sender"]
+    if delta.get(b"owner") is not None:
+        app["owner"] = _address(delta[b"owner"])
+
+    app_args = [base64.b64decode(arg) for arg in app_txn.get("application-args") or []]
+    operation = _operation(app_args)
+    round_ = txn["confirmed-round"]
+    if b"status" in delta or b"expiry" in delta or b"request_id" in delta:
+        _fold_global(db, app_id, app, delta, round_)
+    elif operation is not None:
+        _fold_box(db, app_id, app, operation, app_args, txn.get("logs") or [], round_)
+    db.execute(
+        "INSERT INTO apps (app_id, owner, current_request_id) VALUES (?, ?, ?) "
+        "ON CONFLICT (app_id) DO UPDATE SET owner = excluded.owner, current_request_id = excluded.current_request_id",
+        (app_id, app["owner"], app["current_request_id"]),
+    )
+
+def checkpoint(db, app_id):
+    """(round, intra-round offset) of the last folded transaction of app_id, or None."""
+    row = db.execute("SELECT round, intra_round_offset FROM checkpoints WHERE app_id = ?", (app_id,)).fetchone()
+    return (row["round"], row["intra_round_offset"]) if row else None
+
+def sync_app(indexer, db, app_id, page_size=PAGE_SIZE):
+    """Fold every application call of app_id after its checkpoint and return how many were applied.
+
+    Each page is applied together with its checkpoint in a single SQLite
+    transaction, so an interrupted sync resumes from the last committed page.
+    """
+    last = checkpoint(db, app_id)
+    next_page = None
+    applied = 0
+    while True:
+        response = indexer.search_transactions(
+            application_id=app_id, txn_type="appl", min_round=last[0] if last else None,
+            limit=page_size, next_page=next_page,
+        )
+        txns = response.get("transactions", [])
+        with db:
+            for txn in txns:
+                position = (txn["confirmed-round"], txn.get("intra-round-offset", 0))
+                # min_round is inclusive, so the checkpoint round is fetched again and skipped up to the checkpoint
+                if last is not None and position <= last:
+                    continue
+                fold_transaction(db, app_id, txn)
+                last = position
+                applied += 1
+            if last is not None:
+                db.execute(
+                    "INSERT INTO checkpoints (app_id, round, intra_round_offset) VALUES (?, ?, ?) "
+                    "ON CONFLICT (app_id) DO UPDATE SET round = excluded.round, "
+                    "intra_round_offset = excluded.intra_round_offset",
+                    (app_id, last[0], last[1]),
+                )
+        next_page = response.get("next-token")
+        if not txns or not next_page:
+            return applied
+
+def sync(indexer, db, app_ids, follow=False, poll_interval=5.0):
+    """Sync every app once, or keep following new rounds when follow is set."""
+    while True:
+        for app_id in app_ids:
+            applied = sync_app(indexer, db, app_id)
+            if applied:
+                logger.info(f"Applied {applied} transactions for app {app_id}, checkpoint {checkpoint(db, app_id)}.")
+        if not follow:
+            return
+        time.sleep(poll_interval)
+
+def pending_requests(db, owner=None):
+    """Consents awaiting the owner's decision, oldest first."""
+    query = "SELECT * FROM consents WHERE status = 'pending'"
+    params = ()
+    if owner is not None:
+        query += " AND owner = ?"
+        params = (owner,)
+    return db.execute(query + " ORDER BY updated_round", params).fetchall()
+
+def expiring_soon(db, within=7 * 24 * 60 * 60, now=None):
+    """Granted consents whose expiry falls within the next `within` seconds, soonest first."""
+    now = int(time.time() if now is None else now)
+    return db.execute(
+        "SELECT * FROM consents WHERE status = 'granted' AND expiry > ? AND expiry <= ? ORDER BY expiry",
+        (now, now + within),
+    ).fetchall()
+
+def main():
+    from algosdk.v2client import indexer
+
+    parser = argparse.ArgumentParser(description="Materialize ConsentContract consents from the indexer into SQLite.")
+    parser.add_argument("app_ids", type=int, nargs="+", help="application IDs to follow")
+    parser.add_argument("--db", default="consents.sqlite", help="SQLite database file")
+    parser.add_argument("--follow", action="store_true", help="keep polling for new rounds")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    client = indexer.IndexerClient(
+        os.environ.get("INDEXER_TOKEN", ""),
+        os.environ.get("INDEXER_ADDRESS", "https://testnet-idx.algonode.cloud"),
+    )
+    sync(client, connect(args.db), args.app_ids, args.follow, args.poll_interval)
+
+if __name__ == "__main__":
+    main()
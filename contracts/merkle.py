@@ -0,0 +1,151 @@
+from collections import namedtuple
+import hashlib
+import json
+import pathlib
+
+from codec import MERKLE_NODE_PREFIX, encode_merkle_leaf, encode_permissions, encode_requester
+
+# One consent of a batch, as the leaf commits to it
+MerkleConsent = namedtuple("MerkleConsent", ["request_id", "requester", "expiry", "permissions", "document_hash"])
+
+# Inclusion proof: bit i of path is set when siblings[i] is the left-hand node at level i
+MerkleProof = namedtuple("MerkleProof", ["index", "path", "siblings"])
+
+def _as_bytes(value, name):
+    # Text request IDs and document hashes are sent as their UTF-8 bytes, as consent_cli sends them
+    if isinstance(value, str):
+        return value.encode()
+    if not isinstance(value, bytes):
+        raise TypeError(f"{name} must be bytes or str, not {type(value).__name__}")
+    return value
+
+def leaf_hash(consent):
+    return hashlib.sha256(encode_merkle_leaf(*consent)).digest()
+
+def node_hash(left, right):
+    return hashlib.sha256(MERKLE_NODE_PREFIX + left + right).digest()
+
+def verify(leaf, proof, root):
+    """Whether proof links leaf to root, checked the way merkle_approval_program does."""
+    node = leaf
+    for level, sibling in enumerate(proof.siblings):
+        node = node_hash(sibling, node) if proof.path >> level & 1 else node_hash(node, sibling)
+    return node == root
+
+class MerkleTree:
+    """Binary Merkle tree over leaf hashes, with every level kept for proofs.
+
+    A node without a sibling is carried up to the next level unchanged, so no
+    leaf is ever duplicated and a proof simply has no entry for that level.
+    """
+
+    def __init__(self, leaves):
+        if not leaves:
+            raise ValueError("a Merkle tree needs at least one leaf")
+        self.levels = [list(leaves)]
+        while len(self.levels[-1]) > 1:
+            below = self.levels[-1]
+            above = [node_hash(below[i], below[i + 1]) for i in range(0, len(below) - 1, 2)]
+            if len(below) % 2:
+                above.append(below[-1])
+            self.levels.append(above)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def proof(self, index):
+        path = 0
+        siblings = []
+        position = index
+        for level in self.levels[:-1]:
+            sibling = position ^ 1
+            if sibling < len(level):
+                if sibling < position:
+                    path |= 1 << len(siblings)
+                siblings.append(level[sibling])
+            position //= 2
+        return MerkleProof(index, path, siblings)
+
+class ConsentBatch:
+    """Grants accumulated for one anchored root, with their inclusion proofs cached.
+
+    add() consents until the batch is anchored; the tree is built once on
+    first use and proofs are kept per request ID, so serving a view costs a
+    dictionary lookup. save() and load() keep a batch as JSON so proofs can be
+    served after a restart.
+    """
+
+    def __init__(self, consents=()):
+        self.consents = []
+        self._index = {}
+        self._tree = None
+        self._proofs = {}
+        for consent in consents:
+            self.add(*consent)
+
+    def __len__(self):
+        return len(self.consents)
+
+    def __contains__(self, request_id):
+        return _as_bytes(request_id, "request_id") in self._index
+
+    def add(self, request_id, requester, expiry, permissions=("view",), document_hash=b""):
+        """Add a granted consent and return its leaf index; a str request_id or document_hash is UTF-8 encoded."""
+        request_id = _as_bytes(request_id, "request_id")
+        document_hash = _as_bytes(document_hash, "document_hash")
+        if request_id in self._index:
+            raise ValueError(f"request {request_id!r} is already in this batch")
+        consent = MerkleConsent(request_id, encode_requester(requester), expiry, encode_permissions(permissions),
+                                document_hash)
+        self._index[request_id] = len(self.consents)
+        self.consents.append(consent)
+        self._tree = None
+        self._proofs.clear()
+        return self._index[request_id]
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = MerkleTree([leaf_hash(consent) for consent in self.consents])
+        return self._tree
+
+    @property
+    def root(self):
+        return self.tree.root
+
+    def consent(self, request_id):
+        return self.consents[self._index[_as_bytes(request_id, "request_id")]]
+
+    def proof(self, request_id):
+        """MerkleProof of request_id's consent against root."""
+        request_id = _as_bytes(request_id, "request_id")
+        proof = self._proofs.get(request_id)
+        if proof is None:
+            proof = self._proofs[request_id] = self.tree.proof(self._index[request_id])
+        return proof
+
+    def save(self, path):
+        records = [{
+            "request_id": consent.request_id.hex(),
+            "requester": consent.requester.hex(),
+            "expiry": consent.expiry,
+            "permissions": consent.permissions,
+            "document_hash": consent.document_hash.hex(),
+        } for consent in self.consents]
+        pathlib.Path(path).write_text(json.dumps({"root": self.root.hex(), "consents": records}))
+
+    @classmethod
+    def load(cls, path):
+        data = json.loads(pathlib.Path(path).read_text())
+        batch = cls(
+            (bytes.fromhex(record["request_id"]), bytes.fromhex(record["requester"]), record["expiry"],
+             record["permissions"], bytes.fromhex(record["document_hash"]))
+            for record in data["consents"]
+        )
+        if batch.root.hex() != data["root"]:
+            raise ValueError(f"{path} does not rebuild its recorded root")
+        return batch
@@ -0,0 +1,110 @@
+import copy
+import logging
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Average seconds per round, used to estimate the current round between fetches
+DEFAULT_BLOCK_TIME = 2.8
+
+# Random bytes in the note of a call that may be repeated verbatim within one params window
+UNIQUE_NOTE_SIZE = 8
+
+class SuggestedParamsCache:
+    """Shares one fetched SuggestedParams across every transaction builder.
+
+    The cached params are reused while their first-valid/last-valid window is
+    still usable. Once the estimated current round comes within refresh_margin
+    rounds of last-valid, a background refresh is started while the cached
+    params keep being served; only params within min_remaining rounds of
+    expiring are refetched synchronously.
+
+    Every builder gets the same first and last valid rounds for hundreds of
+    rounds, so two calls with the same sender, app and arguments encode to the
+    same transaction ID, and algod rejects the second as already in the
+    ledger. Calls that are legitimately repeated, such as view_document, carry
+    a unique_note(); the others differ in their arguments or state anyway.
+    """
+
+    def __init__(self, client, block_time=DEFAULT_BLOCK_TIME, refresh_margin=200, min_remaining=20):
+        self.client = client
+        self.block_time = block_time
+        self.refresh_margin = refresh_margin
+        self.min_remaining = min_remaining
+        self._params = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self.fetches = 0
+
+    def _fetch(self):
+        params = self.client.suggested_params()
+        with self._lock:
+            self._params = params
+            self._fetched_at = time.monotonic()
+            self._refreshing = None
+            self.fetches += 1
+        logger.debug(f"Fetched suggested params valid for rounds {params.first}-{params.last}.")
+        return params
+
+    def _refresh_in_background(self):
+        def refresh():
+            try:
+                self._fetch()
+            except Exception as e:
+                logger.warning(f"Background suggested params refresh failed: {e}")
+                with self._lock:
+                    self._refreshing = None
+
+        with self._lock:
+            if self._refreshing is not None:
+                return
+            self._refreshing = threading.Thread(target=refresh, name="params-refresh", daemon=True)
+        self._refreshing.start()
+
+    def current_round(self):
+        """Estimate the current round from the last fetch without a network call."""
+        if self._params is None:
+            self._fetch()
+        elapsed = time.monotonic() - self._fetched_at
+        return self._params.first + int(elapsed / self.block_time)
+
+    def get(self):
+        """A copy of the shared params, fetching only when the cached window is nearly used up."""
+        if self._params is None:
+            return copy.copy(self._fetch())
+        remaining = self._params.last - self.current_round()
+        if remaining <= self.min_remaining:
+            return copy.copy(self._fetch())
+        if remaining <= self.refresh_margin:
+            self._refresh_in_background()
+        return copy.copy(self._params)
+
+    def invalidate(self):
+        """Drop the cached params, for example after switching networks."""
+        with self._lock:
+            self._params = None
+
+def unique_note():
+    """Note bytes that keep an otherwise identical call built from shared params a distinct transaction."""
+    return secrets.token_bytes(UNIQUE_NOTE_SIZE)
+
+_caches_lock = threading.Lock()
+
+def params_cache_for(client):
+    """The SuggestedParamsCache shared by every builder using client.
+
+    The cache is kept on the client itself, so it goes away with the client
+    and a later client can never pick up another's params.
+    """
+    with _caches_lock:
+        cache = getattr(client, "params_cache", None)
+        if cache is None:
+            cache = client.params_cache = SuggestedParamsCache(client)
+        return cache
+
+def get_suggested_params(client):
+    """Drop-in replacement for client.suggested_params() backed by the shared cache."""
+    return params_cache_for(client).get()
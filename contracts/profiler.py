@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+from collections import defaultdict
+import argparse
+import json
+import pathlib
+import sys
+
+from assembler import assemble
+from build_cache import compile_teal_cached
+from harness import ConsentHarness, new_address
+
+DEFAULT_BUDGETS = pathlib.Path(__file__).with_name("cost_budgets.json")
+
+PROGRAMS = ["approval", "abi_approval", "box_approval"]
+
+METHODS = ["request_consent", "grant_consent", "view_document", "revoke_consent", "sweep_expired"]
+
+STATE_READS = {"app_global_get", "app_global_get_ex", "box_get", "box_len", "box_extract"}
+STATE_WRITES = {"app_global_put", "app_global_del", "box_put", "box_replace", "box_del", "box_create"}
+
+DAY = 24 * 60 * 60
+
+def _scenarios(harness, requester):
+    """Each method with the calls that put the contract in a state where it is approved."""
+    request_id = b"request_1"
+    expiry = harness.ledger.timestamp + 30 * DAY
+
+    def request(trace=False):
+        return harness.request(harness.creator, request_id, requester, trace=trace)
+
+    def grant(trace=False):
+        return harness.grant(harness.creator, request_id, expiry, trace=trace)
+
+    def grant_lapsed():
+        return harness.grant(harness.creator, request_id, harness.ledger.timestamp)
+
+    return [
+        ("request_consent", [], request),
+        ("grant_consent", [request], grant),
+        ("view_document", [request, grant], lambda trace: harness.view(requester, request_id, trace=trace)),
+        ("revoke_consent", [request, grant], lambda trace: harness.revoke(requester, request_id, trace=trace)),
+        ("sweep_expired", [request, grant_lapsed], lambda trace: harness.sweep(requester, request_id, trace=trace)),
+    ]
+
+def _dispatch_cost(trace, unknown):
+    # The dispatch prefix is everything a call shares with a call of an unknown operation
+    cost = 0
+    for step, other in zip(trace, unknown):
+        if step[0] != other[0]:
+            break
+        cost += step[3]
+    return cost
+
+def profile(program="approval"):
+    """Opcode cost, state access and per-line cost of each method in a ConsentContract program."""
+    teal = compile_teal_cached(program)
+    source = teal.splitlines()
+    unknown = ConsentHarness(program).call_raw(new_address(), [b"unknown_operation"], boxes=[], trace=True)
+    lines = defaultdict(lambda: {"hits": 0, "cost": 0, "methods": set()})
+    methods = {}
+    for index, name in enumerate(METHODS):
+        # Every method gets a fresh contract, so state never leaks between them
+        _, setup, call = _scenarios(ConsentHarness(program), new_address())[index]
+        for step in setup:
+            assert step().approved
+        result = call(trace=True)
+        if not result.approved:
+            raise RuntimeError(f"{program} {name} was rejected while profiling: {result.error}")
+        trace = result.evaluation.trace
+        for _, line, op, cost in trace:
+            lines[line]["hits"] += 1
+            lines[line]["cost"] += cost
+            lines[line]["methods"].add(name)
+        methods[name] = {
+            "cost": result.cost,
+            "dispatch_cost": _dispatch_cost(trace, unknown.evaluation.trace),
+            "opcodes": len(trace),
+            "state_reads": sum(op in STATE_READS for _, _, op, _ in trace),
+            "state_writes": sum(op in STATE_WRITES for _, _, op, _ in trace),
+            "logs": len(result.logs),
+        }
+    return {
+        "program": program,
+        "program_bytes": len(assemble(teal)),
+        "methods": methods,
+        "lines": {
+            line: {"source": source[line - 1].strip(), "hits": stats["hits"], "cost": stats["cost"],
+                   "methods": sorted(stats["methods"])}
+            for line, stats in sorted(lines.items())
+        },
+    }
+
+def load_budgets(path=DEFAULT_BUDGETS):
+    return json.loads(pathlib.Path(path).read_text())
+
+def check_budgets(report, budgets):
+    """Violations of a program's configured budgets, as human-readable strings."""
+    budget = budgets.get(report["program"])
+    if budget is None:
+        return []
+    violations = []
+    if report["program_bytes"] > budget.get("program_bytes", float("inf")):
+        violations.append(
+            f"{report['program']}: program is {report['program_bytes']} bytes, budget {budget['program_bytes']}"
+        )
+    for name, limit in budget.get("methods", {}).items():
+        stats = report["methods"].get(name)
+        if stats is not None and stats["cost"] > limit:
+            violations.append(f"{report['program']} {name}: costs {stats['cost']} opcodes, budget {limit}")
+    return violations
+
+def print_report(report, top=10):
+    print(f"{report['program']} ({report['program_bytes']} bytes, local assembler)")
+    print(f"  {'method':<16} {'cost':>5} {'dispatch':>9} {'reads':>6} {'writes':>7} {'logs':>5}")
+    for name, stats in report["methods"].items():
+        print(f"  {name:<16} {stats['cost']:>5} {stats['dispatch_cost']:>9} "
+              f"{stats['state_reads']:>6} {stats['state_writes']:>7} {stats['logs']:>5}")
+    if top:
+        print("  most expensive lines:")
+        hottest = sorted(report["lines"].items(), key=lambda item: -item[1]["cost"])[:top]
+        for line, stats in hottest:
+            print(f"    {line:>4}  {stats['cost']:>4}  {stats['source']:<40} {','.join(stats['methods'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the opcode cost of each ConsentContract method.")
+    parser.add_argument("--program", default="all", help="approval, abi_approval, box_approval or all")
+    parser.add_argument("--budgets", default=str(DEFAULT_BUDGETS), help="JSON file of per-program budgets")
+    parser.add_argument("--top", type=int, default=10, help="number of most expensive TEAL lines to show")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    programs = PROGRAMS if args.program == "all" else [args.program]
+    reports = [profile(program) for program in programs]
+    budgets = load_budgets(args.budgets)
+    violations = [violation for report in reports for violation in check_budgets(report, budgets)]
+    if args.json:
+        print(json.dumps({"reports": reports, "violations": violations}, indent=2))
+    else:
+        for report in reports:
+            print_report(report, args.top)
+        for violation in violations:
+            print(f"BUDGET EXCEEDED {violation}")
+    sys.exit(1 if violations else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import argparse
+import base64
+import json
+import logging
+import os
+import pathlib
+
+from algosdk import logic
+from algosdk.transaction import (ApplicationCreateTxn, ApplicationUpdateTxn, OnComplete, PaymentTxn,
+                                 StateSchema)
+
+from assembler import program_hash
+from batch import ConsentOperation, send_batch
+from build_cache import VARIANT_PROGRAMS, build_program
+from params_cache import get_suggested_params
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY = pathlib.Path(__file__).with_name("app_registry.json")
+
+# Approval program -> (global schema, app account funding), as in deploy.py
+STORAGE = {
+    "approval": (StateSchema(num_uints=8, num_byte_slices=8), 0),
+    "box_approval": (StateSchema(num_uints=0, num_byte_slices=1), 1_000_000),
+    "abi_approval": (StateSchema(num_uints=8, num_byte_slices=8), 0),
+    "merkle_approval": (StateSchema(num_uints=0, num_byte_slices=1), 1_000_000),
+}
+
+# Contract variant -> (approval program in build_cache, global schema, app account funding)
+VARIANTS = {variant: (program, *STORAGE[program]) for variant, program in VARIANT_PROGRAMS.items()}
+
+CREATE = "create"
+UPDATE = "update"
+NOOP = "noop"
+
+class AppRegistry:
+    """Deployed apps per network and tenant, kept in a JSON file.
+
+    Each entry records the app ID, contract variant, the approval and clear
+    program hashes last deployed and the round they were confirmed in. The
+    file is rewritten whole on save(), through a temporary file so an
+    interrupted save leaves the previous registry intact.
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY):
+        self.path = pathlib.Path(path)
+        self.networks = json.loads(self.path.read_text()) if self.path.exists() else {}
+
+    def get(self, network, tenant):
+        return self.networks.get(network, {}).get(tenant)
+
+    def apps(self, network):
+        """Tenant -> entry for every app on network."""
+        return dict(self.networks.get(network, {}))
+
+    def record(self, network, tenant, **entry):
+        self.networks.setdefault(network, {})[tenant] = entry
+
+    def save(self):
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps(self.networks, indent=2, sort_keys=True) + "\n")
+        os.replace(temporary, self.path)
+
+def network_id(client):
+    """Genesis ID of the network client is connected to, e.g. testnet-v1.0."""
+    return get_suggested_params(client).gen
+
+def onchain_hashes(client, app_id):
+    """(approval hash, clear hash) of app_id's programs on chain, or None when the app does not exist."""
+    try:
+        info = client.application_info(app_id)
+    except Exception as e:
+        # algod answers 404 for an app that was never created or has been deleted
+        if getattr(e, "code", None) == 404:
+            return None
+        raise
+    params = info["params"]
+    return (program_hash(base64.b64decode(params["approval-program"])),
+            program_hash(base64.b64decode(params["clear-state-program"])))
+
+def plan(client, entry, approval_hash, clear_hash):
+    """CREATE, UPDATE or NOOP for a registry entry (or None) given the compiled program hashes."""
+    if entry is None:
+        return CREATE
+    deployed = onchain_hashes(client, entry["app_id"])
+    if deployed is None:
+        return CREATE
+    return NOOP if deployed == (approval_hash, clear_hash) else UPDATE
+
+def deploy(client, registry, tenants, sender, private_key, variant="global", dry_run=False):
+    """Bring every tenant's app of variant up to the current programs and return one result per tenant.
+
+    The programs are built once and their hashes compared with each tenant's
+    app on chain: matching apps are left alone, apps with other programs get
+    an UpdateApplication (which the contracts only accept from the owner),
+    and tenants without a live app get a new one, funded for box storage when
+    the variant needs it. Each transaction is its own group, so one rejected
+    tenant does not hold back the others, and all of them are confirmed
+    together. The registry is saved once every confirmation is in. With
+    dry_run only the plan is returned.
+    """
+    program, global_schema, funding = VARIANTS[variant]
+    approval = build_program(program, client)
+    clear = build_program("clear", client)
+    network = network_id(client)
+
+    results = []
+    for tenant in tenants:
+        entry = registry.get(network, tenant)
+        if entry is not None and entry["variant"] != variant:
+            # Storage layouts differ between variants, so an app is never updated into another one
+            raise ValueError(f"tenant {tenant!r} is deployed as the {entry['variant']} variant, not {variant}")
+        results.append({
+            "tenant": tenant,
+            "action": plan(client, entry, approval["hash"], clear["hash"]),
+            "app_id": entry["app_id"] if entry else None,
+            "tx_id": None,
+            "error": None,
+        })
+    planned = {action: sum(result["action"] == action for result in results) for action in (CREATE, UPDATE, NOOP)}
+    logger.info(f"Deploy plan on {network}: {planned[CREATE]} to create, {planned[UPDATE]} to update, "
+                f"{planned[NOOP]} unchanged.")
+    if dry_run:
+        return results
+
+    params = get_suggested_params(client)
+    changing = [result for result in results if result["action"] != NOOP]
+    operations = []
+    for result in changing:
+        if result["action"] == UPDATE:
+            txn = ApplicationUpdateTxn(sender, params, result["app_id"], approval["bytecode"], clear["bytecode"])
+        else:
+            # The note keeps otherwise identical creations for different tenants distinct
+            txn = ApplicationCreateTxn(sender, params, OnComplete.NoOpOC, approval["bytecode"], clear["bytecode"],
+                                       global_schema, StateSchema(num_uints=0, num_byte_slices=0),
+                                       note=f"tenant:{result['tenant']}".encode())
+        operations.append(ConsentOperation(f"{result['action']} {result['tenant']}", txn, private_key))
+
+    created = []
+    for result, sent in zip(changing, send_batch(client, operations, group_size=1)):
+        result["tx_id"] = sent["tx_id"]
+        result["error"] = sent["error"]
+        if sent["error"]:
+            continue
+        if result["action"] == CREATE:
+            result["app_id"] = client.pending_transaction_info(sent["tx_id"])["application-index"]
+            created.append(result)
+        registry.record(network, result["tenant"], variant=variant, app_id=result["app_id"],
+                        approval_hash=approval["hash"], clear_hash=clear["hash"], round=sent["confirmed_round"])
+
+    if funding and created:
+        # Box storage is paid for by the application account
+        payments = [
+            ConsentOperation(f"fund {result['tenant']}",
+                             PaymentTxn(sender, params, logic.get_application_address(result["app_id"]), funding),
+                             private_key)
+            for result in created
+        ]
+        for result, sent in zip(created, send_batch(client, payments, group_size=1)):
+            if sent["error"]:
+                result["error"] = f"created but not funded: {sent['error']}"
+    registry.save()
+    return results
+
+def main():
+    from deploy import get_account_from_mnemonic, get_client
+
+    parser = argparse.ArgumentParser(description="Create or update tenant apps only where their programs changed.")
+    parser.add_argument("tenants", nargs="+", help="tenant names")
+    parser.add_argument("--variant", choices=list(VARIANTS), default="global")
+    parser.add_argument("--registry", default=str(DEFAULT_REGISTRY), help="registry JSON file")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    address, private_key = get_account_from_mnemonic(os.environ["CREATOR_MNEMONIC"])
+    results = deploy(get_client(), AppRegistry(args.registry), args.tenants, address, private_key,
+                     args.variant, args.dry_run)
+    print(json.dumps(results, indent=2))
+    if any(result["error"] for result in results):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
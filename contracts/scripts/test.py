@@ -2,35 +2,13 @@
 
 import os
 import sys
-import json
 import pytest
-from algokit_utils import (
-    get_algod_client,
-    get_indexer_client,
-    get_localnet_default_account,
-    deploy_app,
-    get_app_account,
-    get_app_global_state,
-    get_app_local_state,
-    get_app_boxes,
-    get_app_box_names,
-    get_app_box_value,
-    get_app_box_names,
-    get_app_box_value,
-    get_app_boxes,
-    get_app_global_state,
-    get_app_local_state,
-    get_app_account,
-    get_localnet_default_account,
-    get_algod_client,
-    get_indexer_client,
-    deploy_app,
-    ApplicationSpecification,
-)
+
+CONTRACTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 def main():
-    # Run the tests
-    pytest.main(["-v", "test_contract.py"])
+    # Run the offline tests against the in-process AVM and localnet
+    sys.exit(pytest.main(["-v", CONTRACTS_DIR] + sys.argv[1:]))
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,174 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import bisect
+import hashlib
+import logging
+
+import registry
+from batch import MAX_GROUP_SIZE, ConsentOperation, send_batch
+from state import ConsentStateReader
+from tracker import ConfirmationTracker
+
+logger = logging.getLogger(__name__)
+
+# Points per shard on the hash ring; more points spread request IDs more evenly
+DEFAULT_REPLICAS = 128
+
+# One consent operation for a sharded pool: build(app_id) returns the unsigned call for the shard owning request_id
+ShardedOperation = namedtuple("ShardedOperation", ["name", "request_id", "build", "private_key"])
+
+def _point(key):
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big")
+
+class HashRing:
+    """Consistent hashing of request IDs onto app IDs.
+
+    Every shard owns `replicas` points on a 64-bit ring and a request ID
+    belongs to the first point at or after its own hash. Adding a shard only
+    moves the request IDs that now fall just before its points, about 1/n of
+    them, and every one of them moves to the new shard.
+    """
+
+    def __init__(self, app_ids=(), replicas=DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._points = []
+        self._owners = []
+        for app_id in app_ids:
+            self.add(app_id)
+
+    def __len__(self):
+        return len(set(self._owners))
+
+    @property
+    def app_ids(self):
+        return sorted(set(self._owners))
+
+    def add(self, app_id):
+        if app_id in self._owners:
+            return
+        for replica in range(self.replicas):
+            point = _point(f"{app_id}#{replica}".encode())
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, app_id)
+
+    def remove(self, app_id):
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != app_id]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def app_for(self, request_id):
+        """App ID of the shard holding request_id."""
+        if not self._points:
+            raise ValueError("the hash ring has no shards")
+        request_id = request_id.encode() if isinstance(request_id, str) else request_id
+        index = bisect.bisect_left(self._points, _point(request_id)) % len(self._points)
+        return self._owners[index]
+
+    def partition(self, request_ids):
+        """App ID -> the request IDs it holds, each list in input order."""
+        shards = {}
+        for request_id in request_ids:
+            shards.setdefault(self.app_for(request_id), []).append(request_id)
+        return shards
+
+def shard_tenants(pool, shards):
+    """Registry tenant names of the first `shards` shards of pool."""
+    return [f"{pool}/shard-{index}" for index in range(shards)]
+
+def deploy_pool(client, apps, pool, shards, sender, private_key):
+    """Create or update the box-storage apps of pool's first `shards` shards and return their app IDs.
+
+    Shards are tenants of the app registry, so growing a pool only creates the
+    new shards and a rerun leaves current ones alone.
+    """
+    results = registry.deploy(client, apps, shard_tenants(pool, shards), sender, private_key, variant="box")
+    failed = [result for result in results if result["error"]]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {shards} shards failed to deploy: {failed[0]['error']}")
+    return [result["app_id"] for result in results]
+
+def load_pool(apps, network, pool):
+    """App IDs of pool's shards recorded in the registry, in shard order."""
+    entries = apps.apps(network)
+    app_ids = []
+    for tenant in shard_tenants(pool, len(entries)):
+        if tenant not in entries:
+            break
+        app_ids.append(entries[tenant]["app_id"])
+    return app_ids
+
+class ShardedConsents:
+    """Box-storage consents spread over a pool of apps by consistent hashing of their request IDs.
+
+    Reads and batched writes are split by shard and each shard is served on
+    its own worker thread. Writes to all shards share one ConfirmationTracker,
+    so the pool follows blocks once however many shards it has.
+    """
+
+    def __init__(self, client, app_ids, replicas=DEFAULT_REPLICAS, max_workers=None):
+        self.client = client
+        self.ring = HashRing(app_ids, replicas)
+        self.max_workers = max_workers
+        self._readers = {}
+
+    def add_shard(self, app_id):
+        """Route to a newly deployed app; consents already stored on other shards stay where they are."""
+        self.ring.add(app_id)
+
+    def app_for(self, request_id):
+        return self.ring.app_for(request_id)
+
+    def _fan_out(self, shards, work):
+        # One task per shard; results come back keyed by app ID
+        with ThreadPoolExecutor(max_workers=self.max_workers or max(len(shards), 1)) as pool:
+            futures = {app_id: pool.submit(work, app_id, items) for app_id, items in shards.items()}
+            return {app_id: future.result() for app_id, future in futures.items()}
+
+    def reader(self, app_id):
+        if app_id not in self._readers:
+            self._readers[app_id] = ConsentStateReader(self.client, app_id, box_storage=True)
+        return self._readers[app_id]
+
+    def consents(self, request_ids):
+        """request_id -> ConsentRecord (or None), read from every shard in parallel."""
+        def read(app_id, shard_request_ids):
+            reader = self.reader(app_id)
+            return {request_id: reader.consent(request_id) for request_id in shard_request_ids}
+
+        records = {}
+        for shard_records in self._fan_out(self.ring.partition(request_ids), read).values():
+            records.update(shard_records)
+        return records
+
+    def send(self, operations, group_size=MAX_GROUP_SIZE):
+        """Send ShardedOperations to their shards in parallel and return the send_batch results in input order.
+
+        Each shard's operations are packed into atomic groups of their own, so
+        a rejected group only fails operations of one shard.
+        """
+        operations = list(operations)
+        shards = {}
+        for position, operation in enumerate(operations):
+            shards.setdefault(self.app_for(operation.request_id), []).append(position)
+
+        tracker = ConfirmationTracker(self.client, fetch_info=False)
+
+        def send_shard(app_id, positions):
+            batch = [ConsentOperation(operations[position].name, operations[position].build(app_id),
+                                      operations[position].private_key) for position in positions]
+            results = send_batch(self.client, batch, group_size, tracker)
+            for result in results:
+                result["app_id"] = app_id
+            return results
+
+        try:
+            sent = self._fan_out(shards, send_shard)
+        finally:
+            tracker.stop()
+        results = [None] * len(operations)
+        for app_id, positions in shards.items():
+            for position, result in zip(positions, sent[app_id]):
+                results[position] = result
+        logger.info(f"Sent {len(operations)} operations across {len(shards)} shards.")
+        return results
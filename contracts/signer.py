@@ -0,0 +1,115 @@
+import base64
+import concurrent.futures
+import logging
+
+from algosdk import account, encoding, mnemonic
+from algosdk.transaction import assign_group_id
+
+logger = logging.getLogger(__name__)
+
+# Transactions per task handed to a worker
+CHUNK_SIZE = 256
+
+class Keystore:
+    """Private keys held in memory by address, so each key is decoded once per process."""
+
+    def __init__(self, private_keys=()):
+        self._keys = {}
+        for private_key in private_keys:
+            self.add(private_key)
+
+    @classmethod
+    def from_mnemonics(cls, mnemonics):
+        return cls(mnemonic.to_private_key(words) for words in mnemonics)
+
+    @classmethod
+    def from_file(cls, path, password):
+        """Load every account of an encrypted keystore written by keystore.py."""
+        from keystore import read_keystore
+
+        return cls(private_key for _, private_key in read_keystore(path, password))
+
+    def add(self, private_key):
+        address = account.address_from_private_key(private_key)
+        self._keys[address] = private_key
+        return address
+
+    def private_key(self, address):
+        try:
+            return self._keys[address]
+        except KeyError:
+            raise KeyError(f"no key in the keystore for {address}") from None
+
+    @property
+    def addresses(self):
+        return list(self._keys)
+
+    def private_keys(self):
+        """Every private key, in the order they were added, for loading the keystore elsewhere."""
+        return list(self._keys.values())
+
+    def __contains__(self, address):
+        return address in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def sign(self, txn):
+        """Sign txn with its sender's key and return the msgpack-encoded signed transaction."""
+        return base64.b64decode(encoding.msgpack_encode(txn.sign(self.private_key(txn.sender))))
+
+# Each worker process holds its own copy of the keystore, set once by the pool initializer
+_worker_keystore = None
+
+def _init_worker(keys):
+    global _worker_keystore
+    _worker_keystore = Keystore(keys)
+
+def _sign_chunk(txns, keystore=None):
+    keystore = keystore or _worker_keystore
+    return [keystore.sign(txn) for txn in txns]
+
+class SigningPool:
+    """Signs large lists of transactions in parallel and returns msgpack blobs ready to submit.
+
+    Worker processes each receive the keystore once at start-up, so only the
+    unsigned transactions and the signed blobs cross process boundaries.
+    processes=False signs on threads instead, which avoids start-up cost for
+    small jobs but shares one interpreter. Blobs come back in input order and
+    can be passed straight to PipelinedSubmitter.submit or
+    send_raw_transaction.
+    """
+
+    def __init__(self, keystore, workers=None, processes=True, chunk_size=CHUNK_SIZE):
+        self.keystore = keystore
+        self.chunk_size = chunk_size
+        if processes:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(keystore.private_keys(),)
+            )
+            self._sign = _sign_chunk
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+            self._sign = lambda txns: _sign_chunk(txns, keystore)
+
+    def sign(self, txns):
+        """Sign txns, each with its sender's key, and return their encodings in order."""
+        txns = list(txns)
+        chunks = [txns[i:i + self.chunk_size] for i in range(0, len(txns), self.chunk_size)]
+        logger.debug(f"Signing {len(txns)} transactions in {len(chunks)} chunks...")
+        return [blob for blobs in self._executor.map(self._sign, chunks) for blob in blobs]
+
+    def sign_groups(self, groups):
+        """Assign a group ID to each list of transactions, sign them all and return blobs per group."""
+        groups = [assign_group_id(list(group)) for group in groups]
+        blobs = iter(self.sign(txn for group in groups for txn in group))
+        return [[next(blobs) for _ in group] for group in groups]
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,134 @@
+from collections import namedtuple
+import base64
+import threading
+import time
+
+from algosdk import encoding
+
+from codec import decode_box
+
+# A consent as stored by either contract variant. requester is the 32-byte public
+# key the contract compares the sender to, permissions a codec.PERMISSION_BITS mask
+ConsentRecord = namedtuple(
+    "ConsentRecord",
+    ["request_id", "status", "owner", "requester", "document_hash", "document_type", "expiry", "permissions"],
+)
+
+def _state_value(value):
+    return base64.b64decode(value["bytes"]) if value["type"] == 1 else value["uint"]
+
+def decode_global_state(global_state):
+    """The "global-state" list of an algod application_info response as a dict of bytes keys."""
+    return {base64.b64decode(entry["key"]): _state_value(entry["value"]) for entry in global_state or []}
+
+def record_from_global_state(state):
+    """The single consent held by the global-state contract, or None before any request."""
+    if b"status" not in state:
+        return None
+    return ConsentRecord(
+        request_id=state.get(b"request_id"),
+        status=state[b"status"].decode(),
+        owner=state.get(b"owner"),
+        requester=state.get(b"requester"),
+        document_hash=state.get(b"document_hash"),
+        document_type=state.get(b"document_type"),
+        expiry=state.get(b"expiry"),
+        permissions=state.get(b"permissions"),
+    )
+
+def record_from_box(request_id, value, owner=None):
+    """Decode a box_approval consent box; see codec.py for the layout."""
+    fields = decode_box(value)
+    pending = fields["status"] == "pending"
+    return ConsentRecord(
+        request_id=request_id,
+        owner=owner,
+        **dict(fields, expiry=None if pending else fields["expiry"],
+               permissions=None if pending else fields["permissions"]),
+    )
+
+def is_allowed(record, sender, now=None):
+    """Whether view_document from sender would be approved: granted, not expired, sent by owner or requester.
+
+    now defaults to the local clock, standing in for the latest block timestamp.
+    """
+    if record is None or record.status != "granted" or record.expiry is None:
+        return False
+    if record.expiry <= (time.time() if now is None else now):
+        return False
+    sender_key = encoding.decode_address(sender) if isinstance(sender, str) else sender
+    return sender_key in (record.owner, record.requester)
+
+class ConsentStateReader:
+    """Reads consents from algod without sending transactions, caching them until the round advances.
+
+    Set box_storage for apps running box_approval_program, where each consent
+    is a box named by its request ID. Every read first asks for the ledger's
+    last round, from algod's status unless last_round is given (for example
+    `lambda: tracker.last_round` while a ConfirmationTracker follows blocks),
+    and cached records are dropped as soon as it moves on. Repeated checks
+    within a round cost that one status call instead of application and box
+    reads, and a block that changes a consent is never hidden by the cache.
+    """
+
+    def __init__(self, client, app_id, box_storage=False, last_round=None):
+        self.client = client
+        self.app_id = app_id
+        self.box_storage = box_storage
+        self.last_round = last_round or (lambda: self.client.status()["last-round"])
+        self._cache = {}
+        self._cached_round = None
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def _cached(self, key, load, current_round):
+        with self._lock:
+            if current_round != self._cached_round:
+                self._cache.clear()
+                self._cached_round = current_round
+            if key in self._cache:
+                return self._cache[key]
+        value = load()
+        with self._lock:
+            if self._cached_round == current_round:
+                self._cache[key] = value
+        return value
+
+    def global_state(self, current_round=None):
+        def load():
+            self.fetches += 1
+            info = self.client.application_info(self.app_id)
+            return decode_global_state(info["params"].get("global-state"))
+
+        return self._cached(("global",), load, self.last_round() if current_round is None else current_round)
+
+    def consent(self, request_id=None):
+        """The consent for request_id (box storage) or the app's single consent, or None."""
+        current_round = self.last_round()
+        if not self.box_storage:
+            return record_from_global_state(self.global_state(current_round))
+        request_id = request_id.encode() if isinstance(request_id, str) else request_id
+
+        def load():
+            self.fetches += 1
+            try:
+                box = self.client.application_box_by_name(self.app_id, request_id)
+            except Exception as e:
+                # algod answers 404 for a box that does not exist
+                if getattr(e, "code", None) == 404:
+                    return None
+                raise
+            return base64.b64decode(box["value"])
+
+        value = self._cached(("box", request_id), load, current_round)
+        if value is None:
+            return None
+        return record_from_box(request_id, value, owner=self.global_state(current_round).get(b"owner"))
+
+    def is_allowed(self, sender, request_id=None, now=None):
+        return is_allowed(self.consent(request_id), sender, now)
+
+    def invalidate(self):
+        """Forget every cached read, for example right after sending a consent transaction."""
+        with self._lock:
+            self._cache.clear()
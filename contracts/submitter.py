@@ -0,0 +1,132 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import logging
+import time
+
+import msgpack
+
+from tracker import ConfirmationTracker
+
+logger = logging.getLogger(__name__)
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values, or None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class PipelinedSubmitter:
+    """Keeps up to `window` signed transactions in flight against one algod client.
+
+    submit() waits for a free slot before sending, which is the backpressure
+    applied to producers, and returns a future that resolves to the confirmed
+    transaction info. The algod client is blocking, so sends run on a thread
+    pool sized to the window; confirmations come from a shared
+    ConfirmationTracker instead of a polling loop per transaction.
+    """
+
+    def __init__(self, client, window=64, tracker=None):
+        self.client = client
+        self.window = window
+        self._owns_tracker = tracker is None
+        self.tracker = tracker or ConfirmationTracker(client)
+        self._slots = asyncio.Semaphore(window)
+        self._executor = ThreadPoolExecutor(max_workers=window, thread_name_prefix="submitter")
+        self._pending = set()
+        self._latencies = deque(maxlen=10_000)
+        self._started = None
+        self.submitted = 0
+        self.rejected = 0
+        self.confirmed = 0
+        self.failed = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _send(self, signed_txn):
+        if isinstance(signed_txn, (bytes, bytearray)):
+            # Already msgpack-encoded, as produced by bulk signers
+            return self.client.send_raw_transaction(base64.b64encode(signed_txn))
+        return self.client.send_transaction(signed_txn)
+
+    @staticmethod
+    def _last_valid(signed_txn):
+        if isinstance(signed_txn, (bytes, bytearray)):
+            return msgpack.unpackb(signed_txn, raw=False)["txn"]["lv"]
+        return signed_txn.transaction.last_valid_round
+
+    async def submit(self, signed_txn):
+        """Send signed_txn once a slot is free and return a future for its confirmation."""
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        if self._started is None:
+            self._started = time.perf_counter()
+        sent_at = time.perf_counter()
+        try:
+            tx_id = await loop.run_in_executor(self._executor, self._send, signed_txn)
+        except Exception:
+            self._slots.release()
+            self.rejected += 1
+            raise
+        self.submitted += 1
+        task = loop.create_task(self._track(tx_id, self._last_valid(signed_txn), sent_at))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _track(self, tx_id, last_valid, sent_at):
+        try:
+            txinfo = await self.tracker.wait(tx_id, last_valid)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Transaction {tx_id} failed to confirm: {e}")
+            raise
+        finally:
+            self._slots.release()
+        self.confirmed += 1
+        self._latencies.append(time.perf_counter() - sent_at)
+        return txinfo
+
+    async def submit_many(self, signed_txns):
+        """Submit every transaction through the window and wait for all of them."""
+        futures = [await self.submit(signed_txn) for signed_txn in signed_txns]
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    async def drain(self):
+        """Wait until nothing is in flight."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def close(self):
+        await self.drain()
+        self._executor.shutdown(wait=False)
+        if self._owns_tracker:
+            self.tracker.stop()
+
+    @property
+    def in_flight(self):
+        return self.submitted - self.confirmed - self.failed
+
+    def stats(self):
+        """Throughput and confirmation latency counters since the first submission."""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        latencies = list(self._latencies)
+        return {
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "elapsed_seconds": elapsed,
+            "confirmed_per_second": self.confirmed / elapsed if elapsed else 0.0,
+            "latency_mean_seconds": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p50_seconds": percentile(latencies, 0.50),
+            "latency_p95_seconds": percentile(latencies, 0.95),
+            "latency_max_seconds": max(latencies) if latencies else None,
+        }
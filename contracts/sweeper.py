@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import logging
+import threading
+import time
+
+from batch import MAX_GROUP_SIZE, ConsentOperation, send_batch
+from deploy import MAX_BOX_REFERENCES, get_account_from_mnemonic, get_client, sweep_expired_txn
+from params_cache import get_suggested_params
+
+logger = logging.getLogger(__name__)
+
+class ExpirySweeper:
+    """Marks lapsed box consents expired in grouped sweep_expired calls as their deadlines pass.
+
+    Consents are kept in a heap ordered by expiry. Once an expiry is grace
+    seconds in the past, so the latest block timestamp has passed it too, every
+    due consent is swept: MAX_BOX_REFERENCES request IDs per call and up to
+    group_size calls per atomic group, all running on the group's pooled
+    opcode budget. The contract skips consents that are not granted or not yet
+    expired, so sweeping is safe to repeat. A failed sweep is retried after
+    retry_delay seconds.
+    """
+
+    def __init__(self, client, app_id, sender, private_key, grace=10, retry_delay=30,
+                 group_size=MAX_GROUP_SIZE, tracker=None, clock=time.time):
+        self.client = client
+        self.app_id = app_id
+        self.sender = sender
+        self.private_key = private_key
+        self.grace = grace
+        self.retry_delay = retry_delay
+        self.group_size = group_size
+        self.tracker = tracker
+        self.clock = clock
+        self._heap = []
+        # Latest expiry per request ID; heap entries that disagree are stale and skipped
+        self._scheduled = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self.swept = 0
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def schedule(self, request_id, expiry):
+        """Sweep request_id once expiry has passed, replacing any earlier schedule for it."""
+        with self._lock:
+            self._scheduled[request_id] = expiry
+            heapq.heappush(self._heap, (expiry, request_id))
+        self._wakeup.set()
+
+    def cancel(self, request_id):
+        with self._lock:
+            self._scheduled.pop(request_id, None)
+
+    def observe(self, event):
+        """Keep the queue in step with an events.ConsentEvent of this app."""
+        if event.app_id != self.app_id:
+            return
+        if event.operation == "grant_consent":
+            self.schedule(event.request_id, event.expiry)
+        elif event.operation in ("revoke_consent", "sweep_expired"):
+            self.cancel(event.request_id)
+
+    def load_materialized(self, db):
+        """Schedule every granted consent of this app in a materialize.py database."""
+        rows = db.execute(
+            "SELECT request_id, expiry FROM consents WHERE app_id = ? AND status = 'granted' AND expiry IS NOT NULL",
+            (self.app_id,),
+        ).fetchall()
+        for request_id, expiry in rows:
+            self.schedule(request_id, expiry)
+        return len(rows)
+
+    def next_deadline(self):
+        """Time at which the next sweep is due, or None when nothing is scheduled."""
+        with self._lock:
+            while self._heap and self._scheduled.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] + self.grace if self._heap else None
+
+    def due(self, now=None):
+        """Remove and return the request IDs whose deadline has passed, earliest first."""
+        now = self.clock() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] + self.grace <= now:
+                expiry, request_id = heapq.heappop(self._heap)
+                if self._scheduled.get(request_id) == expiry:
+                    del self._scheduled[request_id]
+                    due.append(request_id)
+        return due
+
+    def sweep_due(self, now=None):
+        """Sweep every due consent and return the send_batch results, one per sweep call."""
+        now = self.clock() if now is None else now
+        request_ids = self.due(now)
+        if not request_ids:
+            return []
+        params = get_suggested_params(self.client)
+        chunks = [request_ids[i:i + MAX_BOX_REFERENCES] for i in range(0, len(request_ids), MAX_BOX_REFERENCES)]
+        operations = [
+            ConsentOperation("sweep_expired", sweep_expired_txn(self.sender, params, self.app_id, chunk),
+                             self.private_key)
+            for chunk in chunks
+        ]
+        results = send_batch(self.client, operations, self.group_size, self.tracker)
+        for chunk, result in zip(chunks, results):
+            result["request_ids"] = chunk
+            if result["error"]:
+                for request_id in chunk:
+                    self.schedule(request_id, now - self.grace + self.retry_delay)
+            else:
+                self.swept += len(chunk)
+        logger.info(f"Swept {len(request_ids)} consents in {len(operations)} calls; {len(self)} still scheduled.")
+        return results
+
+    def run(self, poll_interval=60.0):
+        """Sweep as deadlines pass until stop() is called."""
+        while not self._stopped.is_set():
+            deadline = self.next_deadline()
+            timeout = poll_interval if deadline is None else min(max(deadline - self.clock(), 0), poll_interval)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.sweep_due()
+            except Exception as e:
+                logger.error(f"Sweep failed: {e}")
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+def main():
+    import os
+
+    import materialize
+
+    parser = argparse.ArgumentParser(description="Expire lapsed box-storage consents as their deadlines pass.")
+    parser.add_argument("app_id", type=int)
+    parser.add_argument("--db", default="consents.sqlite", help="materialize.py database to seed the queue from")
+    parser.add_argument("--grace", type=int, default=10, help="seconds past expiry before sweeping")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    client = get_client()
+    address, private_key = get_account_from_mnemonic(os.environ["CREATOR_MNEMONIC"])
+    sweeper = ExpirySweeper(client, args.app_id, address, private_key, grace=args.grace)
+    logger.info(f"Scheduled {sweeper.load_materialized(materialize.connect(args.db))} granted consents.")
+    sweeper.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+from algosdk import account
+from algosdk.error import AlgodHTTPError
+from algosdk.transaction import ApplicationCreateTxn, OnComplete, StateSchema
+
+from algod_pool import PooledAlgodClient
+from build_cache import build_program
+
+class ScriptedNode:
+    """An HTTP server answering with the scripted (status, headers) pairs in turn, then with default_status."""
+
+    def __init__(self, *script, default_status=200, delay=0.0, drop_idle=False):
+        self.script = list(script)
+        self.default_status = default_status
+        self.requests = 0
+        self.connections = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                node.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                node.requests += 1
+                status, headers = node.script.pop(0) if node.script else (node.default_status, {})
+                time.sleep(delay)
+                body = json.dumps({"last-round": node.requests} if status == 200 else {"message": "busy"}).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                # Hang up without Connection: close, as a node timing out an idle keep-alive connection does
+                self.close_connection = drop_idle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def node():
+    nodes = []
+
+    def start(*script, **kwargs):
+        nodes.append(ScriptedNode(*script, **kwargs))
+        return nodes[-1]
+
+    yield start
+    for scripted in nodes:
+        scripted.close()
+
+@pytest.fixture
+def pooled():
+    clients = []
+
+    def connect(*nodes, **kwargs):
+        clients.append(PooledAlgodClient([node.address for node in nodes], health_interval=0, backoff=0, **kwargs))
+        return clients[-1]
+
+    yield connect
+    for client in clients:
+        client.close()
+
+def test_failing_node_is_skipped_until_its_cooldown_passes(node, pooled):
+    failing, serving = node(default_status=503), node()
+    client = pooled(failing, serving, cooldown=60)
+    assert client.status() == {"last-round": 1}
+    assert client.status() == {"last-round": 2}
+    assert (failing.requests, serving.requests) == (1, 2)
+    assert not client.endpoints[0].healthy
+
+    client.endpoints[0].retry_at = time.monotonic()
+    client.endpoints[1].latency = 1.0
+    assert client.status() == {"last-round": 3}
+    assert failing.requests == 2
+
+def test_unreachable_node_fails_over(node, pooled):
+    down, serving = node(), node()
+    down.close()
+    client = pooled(down, serving)
+    assert client.status() == {"last-round": 1}
+    assert not client.endpoints[0].healthy
+    assert client.endpoints[1].healthy
+
+def test_retry_after_sets_the_cooldown(node, pooled):
+    limited, busy, serving = node((429, {"Retry-After": "120"})), node((503, {})), node()
+    client = pooled(limited, busy, serving, cooldown=5)
+    started = time.monotonic()
+    assert client.status() == {"last-round": 1}
+    assert 119 <= client.endpoints[0].retry_at - started <= 121
+    assert 4 <= client.endpoints[1].retry_at - started <= 6
+
+def test_requests_go_to_the_fastest_node(node, pooled):
+    slow, fast = node(delay=0.05), node()
+    client = pooled(slow, fast)
+    for _ in range(6):
+        client.status()
+    # Each node is measured once, then the faster one takes the rest
+    assert (slow.requests, fast.requests) == (1, 5)
+    assert client.endpoints[0].latency > client.endpoints[1].latency
+
+def test_closed_keep_alive_connection_is_reopened_on_the_same_node(node, pooled):
+    dropping = node(drop_idle=True)
+    client = pooled(dropping, retries=0)
+    assert client.status() == {"last-round": 1}
+    assert client.status() == {"last-round": 2}
+    assert dropping.connections == 2
+    assert client.endpoints[0].healthy
+
+def app_create(client, creator):
+    address, private_key = creator
+    approval = build_program("box_approval", client)["bytecode"]
+    clear = build_program("clear", client)["bytecode"]
+    return ApplicationCreateTxn(address, client.suggested_params(), OnComplete.NoOpOC, approval, clear,
+                                StateSchema(0, 1), StateSchema(0, 0)).sign(private_key)
+
+def test_submission_taken_before_a_timeout_is_not_reported_as_failed(client, creator, localnet, monkeypatch):
+    signed = app_create(client, creator)
+    send = client._send
+    lost = []
+
+    def lose_first_submission(endpoint, method, path, *args):
+        response = send(endpoint, method, path, *args)
+        if path.endswith("/transactions") and not lost:
+            lost.append(path)
+            raise TimeoutError("timed out")
+        return response
+
+    monkeypatch.setattr(client, "_send", lose_first_submission)
+    assert client.send_transaction(signed) == signed.get_txid()
+    assert lost
+    assert list(localnet.transactions) == [signed.get_txid()]
+
+    # Without an earlier failed attempt, a duplicate is still rejected
+    with pytest.raises(AlgodHTTPError, match="already in ledger"):
+        client.send_transaction(signed)
@@ -0,0 +1,40 @@
+import pytest
+from algosdk import account
+
+import deploy
+from batch import MAX_GROUP_SIZE, ConsentOperation, chunk_operations, send_batch
+
+@pytest.fixture
+def box_app(create_app, creator):
+    return create_app("box_approval", *creator)
+
+def request_operation(client, creator, app_id, request_id, requester):
+    address, private_key = creator
+    txn = deploy.request_consent_txn(address, client.suggested_params(), app_id, b"hash", b"Aadhaar Card",
+                                     request_id, requester)
+    return ConsentOperation("request_consent", txn, private_key)
+
+def test_chunk_operations_packs_groups_up_to_the_protocol_limit():
+    operations = list(range(40))
+    assert [len(chunk) for chunk in chunk_operations(operations)] == [16, 16, 8]
+    assert [len(chunk) for chunk in chunk_operations(operations, group_size=1)] == [1] * 40
+    for group_size in (0, MAX_GROUP_SIZE + 1):
+        with pytest.raises(ValueError):
+            chunk_operations(operations, group_size)
+
+def test_send_batch_fails_only_the_rejected_group(client, localnet, creator, box_app):
+    requester = account.generate_account()[1]
+    address, private_key = creator
+    operations = [request_operation(client, creator, box_app, f"request_{i}".encode(), requester) for i in range(3)]
+    # Revoking a consent that does not exist is rejected, and takes request_2 in its group down with it
+    operations.append(ConsentOperation("revoke_consent", deploy.revoke_consent_txn(
+        address, client.suggested_params(), box_app, b"missing"), private_key))
+    operations.append(request_operation(client, creator, box_app, b"request_4", requester))
+
+    results = send_batch(client, operations, group_size=2)
+    assert [result["operation"] for result in results] == [operation.name for operation in operations]
+    assert [result["error"] is None for result in results] == [True, True, False, False, True]
+    assert all(result["confirmed_round"] for result in results if result["error"] is None)
+    assert [len({result["group_id"] for result in results[i:i + 2]}) for i in (0, 2)] == [1, 1]
+    assert results[0]["group_id"] != results[2]["group_id"]
+    assert set(localnet.ledger.boxes(box_app)) == {b"request_0", b"request_1", b"request_4"}
@@ -0,0 +1,10 @@
+import asyncio
+
+import benchmark
+
+def test_benchmark_reports_lifecycles_against_localnet(client, creator):
+    report = asyncio.run(benchmark.run(client, creator, users=3, lifecycles=2))
+    assert (report["transactions_confirmed"], report["transactions_failed"], report["lifecycles_completed"]) == (24, 0, 6)
+    assert report["tps"] > 0
+    assert report["stage_seconds"]["confirm"]["count"] == 24
+    assert set(report["operations"]) == set(benchmark.LIFECYCLE)
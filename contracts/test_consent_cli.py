@@ -0,0 +1,77 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+import pytest
+from algosdk import account, mnemonic
+
+import consent_cli
+import deploy
+import registry
+
+CONTRACTS_DIR = pathlib.Path(__file__).parent
+
+def test_parsing_imports_nothing_heavy():
+    script = ("import sys, consent_cli; consent_cli.parser().parse_args(['status', '5', 'request_1']); "
+              "print(' '.join(sorted(name for name in ('algosdk', 'pyteal', 'deploy', 'state') "
+              "if name in sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", script], cwd=CONTRACTS_DIR, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.strip() == ""
+
+def test_lazy_import_times_each_module_once(monkeypatch):
+    monkeypatch.setattr(consent_cli, "timings", {})
+    monkeypatch.delitem(sys.modules, "document_hash", raising=False)
+    module = consent_cli.lazy_import("document_hash")
+    assert consent_cli.lazy_import("document_hash") is module
+    assert list(consent_cli.timings) == ["import document_hash"]
+
+@pytest.mark.parametrize("variant", list(registry.VARIANTS))
+def test_deploy_takes_every_registry_variant(variant):
+    assert consent_cli.parser().parse_args(["deploy", "--variant", variant]).variant == variant
+
+def test_consent_commands_parse_their_arguments():
+    parser = consent_cli.parser()
+    args = parser.parse_args(["grant", "5", "request_1", "--variant", "box", "--days", "7",
+                              "--permissions", "view,download"])
+    assert (args.run, args.app_id, args.request_id, args.variant, args.role, args.days, args.permissions) == (
+        consent_cli.grant, 5, "request_1", "box", "creator", 7, "view,download")
+    assert parser.parse_args(["revoke", "5", "request_1"]).role == "recipient"
+    assert parser.parse_args(["view", "5", "request_1", "--as", "creator"]).role == "creator"
+
+@pytest.mark.parametrize("argv", [
+    ["request", "5", "request_1", "--requester", "A", "--document-type", "Aadhaar Card"],
+    ["request", "5", "request_1", "--requester", "A", "--document-type", "Aadhaar Card",
+     "--document", "a.pdf", "--document-hash", "abc"],
+    ["grant", "5", "request_1", "--variant", "merkle"],
+    ["status", "not-an-app-id"],
+])
+def test_invalid_arguments_are_rejected(argv, capsys):
+    with pytest.raises(SystemExit):
+        consent_cli.parser().parse_args(argv)
+    assert "error:" in capsys.readouterr().err
+
+def test_build_reports_timings(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    consent_cli.main(["--timings", "build", "clear"])
+    assert (tmp_path / "consent_clear.teal").exists()
+    captured = capsys.readouterr()
+    assert captured.out == "consent_clear.teal: updated\n"
+    reported = [line.rsplit(None, 2)[0] for line in captured.err.splitlines()]
+    assert reported[0] == "cli import and parsing"
+    assert reported[-3:] == ["command", "total since cli import", "process_cpu"]
+
+def test_deploy_creates_the_default_variant_on_localnet(localnet, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ALGOD_ADDRESS", localnet.address)
+    monkeypatch.setenv("CREATOR_MNEMONIC", mnemonic.from_private_key(account.generate_account()[0]))
+    monkeypatch.setattr(deploy, "_client", None)
+    consent_cli.main(["build"])
+    capsys.readouterr()
+    try:
+        consent_cli.main(["deploy"])
+    finally:
+        deploy.get_client().close()
+    app_id = json.loads(capsys.readouterr().out)["app_id"]
+    assert app_id in localnet.ledger.apps
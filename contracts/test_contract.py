@@ -0,0 +1,173 @@
+import pytest
+from algosdk import encoding
+from algosdk.transaction import OnComplete, SuggestedParams
+
+from harness import ConsentHarness
+
+PROGRAMS = ["approval", "abi_approval", "box_approval"]
+
+DAY = 24 * 60 * 60
+
+def granted(harness, requester, request_id=b"request_1"):
+    assert harness.request(harness.creator, request_id, requester).approved
+    assert harness.grant(harness.creator, request_id, harness.ledger.timestamp + 30 * DAY).approved
+    return request_id
+
+def test_request_consent_records_pending_request(harness, requester):
+    result = harness.request(harness.creator, b"request_1", requester)
+    assert result.approved, result.error
+    assert harness.status(b"request_1") == "pending"
+
+@pytest.mark.parametrize("empty", ["document_hash", "document_type", "request_id"])
+def test_request_consent_rejects_empty_arguments(harness, requester, empty):
+    fields = {"document_hash": b"document_hash_123", "document_type": b"Aadhaar Card", "request_id": b"request_1"}
+    fields[empty] = b""
+    result = harness.call("request_consent", harness.creator, fields["request_id"] or b"request_1",
+                          fields["document_hash"], fields["document_type"], fields["request_id"],
+                          encoding.decode_address(requester))
+    assert not result.approved
+
+def test_grant_consent_by_owner(harness, requester):
+    request_id = granted(harness, requester)
+    assert harness.status(request_id) == "granted"
+
+def test_grant_consent_by_non_owner_is_rejected(harness, requester):
+    assert harness.request(harness.creator, b"request_1", requester).approved
+    result = harness.grant(requester, b"request_1", harness.ledger.timestamp + DAY)
+    assert not result.approved
+    assert harness.status(b"request_1") == "pending"
+
+def test_grant_consent_requires_pending_status(harness, requester):
+    request_id = granted(harness, requester)
+    assert not harness.grant(harness.creator, request_id, harness.ledger.timestamp + DAY).approved
+
+@pytest.mark.parametrize("viewer", ["owner", "requester"])
+def test_view_document_allowed_for_parties(harness, requester, viewer):
+    request_id = granted(harness, requester)
+    sender = harness.creator if viewer == "owner" else requester
+    result = harness.view(sender, request_id)
+    assert result.approved, result.error
+
+def test_view_document_rejected_for_stranger(harness, requester, stranger):
+    request_id = granted(harness, requester)
+    assert not harness.view(stranger, request_id).approved
+
+def test_view_document_rejected_after_expiry(harness, requester):
+    request_id = granted(harness, requester)
+    harness.advance(31 * DAY)
+    assert not harness.view(requester, request_id).approved
+
+def test_view_document_rejected_while_pending(harness, requester):
+    assert harness.request(harness.creator, b"request_1", requester).approved
+    assert not harness.view(requester, b"request_1").approved
+
+@pytest.mark.parametrize("revoker", ["owner", "requester"])
+def test_revoke_consent_by_parties(harness, requester, revoker):
+    request_id = granted(harness, requester)
+    sender = harness.creator if revoker == "owner" else requester
+    assert harness.revoke(sender, request_id).approved
+    assert harness.status(request_id) == "revoked"
+    assert not harness.view(requester, request_id).approved
+
+def test_revoke_consent_rejected_for_stranger(harness, requester, stranger):
+    request_id = granted(harness, requester)
+    assert not harness.revoke(stranger, request_id).approved
+    assert harness.status(request_id) == "granted"
+
+def test_revoke_consent_requires_granted_status(harness, requester):
+    assert harness.request(harness.creator, b"request_1", requester).approved
+    assert not harness.revoke(harness.creator, b"request_1").approved
+
+@pytest.mark.parametrize("on_completion", [OnComplete.DeleteApplicationOC, OnComplete.UpdateApplicationOC])
+def test_delete_and_update_are_owner_only(harness, stranger, on_completion):
+    assert harness.call_raw(harness.creator, [], on_completion=on_completion).approved
+    assert not harness.call_raw(stranger, [], on_completion=on_completion).approved
+
+@pytest.mark.parametrize("on_completion", [OnComplete.OptInOC, OnComplete.CloseOutOC])
+def test_opt_in_and_close_out_are_allowed(harness, stranger, on_completion):
+    assert harness.call_raw(stranger, [], on_completion=on_completion).approved
+
+def test_creation_is_approved(harness):
+    assert harness.create().approved
+
+def test_unknown_operation_is_rejected(harness):
+    assert not harness.call_raw(harness.creator, [b"unknown_operation"]).approved
+
+def test_box_storage_keeps_consents_apart(requester):
+    harness = ConsentHarness("box_approval")
+    first = granted(harness, requester, b"request_1")
+    assert harness.request(harness.creator, b"request_2", requester).approved
+    assert harness.status(first) == "granted"
+    assert harness.status(b"request_2") == "pending"
+    assert not harness.request(harness.creator, first, requester).approved
+
+def test_box_storage_requires_box_reference(requester):
+    harness = ConsentHarness("box_approval")
+    request_id = granted(harness, requester)
+    assert not harness.call_raw(requester, [b"view_document", request_id], boxes=[b"other"]).approved
+
+def test_deploy_builders_fill_box_references(requester):
+    import deploy
+
+    harness = ConsentHarness("box_approval")
+    params = SuggestedParams(1000, 1, 1000, "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=", flat_fee=True)
+    expiry = harness.ledger.timestamp + DAY
+    txns = [
+        deploy.request_consent_txn(harness.creator, params, harness.app_id, b"hash", b"Aadhaar Card",
+                                   b"request_1", requester),
+        deploy.grant_consent_txn(harness.creator, params, harness.app_id, b"request_1", expiry, {"view": True}),
+        deploy.view_document_txn(requester, params, harness.app_id, b"request_1"),
+        deploy.revoke_consent_txn(requester, params, harness.app_id, b"request_1"),
+    ]
+    for txn in txns:
+        result = harness.call_txn(txn)
+        assert result.approved, result.error
+    assert harness.status(b"request_1") == "revoked"
+
+@pytest.mark.parametrize("program", PROGRAMS)
+def test_costs_within_budget(program):
+    import profiler
+
+    report = profiler.profile(program)
+    assert profiler.check_budgets(report, profiler.load_budgets()) == []
+
+def test_consent_is_stored_in_compact_layout(harness, ledger_algod, requester):
+    import codec
+    from state import ConsentStateReader
+
+    expiry = harness.ledger.timestamp + DAY
+    assert harness.request(harness.creator, b"request_1", requester).approved
+    assert harness.grant(harness.creator, b"request_1", expiry, {"view": True, "download": True}).approved
+    record = ConsentStateReader(ledger_algod, harness.app_id,
+                                box_storage=harness.program == "box_approval").consent(b"request_1")
+    assert (record.requester, record.expiry, codec.decode_permissions(record.permissions)) == (
+        encoding.decode_address(requester), expiry,
+        {"view": True, "edit": False, "download": True, "screenshot": False},
+    )
+    if harness.program == "box_approval":
+        assert harness.boxes[b"request_1"] == codec.encode_box(
+            "granted", expiry, ["view", "download"], requester, b"document_hash_123", b"Aadhaar Card")
+
+def test_sweep_expired_marks_only_lapsed_grants(harness, requester, stranger):
+    request_id = granted(harness, requester)
+    assert harness.sweep(stranger, request_id).approved
+    assert harness.status(request_id) == "granted"
+    harness.advance(31 * DAY)
+    result = harness.sweep(stranger, request_id)
+    assert result.approved, result.error
+    assert harness.status(request_id) == "expired"
+    assert not harness.view(requester, request_id).approved
+    assert not harness.revoke(requester, request_id).approved
+
+def test_box_sweep_covers_many_consents_and_skips_the_rest(requester, stranger):
+    harness = ConsentHarness("box_approval")
+    lapsed = [granted(harness, requester, f"lapsed_{i}".encode()) for i in range(6)]
+    assert harness.request(harness.creator, b"pending", requester).approved
+    harness.advance(31 * DAY)
+    live = granted(harness, requester, b"live")
+    result = harness.sweep(stranger, *lapsed, b"pending", live, b"missing")
+    assert result.approved, result.error
+    assert [harness.status(request_id) for request_id in lapsed] == ["expired"] * len(lapsed)
+    assert harness.status(b"pending") == "pending"
+    assert harness.status(live) == "granted"
+    assert len(result.logs) == len(lapsed)
@@ -0,0 +1,40 @@
+import hashlib
+import os
+
+import document_hash
+
+def test_document_hashes_stream_in_chunks_and_cache_by_size_and_mtime(tmp_path, monkeypatch):
+    documents = tmp_path / "uploads"
+    (documents / "scans").mkdir(parents=True)
+    contents = {
+        "empty.pdf": b"",
+        "small.pdf": b"%PDF-1.7 small",
+        os.path.join("scans", "large.pdf"): os.urandom(10_000) * 7,
+    }
+    for name, data in contents.items():
+        (documents / name).write_bytes(data)
+    expected = {str(documents / name): hashlib.sha256(data).digest() for name, data in contents.items()}
+
+    hashed = []
+    hash_file = document_hash.hash_file
+
+    def counting_hash_file(path, chunk_size):
+        hashed.append(path)
+        return hash_file(path, chunk_size)
+
+    monkeypatch.setattr(document_hash, "hash_file", counting_hash_file)
+
+    with document_hash.DigestCache(tmp_path / "digests.sqlite") as cache:
+        # 4 KiB chunks split the large scan over many updates
+        assert document_hash.hash_directory(documents, workers=2, cache=cache, chunk_size=4096) == expected
+        assert sorted(hashed) == sorted(expected)
+
+        # Only a file whose size or mtime changed is read again
+        hashed.clear()
+        small = str(documents / "small.pdf")
+        with open(small, "wb") as f:
+            f.write(b"%PDF-1.7 rescanned")
+        os.utime(small, ns=(1, 1))
+        expected[small] = hashlib.sha256(b"%PDF-1.7 rescanned").digest()
+        assert document_hash.hash_directory(documents, cache=cache) == expected
+        assert hashed == [small]
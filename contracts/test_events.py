@@ -0,0 +1,35 @@
+import base64
+
+import events
+
+DAY = 24 * 60 * 60
+
+def test_operations_log_consent_events(harness, requester):
+    expiry = harness.ledger.timestamp + DAY
+    results = [
+        harness.request(harness.creator, b"request_1", requester),
+        harness.grant(harness.creator, b"request_1", expiry),
+        harness.view(requester, b"request_1"),
+        harness.revoke(requester, b"request_1"),
+    ]
+    decoded = [events.decode_log(log) for result in results for log in result.logs]
+    assert decoded == [
+        ("request_consent", b"request_1", harness.creator, "pending", 0),
+        ("grant_consent", b"request_1", harness.creator, "granted", expiry),
+        ("view_document", b"request_1", requester, "granted", expiry),
+        ("revoke_consent", b"request_1", requester, "revoked", expiry),
+    ]
+
+def test_block_events_include_inner_calls(harness, requester):
+    result = harness.request(harness.creator, b"request_1", requester)
+    logs = [base64.b64encode(log).decode() for log in result.logs]
+    caller = harness.app_id + 1
+    block = {"block": {"rnd": 12, "txns": [
+        {"txn": {"apid": harness.app_id}, "dt": {"lg": logs}},
+        {"txn": {"apid": caller}, "dt": {"lg": logs, "itx": [{"txn": {"apid": harness.app_id}, "dt": {"lg": logs}}]}},
+    ]}}
+    found = list(events.events_from_block(block, {harness.app_id}))
+    assert [(event.name, event.app_id, event.round, event.request_id) for event in found] == [
+        ("ConsentRequested", harness.app_id, 12, b"request_1"),
+    ] * 2
+    assert [event.app_id for event in events.events_from_block(block)] == [harness.app_id, caller, harness.app_id]
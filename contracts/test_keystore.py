@@ -0,0 +1,45 @@
+import json
+
+import pytest
+from algosdk import account
+from nacl import pwhash
+
+from keystore import KeystoreError, generate_keystore, read_keystore
+
+# The cheapest argon2id settings, so each test derives its key in milliseconds
+FAST_KDF = {"opslimit": pwhash.argon2id.OPSLIMIT_MIN, "memlimit": pwhash.argon2id.MEMLIMIT_MIN}
+
+def test_keystore_accounts_decrypt_to_their_addresses(tmp_path):
+    path = tmp_path / "accounts.keystore.jsonl"
+    stats = generate_keystore(path, 7, "secret", workers=2, chunk_size=3, **FAST_KDF)
+    assert (stats["existing"], stats["generated"], stats["total"]) == (0, 7, 7)
+    accounts = list(read_keystore(path, "secret"))
+    assert len({address for address, _ in accounts}) == 7
+    assert all(account.address_from_private_key(private_key) == address for address, private_key in accounts)
+    # Addresses are listed in the clear, in index order
+    records = [json.loads(line) for line in path.read_text().splitlines()[1:]]
+    assert [record["index"] for record in records] == list(range(7))
+    assert [record["address"] for record in records] == [address for address, _ in accounts]
+
+def test_keystore_resumes_after_a_torn_record(tmp_path):
+    path = tmp_path / "accounts.keystore.jsonl"
+    generate_keystore(path, 4, "secret", workers=1, chunk_size=2, **FAST_KDF)
+    before = list(read_keystore(path, "secret"))
+    with open(path, "a") as f:
+        f.write('{"index": 4, "address": "TORN')
+
+    stats = generate_keystore(path, 6, "secret", workers=1, chunk_size=2, **FAST_KDF)
+    assert (stats["existing"], stats["generated"], stats["total"]) == (4, 2, 6)
+    after = list(read_keystore(path, "secret"))
+    assert after[:4] == before and len(after) == 6
+    assert generate_keystore(path, 6, "secret", **FAST_KDF)["generated"] == 0
+
+def test_keystore_rejects_a_wrong_password_before_writing(tmp_path):
+    path = tmp_path / "accounts.keystore.jsonl"
+    generate_keystore(path, 2, "secret", workers=1, **FAST_KDF)
+    contents = path.read_text()
+    with pytest.raises(KeystoreError, match="wrong keystore password"):
+        generate_keystore(path, 4, "guess", workers=1, **FAST_KDF)
+    with pytest.raises(KeystoreError, match="wrong keystore password"):
+        list(read_keystore(path, "guess"))
+    assert path.read_text() == contents
@@ -0,0 +1,66 @@
+import base64
+
+import pytest
+from algosdk import account
+from algosdk.error import AlgodHTTPError
+from algosdk.transaction import ApplicationCreateTxn, OnComplete, StateSchema, assign_group_id
+
+import deploy
+from algod_pool import PooledAlgodClient
+from build_cache import build_program, cached_programs, compile_teal_cached
+from events import events_from_transaction
+from localnet import Localnet
+from state import ConsentStateReader
+
+DAY = 24 * 60 * 60
+
+@pytest.mark.parametrize("localnet", [{"failure_rate": 0.2, "seed": 7}], indirect=True)
+def test_localnet_runs_box_lifecycle_through_injected_failures(localnet):
+    creator_key, creator = account.generate_account()
+    requester_key, requester = account.generate_account()
+    client = PooledAlgodClient(localnet.address, retries=8, backoff=0.001, health_interval=0)
+    approval, clear = (base64.b64decode(client.compile(compile_teal_cached(name))["result"])
+                       for name in ("box_approval", "clear"))
+    params = client.suggested_params()
+    create = ApplicationCreateTxn(creator, params, OnComplete.NoOpOC, approval, clear,
+                                  StateSchema(0, 1), StateSchema(0, 0))
+    app_id = client.pending_transaction_info(client.send_transaction(create.sign(creator_key)))["application-index"]
+
+    expiry = localnet.ledger.timestamp + DAY
+    group = assign_group_id([
+        deploy.request_consent_txn(creator, params, app_id, b"hash", b"Aadhaar Card", b"request_1", requester),
+        deploy.grant_consent_txn(creator, params, app_id, b"request_1", expiry, ["view"]),
+    ])
+    client.send_transactions([txn.sign(creator_key) for txn in group])
+    tx_id = client.send_transaction(deploy.view_document_txn(requester, params, app_id, b"request_1")
+                                    .sign(requester_key))
+    events = list(events_from_transaction(client.pending_transaction_info(tx_id), tx_id))
+    assert [(event.name, event.actor) for event in events] == [("DocumentViewed", requester)]
+
+    with pytest.raises(AlgodHTTPError, match="rejected by logic"):
+        client.send_transaction(deploy.revoke_consent_txn(creator, params, app_id, b"missing").sign(creator_key))
+    record = ConsentStateReader(client, app_id, box_storage=True).consent(b"request_1")
+    assert (record.status, record.expiry) == ("granted", expiry)
+    assert localnet.failures > 0
+    client.close()
+
+def test_programs_assembled_elsewhere_are_found_in_the_build_cache(client, creator, tmp_path):
+    address, private_key = creator
+    clear = build_program("clear", client, cache_dir=tmp_path)
+    assert cached_programs(tmp_path) == {clear["bytecode"]: clear["teal"]}
+
+    # A node that never compiled the program maps its bytecode back to TEAL through the cache
+    with Localnet(cache_dir=tmp_path) as other:
+        other_client = PooledAlgodClient(other.address, health_interval=0)
+        create = ApplicationCreateTxn(address, other_client.suggested_params(), OnComplete.NoOpOC,
+                                      clear["bytecode"], clear["bytecode"], StateSchema(0, 0), StateSchema(0, 0))
+        info = other_client.pending_transaction_info(other_client.send_transaction(create.sign(private_key)))
+        other_client.close()
+    assert info["application-index"] > 0
+
+def test_deploy_script_checks_pass_on_localnet(client, creator, create_app, monkeypatch):
+    address, private_key = creator
+    recipient_key, recipient = account.generate_account()
+    monkeypatch.setattr(deploy, "_client", client)
+    deploy.test_contract(create_app("approval", address, private_key), address, private_key, recipient,
+                         recipient_key)
@@ -0,0 +1,39 @@
+import pathlib
+import subprocess
+import sys
+
+from algosdk import encoding
+
+import codec
+import materialize
+
+DAY = 24 * 60 * 60
+
+CONTRACTS_DIR = pathlib.Path(__file__).parent
+
+def test_materialized_view_resumes_from_checkpoint(harness, indexer, requester, tmp_path):
+    db = materialize.connect(tmp_path / "consents.sqlite")
+    indexer.call("request_consent", harness.creator, b"request_1",
+                 b"document_hash_123", b"Aadhaar Card", b"request_1", encoding.decode_address(requester))
+    assert materialize.sync_app(indexer, db, harness.app_id, page_size=1) == 1
+    assert [row["status"] for row in materialize.pending_requests(db)] == ["pending"]
+
+    expiry = harness.ledger.timestamp + DAY
+    if harness.program == "abi_approval":
+        grant = [expiry, codec.PERMISSION_BITS["view"]]
+    else:
+        grant = codec.grant_args(expiry, ["view"])
+    indexer.call("grant_consent", harness.creator, b"request_1", *grant)
+    assert materialize.sync_app(indexer, db, harness.app_id, page_size=1) == 1
+    assert materialize.sync_app(indexer, db, harness.app_id) == 0
+    assert materialize.pending_requests(db) == []
+    expiring = materialize.expiring_soon(db, within=2 * DAY, now=harness.ledger.timestamp)
+    assert [(row["request_id"], row["requester"], row["expiry"], row["permissions"]) for row in expiring] == [
+        (b"request_1", requester, expiry, codec.PERMISSION_BITS["view"])
+    ]
+
+def test_indexer_sync_does_not_load_pyteal():
+    script = "import sys, materialize, sweeper; print('pyteal' in sys.modules, 'ConsentContract' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", script], cwd=CONTRACTS_DIR, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.split() == ["False", "False"]
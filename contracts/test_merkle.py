@@ -0,0 +1,95 @@
+import pytest
+from algosdk import account
+from algosdk.transaction import SuggestedParams
+
+import codec
+import deploy
+from batch import ConsentOperation, sign_group
+from harness import ConsentHarness, new_address
+from merkle import ConsentBatch, MerkleProof, leaf_hash, verify
+
+DAY = 24 * 60 * 60
+
+@pytest.mark.parametrize("size", [1, 2, 5, 64, 1000])
+def test_merkle_proofs_verify_for_every_leaf(size):
+    batch = ConsentBatch()
+    for i in range(size):
+        batch.add(f"request_{i}".encode(), new_address(), 1_800_000_000 + i, ("view",), b"document_%d" % i)
+    for i in range(size):
+        request_id = f"request_{i}".encode()
+        proof = batch.proof(request_id)
+        assert verify(leaf_hash(batch.consent(request_id)), proof, batch.root)
+        if proof.siblings:
+            forged = MerkleProof(proof.index, proof.path ^ 1, proof.siblings)
+            assert not verify(leaf_hash(batch.consent(request_id)), forged, batch.root)
+    assert max(len(batch.proof(f"request_{i}".encode()).siblings) for i in range(size)) == (size - 1).bit_length()
+
+def test_merkle_view_document_checks_proof_expiry_and_revocation(tmp_path):
+    harness = ConsentHarness("merkle_approval")
+    requester, stranger = new_address(), new_address()
+    batch = ConsentBatch()
+    for i in range(300):
+        batch.add(f"request_{i}".encode(), requester, harness.ledger.timestamp + DAY, ("view",), b"hash_%d" % i)
+    params = SuggestedParams(fee=1000, first=1, last=1000, gh="", flat_fee=True)
+
+    def view(sender, request_id, consents=batch):
+        txns = deploy.merkle_view_document_txns(sender, params, harness.app_id, consents, request_id)
+        return harness.call_txn(txns[0], budget=700 * len(txns))
+
+    assert not view(requester, b"request_7").approved  # not anchored yet
+    assert not harness.call_txn(deploy.anchor_root_txn(stranger, params, harness.app_id, batch.root)).approved
+    assert harness.call_txn(deploy.anchor_root_txn(harness.creator, params, harness.app_id, batch.root)).approved
+    result = view(requester, b"request_7")
+    assert result.approved and len(deploy.merkle_view_document_txns(
+        requester, params, harness.app_id, batch, b"request_7")) == 2
+    assert not view(stranger, b"request_7").approved
+
+    # Claiming a later expiry than the anchored one breaks the proof
+    consent, proof = batch.consent(b"request_7"), batch.proof(b"request_7")
+    forged = harness.call_raw(requester, [
+        b"view_document", b"request_7", codec.encode_uint64(consent.expiry + DAY),
+        codec.encode_uint64(consent.permissions), consent.document_hash, codec.encode_uint64(proof.path),
+        b"".join(proof.siblings),
+    ], boxes=[b"r" + batch.root, b"xrequest_7"], budget=1400)
+    assert not forged.approved
+
+    assert harness.call_txn(deploy.merkle_revoke_consent_txn(harness.creator, params, harness.app_id,
+                                                             b"request_7")).approved
+    assert not view(requester, b"request_7").approved
+    assert view(requester, b"request_8").approved
+    harness.advance(DAY)
+    assert not view(requester, b"request_8").approved
+
+    batch.save(tmp_path / "batch.json")
+    assert ConsentBatch.load(tmp_path / "batch.json").proof(b"request_9") == batch.proof(b"request_9")
+
+def test_localnet_anchors_ten_thousand_consents_in_one_call(client, creator, create_app, localnet):
+    address, private_key = creator
+    requester_key, requester = account.generate_account()
+    app_id = create_app("merkle_approval", address, private_key)
+    params = client.suggested_params()
+
+    batch = ConsentBatch()
+    for i in range(10_000):
+        batch.add(f"request_{i}".encode(), requester, localnet.ledger.timestamp + DAY, ("view",), b"hash_%d" % i)
+    client.send_transaction(deploy.anchor_root_txn(address, params, app_id, batch.root).sign(private_key))
+
+    txns = deploy.merkle_view_document_txns(requester, params, app_id, batch, b"request_4321")
+    assert len(batch.proof(b"request_4321").siblings) == 14 and len(txns) == 2
+    client.send_transactions(sign_group([ConsentOperation("view_document", txn, requester_key) for txn in txns]))
+    assert client.pending_transaction_info(txns[0].get_txid())["confirmed-round"]
+
+def test_text_request_ids_are_utf8_encoded(tmp_path):
+    requester = new_address()
+    batch = ConsentBatch()
+    batch.add("request_1", requester, 1_800_000_000, ("view",), "hash_1")
+    assert batch.consent(b"request_1") == batch.consent("request_1")
+    assert batch.consent("request_1").document_hash == b"hash_1"
+    assert "request_1" in batch and b"request_1" in batch
+    with pytest.raises(ValueError, match="already in this batch"):
+        batch.add(b"request_1", requester, 1_800_000_000)
+    with pytest.raises(TypeError, match="request_id must be bytes or str"):
+        batch.add(1, requester, 1_800_000_000)
+
+    batch.save(tmp_path / "batch.json")
+    assert ConsentBatch.load(tmp_path / "batch.json").proof("request_1") == batch.proof(b"request_1")
@@ -0,0 +1,118 @@
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+from algosdk import account
+from algosdk.transaction import SuggestedParams
+
+import deploy
+import params_cache
+from params_cache import SuggestedParamsCache, params_cache_for, unique_note
+
+class ParamsAlgod:
+    """Serves suggested params for a 1000-round window starting at `first`, optionally failing.
+
+    Answers wait while `released` is clear, to hold a background refresh in flight.
+    """
+
+    def __init__(self, first=1000):
+        self.first = first
+        self.error = None
+        self.calls = 0
+        self.released = threading.Event()
+        self.released.set()
+
+    def suggested_params(self):
+        self.released.wait(timeout=5)
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return SuggestedParams(1000, self.first, self.first + 1000, "", flat_fee=True)
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(params_cache.time, "monotonic", lambda: now[0])
+    return now
+
+def eventually(condition, timeout=5.0):
+    # Background refreshes run on their own thread; the test clock is patched, so wait in real time
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "condition not met in time"
+        time.sleep(0.001)
+
+def test_cached_params_are_shared_until_the_window_runs_low(clock):
+    algod = ParamsAlgod()
+    cache = SuggestedParamsCache(algod, block_time=1.0, refresh_margin=200, min_remaining=20)
+    first = cache.get()
+    clock[0] = 500.0
+    second = cache.get()
+    assert (first.first, second.first, algod.calls) == (1000, 1000, 1)
+    # Callers get copies, so one builder's changes do not leak into another's params
+    second.fee = 5000
+    assert cache.get().fee == 1000
+    assert cache.current_round() == 1500
+
+def test_params_refresh_in_the_background_before_last_valid(clock):
+    algod = ParamsAlgod()
+    cache = SuggestedParamsCache(algod, block_time=1.0, refresh_margin=200, min_remaining=20)
+    cache.get()
+    algod.first = 1850
+    clock[0] = 850.0
+    # Within refresh_margin of last valid: the old params are still served while new ones are fetched
+    algod.released.clear()
+    assert cache.get().first == 1000
+    assert cache.get().first == 1000
+    algod.released.set()
+    eventually(lambda: cache.fetches == 2)
+    assert cache.get().first == 1850
+    assert algod.calls == 2
+
+def test_params_about_to_expire_are_refetched_before_use(clock):
+    algod = ParamsAlgod()
+    cache = SuggestedParamsCache(algod, block_time=1.0, refresh_margin=200, min_remaining=20)
+    cache.get()
+    algod.first = 1990
+    clock[0] = 990.0
+    assert cache.get().first == 1990
+    assert algod.calls == 2
+
+def test_failed_background_refresh_is_retried(clock):
+    algod = ParamsAlgod()
+    cache = SuggestedParamsCache(algod, block_time=1.0, refresh_margin=200, min_remaining=20)
+    cache.get()
+    algod.error = ConnectionError("algod unavailable")
+    clock[0] = 850.0
+    assert cache.get().first == 1000
+    eventually(lambda: algod.calls == 2 and cache._refreshing is None)
+    # The failed refresh is forgotten, so the next get() starts another one
+    algod.error = None
+    algod.first = 1850
+    algod.released.clear()
+    assert cache.get().first == 1000
+    algod.released.set()
+    eventually(lambda: cache.fetches == 2)
+    assert cache.get().first == 1850
+
+def test_params_cache_is_shared_per_client_and_notes_are_unique():
+    algod = ParamsAlgod()
+    assert params_cache_for(algod) is params_cache_for(algod)
+    assert params_cache_for(algod) is not params_cache_for(ParamsAlgod())
+    assert len({unique_note() for _ in range(100)}) == 100
+
+def test_params_cache_goes_away_with_its_client():
+    algod = ParamsAlgod()
+    cache = weakref.ref(params_cache_for(algod))
+    del algod
+    gc.collect()
+    assert cache() is None
+
+def test_repeated_views_from_shared_params_are_distinct_transactions():
+    sender = account.generate_account()[1]
+    params = ParamsAlgod().suggested_params()
+    views = [deploy.view_document_txn(sender, params, 1234, b"request_1") for _ in range(2)]
+    views += [deploy.abi_call_txn(sender, params, 1234, "view_document") for _ in range(2)]
+    assert len({txn.get_txid() for txn in views}) == 4
@@ -0,0 +1,27 @@
+import pytest
+from algosdk.transaction import ApplicationUpdateTxn
+
+import registry
+from build_cache import build_program
+
+def test_registry_deploy_only_touches_changed_apps(client, creator, localnet, tmp_path):
+    address, private_key = creator
+    apps = registry.AppRegistry(tmp_path / "apps.json")
+    created = registry.deploy(client, apps, ["a", "b"], address, private_key)
+    assert [(result["action"], result["error"]) for result in created] == [("create", None)] * 2
+
+    # Someone rolls tenant a back to another program; a rerun only updates that app
+    other = build_program("abi_approval", client)["bytecode"]
+    clear = build_program("clear", client)["bytecode"]
+    client.send_transaction(ApplicationUpdateTxn(address, client.suggested_params(), created[0]["app_id"],
+                                                 other, clear).sign(private_key))
+    submitted = len(localnet.transactions)
+    rerun = registry.deploy(client, registry.AppRegistry(tmp_path / "apps.json"), ["a", "b"], address, private_key)
+    assert [result["action"] for result in rerun] == ["update", "noop"]
+    assert [result["app_id"] for result in rerun] == [result["app_id"] for result in created]
+    assert len(localnet.transactions) == submitted + 1
+
+    assert [result["action"] for result in registry.deploy(
+        client, registry.AppRegistry(tmp_path / "apps.json"), ["a", "b"], address, private_key)] == ["noop"] * 2
+    with pytest.raises(ValueError, match="global variant"):
+        registry.deploy(client, apps, ["a"], address, private_key, variant="box")
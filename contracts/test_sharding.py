@@ -0,0 +1,42 @@
+from algosdk import account
+
+import deploy
+import registry
+from sharding import HashRing, ShardedConsents, ShardedOperation, deploy_pool, load_pool
+
+def test_hash_ring_moves_only_keys_for_the_new_shard():
+    ring = HashRing([101, 102, 103, 104])
+    request_ids = [f"request_{i}".encode() for i in range(4000)]
+    before = {request_id: ring.app_for(request_id) for request_id in request_ids}
+    assert all(600 < count < 1400 for count in map(len, ring.partition(request_ids).values()))
+
+    ring.add(105)
+    moved = [request_id for request_id in request_ids if ring.app_for(request_id) != before[request_id]]
+    assert {ring.app_for(request_id) for request_id in moved} == {105}
+    assert 400 < len(moved) < 1200
+
+def test_sharded_consents_route_writes_and_reads_by_request_id(client, creator, localnet, tmp_path):
+    address, private_key = creator
+    requester = account.generate_account()[1]
+    apps = registry.AppRegistry(tmp_path / "apps.json")
+    app_ids = deploy_pool(client, apps, "consents", 3, address, private_key)
+    assert load_pool(apps, registry.network_id(client), "consents") == app_ids
+    pool = ShardedConsents(client, app_ids)
+
+    params = client.suggested_params()
+    request_ids = [f"request_{i}".encode() for i in range(24)]
+    operations = [
+        ShardedOperation("request_consent", request_id, lambda app_id, request_id=request_id: (
+            deploy.request_consent_txn(address, params, app_id, b"hash", b"Aadhaar Card", request_id, requester)
+        ), private_key)
+        for request_id in request_ids
+    ]
+    results = pool.send(operations, group_size=4)
+    assert [result["error"] for result in results] == [None] * len(request_ids)
+    assert [result["app_id"] for result in results] == [pool.app_for(request_id) for request_id in request_ids]
+    assert len({result["app_id"] for result in results}) == 3
+
+    records = pool.consents(request_ids)
+    assert {record.status for record in records.values()} == {"pending"}
+    for request_id in request_ids:
+        assert set(localnet.ledger.boxes(pool.app_for(request_id))) >= {request_id}
@@ -0,0 +1,61 @@
+import base64
+
+import msgpack
+import pytest
+from algosdk import account, encoding, mnemonic
+from algosdk.transaction import PaymentTxn, SuggestedParams
+from nacl.signing import VerifyKey
+
+from signer import Keystore, SigningPool
+
+PARAMS = SuggestedParams(1000, 1, 1000, base64.b64encode(bytes(32)).decode(), flat_fee=True)
+
+@pytest.fixture(scope="module")
+def keystore():
+    return Keystore(account.generate_account()[0] for _ in range(3))
+
+def payments(keystore, count):
+    receiver = account.generate_account()[1]
+    senders = keystore.addresses
+    return [PaymentTxn(senders[i % len(senders)], PARAMS, receiver, i + 1) for i in range(count)]
+
+def check_signed(blob, txn):
+    signed = msgpack.unpackb(blob, raw=False)
+    assert encoding.encode_address(signed["txn"]["snd"]) == txn.sender
+    to_sign = b"TX" + base64.b64decode(encoding.msgpack_encode(txn))
+    VerifyKey(signed["txn"]["snd"]).verify(to_sign, signed["sig"])
+
+def test_keystore_holds_keys_by_address(keystore):
+    words = mnemonic.from_private_key(account.generate_account()[0])
+    loaded = Keystore.from_mnemonics([words])
+    (address,) = loaded.addresses
+    assert address in loaded and len(loaded) == 1
+    assert loaded.private_key(address) == mnemonic.to_private_key(words)
+    with pytest.raises(KeyError, match="no key in the keystore"):
+        keystore.private_key(address)
+    assert loaded.private_keys() == [mnemonic.to_private_key(words)]
+    assert [account.address_from_private_key(key) for key in keystore.private_keys()] == keystore.addresses
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_signing_pool_returns_blobs_in_input_order(keystore, processes):
+    txns = payments(keystore, 25)
+    with SigningPool(keystore, workers=2, processes=processes, chunk_size=4) as pool:
+        blobs = pool.sign(txns)
+    assert len(blobs) == len(txns)
+    for blob, txn in zip(blobs, txns):
+        check_signed(blob, txn)
+        assert msgpack.unpackb(blob, raw=False)["txn"]["amt"] == txn.amt
+
+def test_signing_pool_signs_groups_with_their_own_group_ids(keystore):
+    groups = [payments(keystore, size) for size in (3, 1, 5)]
+    with SigningPool(keystore, processes=False, chunk_size=2) as pool:
+        signed_groups = pool.sign_groups(groups)
+    assert [len(blobs) for blobs in signed_groups] == [3, 1, 5]
+    group_ids = []
+    for blobs, group in zip(signed_groups, groups):
+        ids = {msgpack.unpackb(blob, raw=False)["txn"]["grp"] for blob in blobs}
+        assert len(ids) == 1
+        group_ids.append(ids.pop())
+        for blob, txn in zip(blobs, group):
+            check_signed(blob, txn)
+    assert len(set(group_ids)) == 3
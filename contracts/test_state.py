@@ -0,0 +1,63 @@
+import pytest
+from algosdk import account, encoding
+
+from state import ConsentRecord, ConsentStateReader, is_allowed
+
+DAY = 24 * 60 * 60
+
+@pytest.fixture
+def reader(harness, ledger_algod):
+    return ConsentStateReader(ledger_algod, harness.app_id, box_storage=harness.program == "box_approval")
+
+def test_state_reader_mirrors_view_document(harness, reader, requester, stranger):
+    checks = [(sender, b"request_1") for sender in (harness.creator, requester, stranger)]
+
+    def agrees():
+        return all(reader.is_allowed(sender, request_id, now=harness.ledger.timestamp)
+                   == harness.view(sender, request_id).approved for sender, request_id in checks)
+
+    assert agrees()
+    assert harness.request(harness.creator, b"request_1", requester).approved
+    harness.advance(0)
+    assert agrees()
+    assert harness.grant(harness.creator, b"request_1", harness.ledger.timestamp + DAY).approved
+    harness.advance(0)
+    assert agrees()
+    harness.advance(2 * DAY)
+    assert agrees()
+
+def test_state_reader_caches_until_the_ledger_round_moves(harness, reader, requester):
+    assert harness.request(harness.creator, b"request_1", requester).approved
+    harness.advance(0)
+    assert reader.consent(b"request_1").status == "pending"
+    fetches = reader.fetches
+    assert reader.consent(b"request_1").status == "pending"
+    assert reader.fetches == fetches
+
+    # A block that changes the consent is seen on the next read, with no invalidate()
+    assert harness.grant(harness.creator, b"request_1", harness.ledger.timestamp + DAY).approved
+    harness.advance(0)
+    assert reader.consent(b"request_1").status == "granted"
+    assert reader.fetches > fetches
+
+def test_state_reader_takes_the_round_from_a_block_follower(harness, ledger_algod, requester):
+    followed = [harness.ledger.round]
+    reader = ConsentStateReader(ledger_algod, harness.app_id, box_storage=harness.program == "box_approval",
+                                last_round=lambda: followed[0])
+    assert reader.consent(b"request_1") is None
+    assert harness.request(harness.creator, b"request_1", requester).approved
+    harness.advance(0)
+    # Until the follower reports the new round, the read of the old one still stands
+    assert reader.consent(b"request_1") is None
+    followed[0] = harness.ledger.round
+    assert reader.consent(b"request_1").requester == encoding.decode_address(requester)
+
+def test_is_allowed_needs_a_live_grant_to_a_party(requester, stranger):
+    owner = account.generate_account()[1]
+    record = ConsentRecord(b"request_1", "granted", encoding.decode_address(owner),
+                           encoding.decode_address(requester), b"hash", b"Aadhaar Card", 2_000, 1)
+    assert is_allowed(record, requester, now=1_000) and is_allowed(record, owner, now=1_000)
+    assert not is_allowed(record, stranger, now=1_000)
+    assert not is_allowed(record, requester, now=2_000)
+    assert not is_allowed(record._replace(status="revoked"), requester, now=1_000)
+    assert not is_allowed(None, requester)
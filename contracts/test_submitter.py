@@ -0,0 +1,65 @@
+import asyncio
+import base64
+
+import pytest
+from algosdk import account, encoding
+
+import deploy
+from submitter import PipelinedSubmitter, percentile
+
+@pytest.fixture
+def box_app(create_app, creator):
+    return create_app("box_approval", *creator)
+
+def signed_requests(client, creator, app_id, count):
+    address, private_key = creator
+    requester = account.generate_account()[1]
+    params = client.suggested_params()
+    return [deploy.request_consent_txn(address, params, app_id, b"hash", b"Aadhaar Card", f"request_{i}".encode(),
+                                       requester).sign(private_key) for i in range(count)]
+
+def test_percentile_uses_the_nearest_rank():
+    assert percentile([], 0.5) is None
+    assert percentile([5, 1, 4, 2, 3], 0.5) == 3
+    assert percentile(range(100), 0.95) == 95
+
+@pytest.mark.parametrize("localnet", [{"block_time": 0.2}], indirect=True)
+def test_submitter_blocks_producers_while_the_window_is_full(client, creator, box_app):
+    first, second, third = signed_requests(client, creator, box_app, 3)
+
+    async def run():
+        async with PipelinedSubmitter(client, window=2) as submitter:
+            confirmations = [await submitter.submit(first), await submitter.submit(second)]
+            assert submitter.in_flight == 2
+            waiting = asyncio.ensure_future(submitter.submit(third))
+            await asyncio.sleep(0.05)
+            assert not waiting.done()
+            # A confirmation frees a slot for the waiting producer
+            await confirmations[0]
+            confirmations.append(await asyncio.wait_for(waiting, timeout=5))
+            infos = await asyncio.gather(*confirmations)
+            return infos, submitter.stats()
+
+    infos, stats = asyncio.run(run())
+    assert all(info["confirmed-round"] for info in infos)
+    assert (stats["submitted"], stats["confirmed"], stats["failed"], stats["in_flight"]) == (3, 3, 0, 0)
+    assert stats["latency_p50_seconds"] > 0 and stats["confirmed_per_second"] > 0
+
+def test_submitter_counts_rejections_and_accepts_raw_transactions(client, creator, box_app):
+    address, private_key = creator
+    signed = signed_requests(client, creator, box_app, 4)
+    raw = [base64.b64decode(encoding.msgpack_encode(stxn)) for stxn in signed[2:]]
+    rejected = deploy.revoke_consent_txn(address, client.suggested_params(), box_app, b"missing").sign(private_key)
+
+    async def run():
+        async with PipelinedSubmitter(client, window=1) as submitter:
+            with pytest.raises(Exception, match="rejected by logic"):
+                await submitter.submit(rejected)
+            # The rejected submission gave its slot back, or this would wait forever
+            results = await asyncio.wait_for(submitter.submit_many(signed[:2] + raw), timeout=10)
+            return results, submitter.stats()
+
+    results, stats = asyncio.run(run())
+    assert [result["txn"]["txn"]["apaa"][0] for result in results] == [
+        base64.b64encode(b"request_consent").decode()] * 4
+    assert (stats["submitted"], stats["rejected"], stats["confirmed"]) == (4, 1, 4)
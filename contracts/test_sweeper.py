@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+from algosdk import account
+from algosdk.transaction import PaymentTxn
+
+import deploy
+from batch import ConsentOperation, send_batch
+from events import ConsentEvent
+from state import ConsentStateReader
+from sweeper import ExpirySweeper
+
+DAY = 24 * 60 * 60
+
+def event(operation, request_id, expiry=0, app_id=1):
+    return ConsentEvent(operation, operation, request_id, None, None, expiry, app_id, 1, None, 0)
+
+def test_queue_keeps_the_latest_schedule_per_consent():
+    sweeper = ExpirySweeper(None, 1, None, None, grace=10)
+    sweeper.schedule(b"a", 100)
+    sweeper.schedule(b"b", 50)
+    sweeper.schedule(b"c", 70)
+    sweeper.schedule(b"a", 200)
+    assert len(sweeper) == 3
+    assert sweeper.next_deadline() == 60
+
+    sweeper.cancel(b"b")
+    assert sweeper.next_deadline() == 80
+    assert sweeper.due(now=209) == [b"c"]
+    assert sweeper.due(now=210) == [b"a"]
+    assert len(sweeper) == 0
+    assert sweeper.next_deadline() is None
+
+def test_events_schedule_and_cancel_sweeps():
+    sweeper = ExpirySweeper(None, 1, None, None, grace=0)
+    sweeper.observe(event("grant_consent", b"a", expiry=100))
+    sweeper.observe(event("grant_consent", b"b", expiry=100))
+    sweeper.observe(event("grant_consent", b"c", expiry=100, app_id=2))
+    sweeper.observe(event("revoke_consent", b"b"))
+    assert sweeper.due(now=100) == [b"a"]
+
+@pytest.fixture
+def granted(client, creator, create_app):
+    """Create a box app and grant a consent until expiry for each of request_ids; returns the app ID."""
+    address, private_key = creator
+    app_id = create_app("box_approval", address, private_key)
+    requester = account.generate_account()[1]
+
+    def grant(request_ids, expiry):
+        params = client.suggested_params()
+        operations = [ConsentOperation("request", deploy.request_consent_txn(
+            address, params, app_id, b"hash", b"Aadhaar Card", request_id, requester), private_key)
+            for request_id in request_ids]
+        operations += [ConsentOperation("grant", deploy.grant_consent_txn(
+            address, params, app_id, request_id, expiry, ["view"]), private_key) for request_id in request_ids]
+        assert not [result["error"] for result in send_batch(client, operations) if result["error"]]
+        return app_id
+
+    return grant
+
+def pass_time(client, creator, localnet, seconds):
+    """Move the chain clock forward; a block is sealed so the next call sees its timestamp."""
+    address, private_key = creator
+    localnet.advance(seconds)
+    client.send_transaction(PaymentTxn(address, client.suggested_params(), address, 0).sign(private_key))
+
+def statuses(client, app_id, request_ids):
+    reader = ConsentStateReader(client, app_id, box_storage=True)
+    return [reader.consent(request_id).status for request_id in request_ids]
+
+def test_due_consents_are_swept_in_grouped_calls(client, creator, localnet, granted):
+    request_ids = [f"request_{i}".encode() for i in range(deploy.MAX_BOX_REFERENCES + 3)]
+    expiry = localnet.ledger.timestamp + DAY
+    app_id = granted(request_ids, expiry)
+    sweeper = ExpirySweeper(client, app_id, *creator, grace=10)
+    for request_id in request_ids:
+        sweeper.schedule(request_id, expiry)
+
+    assert sweeper.sweep_due(now=expiry) == []
+    pass_time(client, creator, localnet, 2 * DAY)
+    results = sweeper.sweep_due(now=expiry + 10)
+    assert [len(result["request_ids"]) for result in results] == [deploy.MAX_BOX_REFERENCES, 3]
+    assert [result["error"] for result in results] == [None, None]
+    assert len({result["group_id"] for result in results}) == 1
+    assert sweeper.swept == len(request_ids)
+    assert statuses(client, app_id, request_ids) == ["expired"] * len(request_ids)
+
+def test_failed_sweep_is_retried_after_the_delay(client, creator, localnet, granted, monkeypatch):
+    expiry = localnet.ledger.timestamp + DAY
+    app_id = granted([b"request_1"], expiry)
+    pass_time(client, creator, localnet, 2 * DAY)
+    sweeper = ExpirySweeper(client, app_id, *creator, grace=10, retry_delay=30)
+    sweeper.schedule(b"request_1", expiry)
+
+    def unreachable(signed_txns, **kwargs):
+        raise ConnectionError("algod unreachable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(client, "send_transactions", unreachable)
+        [result] = sweeper.sweep_due(now=expiry + 10)
+    assert "unreachable" in result["error"]
+    assert sweeper.swept == 0
+    assert sweeper.next_deadline() == expiry + 10 + 30
+    assert sweeper.sweep_due(now=expiry + 39) == []
+
+    [result] = sweeper.sweep_due(now=expiry + 40)
+    assert result["error"] is None
+    assert statuses(client, app_id, [b"request_1"]) == ["expired"]
+
+def test_run_sweeps_as_deadlines_pass(client, creator, localnet, granted):
+    expiry = localnet.ledger.timestamp + DAY
+    app_id = granted([b"request_1"], expiry)
+    pass_time(client, creator, localnet, 2 * DAY)
+    sweeper = ExpirySweeper(client, app_id, *creator, grace=10, clock=lambda: expiry + 2 * DAY)
+    runner = threading.Thread(target=sweeper.run, kwargs={"poll_interval": 0.05})
+    runner.start()
+    try:
+        sweeper.schedule(b"request_1", expiry)
+        for _ in range(100):
+            if sweeper.swept:
+                break
+            time.sleep(0.05)
+    finally:
+        sweeper.stop()
+        runner.join(timeout=5)
+    assert sweeper.swept == 1
+    assert not runner.is_alive()
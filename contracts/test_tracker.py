@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from algosdk import account
+
+import deploy
+from tracker import ConfirmationTracker, TransactionExpiredError
+
+class GatedInfoClient:
+    """Passes every call to client, except that pending_transaction_info waits until released."""
+
+    def __init__(self, client):
+        self.client = client
+        self.released = threading.Event()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def pending_transaction_info(self, tx_id):
+        self.released.wait(timeout=10)
+        return self.client.pending_transaction_info(tx_id)
+
+@pytest.fixture
+def box_app(create_app, creator):
+    return create_app("box_approval", *creator)
+
+@pytest.fixture
+def send_request(client, creator, box_app):
+    """Send a request_consent call and return (tx_id, last valid round)."""
+    address, private_key = creator
+    requester = account.generate_account()[1]
+    sent = []
+
+    def send():
+        txn = deploy.request_consent_txn(address, client.suggested_params(), box_app, b"hash", b"Aadhaar Card",
+                                         f"request_{len(sent)}".encode(), requester)
+        sent.append(client.send_transaction(txn.sign(private_key)))
+        return sent[-1], txn.last_valid_round
+
+    return send
+
+def test_tracker_finds_transactions_confirmed_before_it_started(client, send_request):
+    # Dev mode confirms each submission in its own round, all before the tracker exists
+    sent = [send_request() for _ in range(3)]
+    with ConfirmationTracker(client, fetch_info=False) as tracker:
+        results = [tracker.watch(tx_id, last_valid).result(timeout=10) for tx_id, last_valid in sent]
+    assert [result["txid"] for result in results] == [tx_id for tx_id, _ in sent]
+    assert all(result["confirmed-round"] for result in results)
+
+def test_tracker_fails_transactions_past_their_last_valid_round(client, send_request):
+    tx_id, last_valid = send_request()
+    with ConfirmationTracker(client, fetch_info=False) as tracker:
+        assert tracker.watch(tx_id, last_valid).result(timeout=10)["txid"] == tx_id
+        # Never sent, and its last valid round is behind the chain already
+        send_request()
+        with pytest.raises(TransactionExpiredError):
+            tracker.watch("NEVERSENT", client.status()["last-round"]).result(timeout=10)
+
+def test_watch_resolves_a_recent_confirmation_without_holding_the_lock(client, send_request):
+    seen, seen_last_valid = send_request()
+    watched, watched_last_valid = send_request()
+    gated = GatedInfoClient(client)
+    tracker = ConfirmationTracker(gated)
+    try:
+        # Following for `watched` reads the rounds just before it too, so `seen` is kept in recent
+        gated.released.set()
+        tracker.watch(watched, watched_last_valid).result(timeout=10)
+        gated.released.clear()
+        later, later_last_valid = send_request()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            blocked = pool.submit(tracker.watch, seen, seen_last_valid)
+            # The first watch is stuck fetching its transaction info; another watch must not wait for it
+            future = pool.submit(tracker.watch, later, later_last_valid).result(timeout=2)
+            assert not blocked.done()
+            gated.released.set()
+            assert blocked.result(timeout=10).result(timeout=10)["confirmed-round"]
+        assert future.result(timeout=10)["confirmed-round"]
+    finally:
+        gated.released.set()
+        tracker.stop()
@@ -0,0 +1,61 @@
+import base64
+import os
+
+import pytest
+from algosdk import account, encoding
+from algosdk.transaction import ApplicationCallTxn, OnComplete, SuggestedParams, assign_group_id
+
+import deploy
+import txn_template
+from harness import new_address
+
+@pytest.mark.parametrize("shape", ["view", "request", "sweep", "leased_group", "note_and_accounts", "large_rounds"])
+def test_app_call_template_encodes_the_same_bytes_as_algosdk(shape):
+    private_key, sender = account.generate_account()
+    params = SuggestedParams(fee=0, first=1000, last=2000, gh=base64.b64encode(bytes(range(32))).decode(),
+                             gen="testnet-v1.0")
+    app_id = 1234
+    request_id = b"request_1"
+    fixed = {}
+    call = {"app_args": [b"view_document", request_id], "boxes": [request_id]}
+    if shape == "request":
+        call = {"app_args": [b"request_consent", b"\x00" * 32, b"Aadhaar Card", request_id, new_address()],
+                "boxes": [request_id]}
+    elif shape == "sweep":
+        request_ids = [f"request_{index}".encode() for index in range(deploy.MAX_BOX_REFERENCES)]
+        call = {"app_args": [b"sweep_expired", *request_ids], "boxes": request_ids}
+    elif shape == "leased_group":
+        call["lease"] = os.urandom(32)
+    elif shape == "note_and_accounts":
+        fixed = {"note": b"tenant:default", "accounts": [new_address()], "foreign_apps": [99]}
+        call["app_args"].append(1_700_000_000)
+    elif shape == "large_rounds":
+        call.update(first_valid=2**33, last_valid=2**33 + 1000)
+
+    template = txn_template.AppCallTemplate(params, app_id, **fixed)
+    sdk_params = SuggestedParams(params.fee, call.get("first_valid", params.first), call.get("last_valid", params.last),
+                                 params.gh, params.gen)
+    txn = ApplicationCallTxn(sender, sdk_params, app_id, OnComplete.NoOpOC, app_args=call["app_args"],
+                             boxes=[(app_id, name) for name in call["boxes"]], lease=call.get("lease"), **fixed)
+    encoded = template.encode(sender, **call)
+    if shape == "leased_group":
+        assign_group_id([txn, ApplicationCallTxn(sender, params, app_id, OnComplete.NoOpOC, app_args=[b"budget"])])
+        budget = template.encode(sender, [b"budget"])
+        encoded = template.encode(sender, group=txn_template.group_id([encoded, budget]), **call)
+
+    assert encoded == base64.b64decode(encoding.msgpack_encode(txn))
+    assert txn_template.tx_id(encoded) == txn.get_txid()
+    assert template.sign(encoded, private_key) == base64.b64decode(encoding.msgpack_encode(txn.sign(private_key)))
+
+    # A rekeyed sender signs with another account's key, which the signed transaction records
+    rekeyed_key, _ = account.generate_account()
+    assert (template.sign(encoded, rekeyed_key, sender)
+            == base64.b64decode(encoding.msgpack_encode(txn.sign(rekeyed_key))))
+
+def test_app_call_template_rejects_per_byte_fees():
+    params = SuggestedParams(fee=10, first=1000, last=2000, gh=base64.b64encode(bytes(32)).decode())
+    with pytest.raises(ValueError):
+        txn_template.AppCallTemplate(params, 1234)
+    with pytest.raises(TypeError):
+        txn_template.AppCallTemplate(SuggestedParams(1000, 1000, 2000, params.gh, flat_fee=True), 1234,
+                                     app_args=[b"view_document"])
@@ -0,0 +1,173 @@
+from collections import deque
+from concurrent.futures import Future
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Rounds after watch() at which a transaction not yet seen is looked up once, in case its round was never read
+LOOKUP_AFTER_ROUNDS = 2
+
+class TransactionExpiredError(Exception):
+    """A watched transaction was not confirmed by its last valid round."""
+
+    def __init__(self, tx_id, last_valid):
+        super().__init__(f"Transaction {tx_id} was not confirmed by its last valid round {last_valid}")
+        self.tx_id = tx_id
+        self.last_valid = last_valid
+
+class ConfirmationTracker:
+    """Follows blocks once on a background thread and resolves every watched transaction.
+
+    Each round costs one status_after_block and one block txids call however
+    many transactions are pending, instead of a polling loop per transaction.
+    A transaction not seen LOOKUP_AFTER_ROUNDS rounds after it was watched is
+    looked up once, since it may have confirmed in a round the tracker skipped.
+    A transaction still unseen after its last valid round fails with
+    TransactionExpiredError. watch() returns a concurrent.futures.Future for
+    threads, wait() awaits the same future from asyncio.
+    """
+
+    def __init__(self, client, fetch_info=True, recent_rounds=4):
+        self.client = client
+        # Resolve with pending_transaction_info (as wait_for_confirmation does) or a bare summary
+        self.fetch_info = fetch_info
+        self._watched = {}
+        self._recent = deque(maxlen=recent_rounds)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.last_round = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        if self._thread is None:
+            # Re-read the rounds kept in recent, so a transaction sent just before start() is found
+            self.last_round = max(self.client.status()["last-round"] - self._recent.maxlen, 0)
+            self._thread = threading.Thread(target=self._follow, name="confirmation-tracker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            # A status_after_block call may still be waiting; the daemon thread exits after it
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def watch(self, tx_id, last_valid):
+        """Future resolving when tx_id is confirmed, or failing once last_valid has passed."""
+        self.start()
+        with self._lock:
+            entry = self._watched.get(tx_id)
+            if entry is not None:
+                return entry[0]
+            future = Future()
+            # It may already have confirmed in a round processed before it was watched
+            confirmed_round = next((round_number for round_number, tx_ids in self._recent if tx_id in tx_ids), None)
+            if confirmed_round is None:
+                self._watched[tx_id] = (future, last_valid, self.last_round + LOOKUP_AFTER_ROUNDS)
+        if confirmed_round is not None:
+            # Resolved outside the lock, as in _process_round, since it may call algod
+            self._resolve(tx_id, future, confirmed_round)
+            return future
+        self._wakeup.set()
+        return future
+
+    async def wait(self, tx_id, last_valid):
+        """Await the confirmation of tx_id from asyncio code."""
+        return await asyncio.wrap_future(self.watch(tx_id, last_valid))
+
+    @property
+    def pending(self):
+        return len(self._watched)
+
+    def _resolve(self, tx_id, future, confirmed_round):
+        try:
+            if self.fetch_info:
+                future.set_result(self.client.pending_transaction_info(tx_id))
+            else:
+                future.set_result({"txid": tx_id, "confirmed-round": confirmed_round})
+        except Exception as e:
+            future.set_exception(e)
+
+    def _follow(self):
+        idle = False
+        while not self._stopped.is_set():
+            if not self._watched:
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                idle = True
+                continue
+            try:
+                if idle:
+                    # Skip the rounds nobody was waiting on, but catch up on as many as are kept
+                    # in recent, so a transaction sent while idle and watched late is still found
+                    latest = self.client.status()["last-round"]
+                    self.last_round = max(self.last_round, latest - self._recent.maxlen)
+                    idle = False
+                latest = self.client.status_after_block(self.last_round)["last-round"]
+                quiet = latest <= self.last_round
+                for round_number in range(self.last_round + 1, latest + 1):
+                    self._process_round(round_number)
+                    self.last_round = round_number
+                self._look_up_overdue(self.last_round, quiet)
+            except Exception as e:
+                logger.warning(f"Block following failed after round {self.last_round}: {e}")
+                self._stopped.wait(timeout=1.0)
+
+    def _lookup(self, tx_id):
+        try:
+            return self.client.pending_transaction_info(tx_id)
+        except Exception:
+            return {}
+
+    def _settle(self, tx_id, future, txinfo):
+        future.set_result(txinfo if self.fetch_info else {"txid": tx_id, "confirmed-round": txinfo["confirmed-round"]})
+
+    def _look_up_overdue(self, round_number, quiet):
+        # A transaction still unseen a few rounds after it was watched, or when no new block came at
+        # all, may have confirmed in a round skipped while idle or before start(); one lookup finds it
+        with self._lock:
+            overdue = [tx_id for tx_id, (_, _, lookup_round) in self._watched.items()
+                       if lookup_round is not None and (quiet or lookup_round <= round_number)]
+        for tx_id in overdue:
+            txinfo = self._lookup(tx_id)
+            with self._lock:
+                entry = self._watched.pop(tx_id, None)
+                if entry is not None and not txinfo.get("confirmed-round"):
+                    # Still in the pool; it will show up in a later block or expire
+                    self._watched[tx_id] = (entry[0], entry[1], None)
+                    entry = None
+            if entry is not None:
+                self._settle(tx_id, entry[0], txinfo)
+
+    def _process_round(self, round_number):
+        tx_ids = set(self.client.get_block_txids(round_number).get("blockTxids") or [])
+        with self._lock:
+            self._recent.append((round_number, tx_ids))
+            confirmed = [tx_id for tx_id in self._watched if tx_id in tx_ids]
+            expired = [tx_id for tx_id, (_, last_valid, _) in self._watched.items()
+                       if tx_id not in tx_ids and last_valid <= round_number]
+            watched = {tx_id: self._watched.pop(tx_id) for tx_id in confirmed + expired}
+        for tx_id in confirmed:
+            self._resolve(tx_id, watched[tx_id][0], round_number)
+        for tx_id in expired:
+            future, last_valid, _ = watched[tx_id]
+            # It may have confirmed in a round skipped while idle; one lookup settles it
+            txinfo = self._lookup(tx_id)
+            if txinfo.get("confirmed-round"):
+                self._settle(tx_id, future, txinfo)
+            else:
+                future.set_exception(TransactionExpiredError(tx_id, last_valid))
+        if confirmed or expired:
+            logger.info(f"Round {round_number}: {len(confirmed)} confirmed, {len(expired)} expired, "
+                        f"{len(self._watched)} still pending.")
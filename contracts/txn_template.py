@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import argparse
+import base64
+import functools
+import hashlib
+import json
+import time
+
+import msgpack
+from algosdk import constants, encoding
+from algosdk.transaction import ApplicationCallTxn, OnComplete
+from nacl.signing import SigningKey
+
+# Fields that change from call to call, in canonical (sorted) key order: app args, box references,
+# first valid, group, last valid, lease and sender
+VARYING = ("apaa", "apbx", "fv", "grp", "lv", "lx", "snd")
+
+# Sender of the prototype transaction; its field is replaced on every call
+PLACEHOLDER_SENDER = encoding.encode_address(bytes(32))
+
+def _packb(value):
+    return msgpack.packb(value, use_bin_type=True)
+
+def _map_header(count):
+    return bytes([0x80 | count]) if count < 16 else b"\xde" + count.to_bytes(2, "big")
+
+_KEYS = {key: _packb(key) for key in VARYING + ("sgnr", "sig", "txn")}
+
+@functools.lru_cache(maxsize=4096)
+def _public_key(address):
+    return encoding.decode_address(address)
+
+@functools.lru_cache(maxsize=4096)
+def _signing_key(private_key):
+    return SigningKey(base64.b64decode(private_key)[:constants.key_len_bytes])
+
+def _checksum(data):
+    return hashlib.new("sha512_256", data).digest()
+
+def tx_id(txn_bytes):
+    """Transaction ID of an encoded transaction, as algosdk's get_txid returns it."""
+    return base64.b32encode(_checksum(constants.txid_prefix + txn_bytes)).decode().strip("=")
+
+def group_id(encoded_txns):
+    """Group ID of encoded transactions, as algosdk's calculate_group_id returns it for the same transactions."""
+    if len(encoded_txns) > constants.tx_group_limit:
+        raise ValueError(f"a group holds at most {constants.tx_group_limit} transactions, got {len(encoded_txns)}")
+    txids = [_checksum(constants.txid_prefix + txn_bytes) for txn_bytes in encoded_txns]
+    return _checksum(constants.tgid_prefix + _packb({"txlist": txids}))
+
+class AppCallTemplate:
+    """Canonical msgpack of same-shaped application calls, encoding only the fields that vary.
+
+    The fields every call shares (app ID, on-completion, fee, genesis, note,
+    foreign references and so on) are encoded once from a prototype
+    ApplicationCallTxn, as the runs of canonical key-value pairs that fall
+    between the varying keys. encode() then only packs the sender, app args,
+    box references, first and last valid round, lease and group, and joins
+    them with the prebuilt runs, so the result is byte for byte what
+    algosdk's msgpack_encode gives for the same ApplicationCallTxn.
+
+    The fee is fixed when the template is made: it is the flat fee of params,
+    or the minimum fee when params carry no per-byte fee. Per-byte fees
+    depend on each call's size, so params with one are rejected. Box
+    references are names of boxes of the template's own app.
+    """
+
+    def __init__(self, params, app_id, on_complete=OnComplete.NoOpOC, **fields):
+        if not params.flat_fee and params.fee:
+            raise ValueError("per-byte fees depend on each call's size; build the template from flat-fee params")
+        varying = set(fields) & {"sender", "app_args", "boxes", "lease"}
+        if varying:
+            raise TypeError(f"{', '.join(sorted(varying))} vary per call; pass them to encode()")
+        prototype = ApplicationCallTxn(PLACEHOLDER_SENDER, params, app_id, on_complete, **fields)
+        self.app_id = app_id
+        self.fee = prototype.fee
+        self.first_valid = params.first
+        self.last_valid = params.last
+
+        # Every shared key-value pair, grouped by the varying key it comes before
+        constant = {key: value for key, value in encoding._sort_dict(prototype.dictify()).items()
+                    if key not in VARYING}
+        runs = [[] for _ in range(len(VARYING) + 1)]
+        for key, value in constant.items():
+            runs[sum(key > varying_key for varying_key in VARYING)].append(_packb(key) + _packb(value))
+        self._runs = [b"".join(run) for run in runs]
+        self._constant_count = len(constant)
+
+    def encode(self, sender, app_args=(), boxes=(), first_valid=None, last_valid=None, lease=None, group=None):
+        """Canonical msgpack of the call from sender, unsigned; rounds default to those of the template's params."""
+        first_valid = self.first_valid if first_valid is None else first_valid
+        last_valid = self.last_valid if last_valid is None else last_valid
+        fields = (
+            _KEYS["apaa"] + _packb([arg if type(arg) is bytes else encoding.encode_as_bytes(arg)
+                                    for arg in app_args]) if app_args else b"",
+            _KEYS["apbx"] + _packb([{"n": name} if name else {} for name in boxes]) if boxes else b"",
+            _KEYS["fv"] + _packb(first_valid) if first_valid else b"",
+            _KEYS["grp"] + _packb(group) if group else b"",
+            _KEYS["lv"] + _packb(last_valid) if last_valid else b"",
+            _KEYS["lx"] + _packb(lease) if lease else b"",
+            _KEYS["snd"] + _packb(_public_key(sender)),
+        )
+        runs = self._runs
+        return b"".join((
+            _map_header(self._constant_count + sum(1 for field in fields if field)),
+            runs[0], fields[0], runs[1], fields[1], runs[2], fields[2], runs[3], fields[3],
+            runs[4], fields[4], runs[5], fields[5], runs[6], fields[6], runs[7],
+        ))
+
+    def sign(self, txn_bytes, private_key, sender=None):
+        """The msgpack signed transaction for encoded txn_bytes, as algosdk's sign() and msgpack_encode give it.
+
+        Pass the sender encoded into txn_bytes when private_key may belong to
+        another account (a rekeyed sender), so the signer is recorded.
+        """
+        signing_key = _signing_key(private_key)
+        signature = signing_key.sign(constants.txid_prefix + txn_bytes).signature
+        signer = bytes(signing_key.verify_key)
+        if sender is None or _public_key(sender) == signer:
+            return b"\x82" + _KEYS["sig"] + _packb(signature) + _KEYS["txn"] + txn_bytes
+        return b"\x83" + _KEYS["sgnr"] + _packb(signer) + _KEYS["sig"] + _packb(signature) + _KEYS["txn"] + txn_bytes
+
+def _sdk_calls(params, app_id, calls, private_key):
+    for sender, app_args, boxes in calls:
+        txn = ApplicationCallTxn(sender, params, app_id, OnComplete.NoOpOC, app_args=app_args,
+                                 boxes=[(app_id, name) for name in boxes])
+        yield base64.b64decode(encoding.msgpack_encode(txn.sign(private_key)))
+
+def _template_calls(params, app_id, calls, private_key):
+    template = AppCallTemplate(params, app_id)
+    for sender, app_args, boxes in calls:
+        yield template.sign(template.encode(sender, app_args, boxes), private_key)
+
+def benchmark(count=100_000, rounds=3):
+    """Seconds per call to build, sign and encode count view_document box calls, with algosdk and with a template.
+
+    Signing is ed25519 either way, so the gap between the two is the
+    construction and encoding overhead the template removes.
+    """
+    from algosdk import account
+    from algosdk.transaction import SuggestedParams
+
+    private_key, sender = account.generate_account()
+    params = SuggestedParams(fee=1000, first=1000, last=2000, gh=base64.b64encode(bytes(32)).decode(),
+                             gen="localnet-v1", flat_fee=True)
+    app_id = 1234
+    calls = [(sender, [b"view_document", f"request-{index}".encode()], [f"request-{index}".encode()])
+             for index in range(count)]
+
+    report = {"calls": count}
+    for name, build in (("algosdk", _sdk_calls), ("template", _template_calls)):
+        best = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in build(params, app_id, calls, private_key):
+                pass
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        report[name] = {"seconds": best, "calls_per_second": count / best}
+    report["speedup"] = report["algosdk"]["seconds"] / report["template"]["seconds"]
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare algosdk and template construction of signed app calls.")
+    parser.add_argument("--count", type=int, default=100_000, help="calls per run")
+    parser.add_argument("--rounds", type=int, default=3, help="runs per encoder; the fastest is reported")
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.count, args.rounds), indent=2))
+
+if __name__ == "__main__":
+    main()
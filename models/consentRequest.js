@@ -24,7 +24,7 @@ const consentRequestSchema = new mongoose.Schema({
   },
   status: {
     type: String,
-    enum: ['pending', 'granted', 'revoked'],
+    enum: ['pending', 'granted', 'revoked', 'expired'],
     default: 'pending'
   },
   permissions: {
@@ -1,14 +1,17 @@
 from algosdk import account, mnemonic
-from algosdk.v2client import algod
 from algosdk.transaction import ApplicationCreateTxn, ApplicationCallTxn, OnComplete, StateSchema
 import base64
 import json
+import os
+import sys
 import time
 
-# Connect to Algorand testnet
-algod_address = "https://testnet-api.algonode.cloud"
-algod_token = ""  # No token needed for public testnet
-client = algod.AlgodClient(algod_token, algod_address)
+# The pooled client lives with the Python contracts at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "contracts"))
+from algod_pool import PooledAlgodClient
+
+# Connect to Algorand testnet, or the comma-separated nodes in ALGOD_ADDRESS
+client = PooledAlgodClient.from_env()
 
 # Load the compiled TEAL program
 def load_teal(filename):
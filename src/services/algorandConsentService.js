@@ -9,6 +9,65 @@ const algodClient = new algosdk.Algodv2(algodToken, algodServer, algodPort);
 // Replace with your deployed app ID
 const APP_ID = 740703196;
 
+// Suggested params stay valid for about 1000 rounds, so every builder shares one
+// fetched copy and refreshes it in the background instead of fetching per call.
+const PARAMS_REFRESH_MS = 60 * 1000;
+const PARAMS_MAX_AGE_MS = 10 * 60 * 1000;
+let cachedParams = null;
+let cachedParamsAt = 0;
+let paramsRefresh = null;
+
+function refreshSuggestedParams() {
+  if (!paramsRefresh) {
+    paramsRefresh = algodClient.getTransactionParams().do()
+      .then((params) => {
+        cachedParams = params;
+        cachedParamsAt = Date.now();
+        return params;
+      })
+      .finally(() => {
+        paramsRefresh = null;
+      });
+  }
+  return paramsRefresh;
+}
+
+async function getSuggestedParams() {
+  const age = Date.now() - cachedParamsAt;
+  if (!cachedParams || age >= PARAMS_MAX_AGE_MS) {
+    return refreshSuggestedParams();
+  }
+  if (age >= PARAMS_REFRESH_MS) {
+    refreshSuggestedParams().catch((error) => console.error('Error refreshing suggested params:', error));
+  }
+  return cachedParams;
+}
+
+// Calls built from the same cached params with the same args would encode to the same
+// transaction, and algod rejects a repeat as already in the ledger; a random note keeps
+// every call distinct (contracts/params_cache.py unique_note does the same)
+const UNIQUE_NOTE_SIZE = 8;
+
+function uniqueNote() {
+  return crypto.getRandomValues(new Uint8Array(UNIQUE_NOTE_SIZE));
+}
+
+// Permission flags packed into the uint64 bitmask the contract stores (contracts/codec.py)
+const PERMISSION_BITS = { view: 1, edit: 2, download: 4, screenshot: 8 };
+
+function encodePermissions(permissions) {
+  let mask = 0;
+  for (const [name, allowed] of Object.entries(permissions || {})) {
+    if (!(name in PERMISSION_BITS)) {
+      throw new Error(`Unknown permission: ${name}`);
+    }
+    if (allowed) {
+      mask |= PERMISSION_BITS[name];
+    }
+  }
+  return algosdk.encodeUint64(mask);
+}
+
 // Helper function to convert string to Uint8Array
 function stringToUint8Array(str) {
   return new Uint8Array(Array.from(str).map(c => c.charCodeAt(0)));
@@ -16,7 +75,7 @@ function stringToUint8Array(str) {
 
 export async function requestConsent({ sender, senderSK, documentHash, documentType, requestId, recipient }) {
   try {
-    const params = await algodClient.getTransactionParams().do();
+    const params = await getSuggestedParams();
     const appArgs = [
       stringToUint8Array('request_consent'),
       stringToUint8Array(documentHash),
@@ -24,7 +83,9 @@ export async function requestConsent({ sender, senderSK, documentHash, documentT
       stringToUint8Array(requestId),
       algosdk.decodeAddress(recipient).publicKey
     ];
-    const txn = algosdk.makeApplicationNoOpTxn(sender, params, algodClient.appIndex || 740703196, appArgs);
+    const txn = algosdk.makeApplicationNoOpTxn(
+      sender, params, algodClient.appIndex || 740703196, appArgs, undefined, undefined, undefined, uniqueNote()
+    );
     const signedTxn = txn.signTxn(senderSK);
     const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
     await waitForConfirmation(txId);
@@ -37,13 +98,15 @@ export async function requestConsent({ sender, senderSK, documentHash, documentT
 
 export async function grantConsent({ sender, senderSK, expiry, permissions }) {
   try {
-    const params = await algodClient.getTransactionParams().do();
+    const params = await getSuggestedParams();
     const appArgs = [
       stringToUint8Array('grant_consent'),
       algosdk.encodeUint64(expiry),
-      stringToUint8Array(JSON.stringify(permissions))
+      encodePermissions(permissions)
     ];
-    const txn = algosdk.makeApplicationNoOpTxn(sender, params, algodClient.appIndex || 740703196, appArgs);
+    const txn = algosdk.makeApplicationNoOpTxn(
+      sender, params, algodClient.appIndex || 740703196, appArgs, undefined, undefined, undefined, uniqueNote()
+    );
     const signedTxn = txn.signTxn(senderSK);
     const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
     await waitForConfirmation(txId);
@@ -56,9 +119,11 @@ export async function grantConsent({ sender, senderSK, expiry, permissions }) {
 
 export async function viewDocument({ sender, senderSK }) {
   try {
-    const params = await algodClient.getTransactionParams().do();
+    const params = await getSuggestedParams();
     const appArgs = [stringToUint8Array('view_document')];
-    const txn = algosdk.makeApplicationNoOpTxn(sender, params, algodClient.appIndex || 740703196, appArgs);
+    const txn = algosdk.makeApplicationNoOpTxn(
+      sender, params, algodClient.appIndex || 740703196, appArgs, undefined, undefined, undefined, uniqueNote()
+    );
     const signedTxn = txn.signTxn(senderSK);
     const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
     await waitForConfirmation(txId);
@@ -71,9 +136,11 @@ export async function viewDocument({ sender, senderSK }) {
 
 export async function revokeConsent({ sender, senderSK }) {
   try {
-    const params = await algodClient.getTransactionParams().do();
+    const params = await getSuggestedParams();
     const appArgs = [stringToUint8Array('revoke_consent')];
-    const txn = algosdk.makeApplicationNoOpTxn(sender, params, algodClient.appIndex || 740703196, appArgs);
+    const txn = algosdk.makeApplicationNoOpTxn(
+      sender, params, algodClient.appIndex || 740703196, appArgs, undefined, undefined, undefined, uniqueNote()
+    );
     const signedTxn = txn.signTxn(senderSK);
     const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
     await waitForConfirmation(txId);